@@ -31,6 +31,9 @@ _C.SEED = 100
 _C.ENVIRONMENT = CN()
 _C.ENVIRONMENT.MAX_EPISODE_STEPS = 1000
 _C.ENVIRONMENT.MAX_EPISODE_SECONDS = 10000000
+# Number of the workers of a VectorEnv that may load the scene of a forced
+# scene switch at the same time, -1 for no limit
+_C.ENVIRONMENT.MAX_CONCURRENT_SCENE_SWITCHES = -1
 _C.ENVIRONMENT.ITERATOR_OPTIONS = CN()
 _C.ENVIRONMENT.ITERATOR_OPTIONS.CYCLE = True
 _C.ENVIRONMENT.ITERATOR_OPTIONS.SHUFFLE = True
@@ -111,6 +114,11 @@ _C.TASK.OBJECTGOAL_SENSOR.GOAL_SPEC_MAX_VAL = 50
 # -----------------------------------------------------------------------------
 _C.TASK.IMAGEGOAL_SENSOR = CN()
 _C.TASK.IMAGEGOAL_SENSOR.TYPE = "ImageGoalSensor"
+# Number of goal images kept in memory, when episodes are revisited
+_C.TASK.IMAGEGOAL_SENSOR.CACHE_SIZE = 0
+# Directory of the goal images of the episodes, written by
+# habitat/datasets/pointnav/precompute_image_goals.py or on first render
+_C.TASK.IMAGEGOAL_SENSOR.CACHE_DIR = ""
 # -----------------------------------------------------------------------------
 # HEADING SENSOR
 # -----------------------------------------------------------------------------
@@ -205,6 +213,16 @@ _C.TASK.INSTRUCTION_SENSOR_UUID = "instruction"
 _C.TASK.DISTANCE_TO_GOAL = CN()
 _C.TASK.DISTANCE_TO_GOAL.TYPE = "DistanceToGoal"
 _C.TASK.DISTANCE_TO_GOAL.DISTANCE_TO = "POINT"
+# Look the distances up in a field of the goals computed on reset instead of
+# querying the navmesh on every step
+_C.TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD = CN()
+_C.TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD.ENABLED = False
+_C.TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD.METERS_PER_PIXEL = 0.05
+# Distances below this are still queried, for SUCCESS to be exact
+_C.TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD.EXACT_DISTANCE = 1.0
+# Directory of the fields of the view points of the scenes computed offline
+# by habitat.datasets.object_nav.precompute_distance_fields
+_C.TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD.CACHE_DIR = ""
 # -----------------------------------------------------------------------------
 # # ANSWER_ACCURACY MEASUREMENT
 # -----------------------------------------------------------------------------
@@ -434,6 +452,20 @@ _C.DATASET.CONTENT_SCENES = ["*"]
 _C.DATASET.DATA_PATH = (
     "data/datasets/pointnav/habitat-test-scenes/v1/{split}/{split}.json.gz"
 )
+# Keep the episodes as rows of arrays and only build the episode objects
+# when they are accessed. Changes made to an episode object are then lost
+# once it is no longer referenced
+_C.DATASET.LAZY_EPISODES = False
+# Columnar version of the dataset (see habitat.datasets.columnar) to load the
+# episodes from, defaults to {split}.columnar next to DATA_PATH
+_C.DATASET.COLUMNAR_PATH = ""
+# Number of workers reading the per-scene files of the dataset in parallel, 0
+# to read them one after the other. LOADER_POOL is "thread" or "process"
+_C.DATASET.NUM_LOADER_WORKERS = 0
+_C.DATASET.LOADER_POOL = "thread"
+# Directory where loaded datasets are cached to be loaded faster next time,
+# empty to disable. See habitat.datasets.dataset_cache
+_C.DATASET.CACHE_DIR = ""
 
 # -----------------------------------------------------------------------------
 
@@ -9,6 +9,7 @@ r"""Implements dataset functionality to be used ``habitat.EmbodiedTask``.
 of a ``habitat.Agent`` inside ``habitat.Env``.
 """
 import copy
+import itertools
 import json
 import os
 import random
@@ -22,8 +23,8 @@ from typing import (
     List,
     Optional,
     Sequence,
+    Tuple,
     TypeVar,
-    Union,
 )
 
 import attr
@@ -31,12 +32,12 @@ import numpy as np
 from numpy import ndarray
 
 from habitat.config import Config
-from habitat.core.utils import not_none_validator
+from habitat.core.utils import not_none_validator, serializable_state
 
 ALL_SCENES_MASK = "*"
 
 
-@attr.s(auto_attribs=True, kw_only=True)
+@attr.s(auto_attribs=True, kw_only=True, slots=True, getstate_setstate=False)
 class Episode:
     r"""Base class for episode specification that includes initial position and
     rotation of agent, scene id, episode.
@@ -51,6 +52,11 @@ class Episode:
         agent's orientation is relative to the world coordinate axes.
 
     This information is provided by a :ref:`Dataset` instance.
+
+    Episodes are slotted to keep large datasets small in memory. Subclasses
+    that are slotted too must pass :py:`getstate_setstate=False` to
+    :ref:`attr.s` to keep the pickling below, subclasses that aren't get a
+    ``__dict__`` for their own attributes.
     """
 
     episode_id: str = attr.ib(default=None, validator=not_none_validator)
@@ -65,23 +71,101 @@ class Episode:
     _shortest_path_cache: Any = attr.ib(init=False, default=None)
 
     def __getstate__(self):
-        return {
-            k: v
-            for k, v in self.__dict__.items()
-            if k not in {"_shortest_path_cache"}
+        # The (__dict__, slots) form of the state is restored by pickle
+        # itself, without calling back into Python for every episode
+        state = getattr(self, "__dict__", None)
+        slots = {
+            field.name: getattr(self, field.name)
+            for field in attr.fields(type(self))
+            if state is None or field.name not in state
         }
-
-    def __setstate__(self, state):
-        self.__dict__.update(state)
-        self.__dict__["_shortest_path_cache"] = None
+        slots["_shortest_path_cache"] = None
+        return state, slots
 
 
 T = TypeVar("T", bound=Episode)
 
 
+class LazyEpisodeStore(Sequence[T]):
+    r"""Read-only sequence of episodes kept in a compact form, e.g. rows of
+    arrays, and only built as :ref:`Episode` objects when accessed.
+
+    Every access builds a new episode object, changes made to it are not
+    kept by the store. The scene of an episode is known without building it,
+    which is all :ref:`EpisodeIterator` needs to group and order episodes.
+    """
+
+    def __init__(
+        self,
+        build_episode: Callable[[int], T],
+        scene_ids: Sequence[str],
+        scene_index: ndarray,
+        rows: Optional[ndarray] = None,
+    ) -> None:
+        r"""..
+
+        :param build_episode: builds the episode stored in a row.
+        :param scene_ids: scene ids of the episodes.
+        :param scene_index: for every row, the index of its scene id in
+            :p:`scene_ids`.
+        :param rows: rows in the store, in order. Defaults to all of them.
+        """
+        self._build_episode = build_episode
+        self._scene_ids = list(scene_ids)
+        self._scene_index = scene_index
+        self.rows = (
+            np.arange(len(scene_index), dtype=np.int64)
+            if rows is None
+            else np.asarray(rows, dtype=np.int64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+        return self._build_episode(int(self.rows[index]))
+
+    def __iter__(self) -> Iterator[T]:
+        for row in self.rows.tolist():
+            yield self._build_episode(row)
+
+    def scene_id_of(self, index: int) -> str:
+        r"""Scene id of episode :p:`index`, without building it."""
+        return self._scene_ids[self._scene_index[self.rows[index]]]
+
+    @property
+    def scene_ids(self) -> List[str]:
+        r"""Unique scene ids of the episodes in the store."""
+        return sorted(
+            self._scene_ids[i] for i in np.unique(self._scene_index[self.rows])
+        )
+
+    def scene_codes(self) -> Tuple[List[str], ndarray]:
+        r"""Returns the unique scene ids of the episodes, sorted, and for
+        every episode the index of its scene id in them.
+        """
+        codes, inverse = np.unique(
+            self._scene_index[self.rows], return_inverse=True
+        )
+        return [self._scene_ids[i] for i in codes], inverse
+
+    def take(self, indices: Sequence[int]) -> "LazyEpisodeStore[T]":
+        r"""Returns a store with episodes :p:`indices` of this one, sharing
+        its storage.
+        """
+        return LazyEpisodeStore(
+            self._build_episode,
+            self._scene_ids,
+            self._scene_index,
+            self.rows[np.asarray(indices, dtype=np.int64)],
+        )
+
+
 class Dataset(Generic[T]):
     r"""Base class for dataset specification."""
-    episodes: List[T]
+    episodes: Sequence[T]
 
     @staticmethod
     def scene_from_scene_path(scene_path: str) -> str:
@@ -131,14 +215,54 @@ class Dataset(Generic[T]):
     @property
     def scene_ids(self) -> List[str]:
         r"""unique scene ids present in the dataset."""
+        if isinstance(self.episodes, LazyEpisodeStore):
+            return self.episodes.scene_ids
         return sorted({episode.scene_id for episode in self.episodes})
 
+    def _take_episodes(self, indexes: Sequence[int]) -> Sequence[T]:
+        if isinstance(self.episodes, LazyEpisodeStore):
+            return self.episodes.take(indexes)
+        episodes = self.episodes
+        return [episodes[i] for i in np.asarray(indexes).tolist()]
+
+    def _scene_codes(self) -> Tuple[List[str], ndarray]:
+        r"""Returns the unique scene ids of the episodes, sorted, and for
+        every episode the index of its scene id in them.
+        """
+        if isinstance(self.episodes, LazyEpisodeStore):
+            return self.episodes.scene_codes()
+        # Hashing the scene ids is much faster than sorting them all
+        first_codes: Dict[str, int] = {}
+        codes = np.fromiter(
+            (
+                first_codes.setdefault(episode.scene_id, len(first_codes))
+                for episode in self.episodes
+            ),
+            dtype=np.int64,
+            count=len(self.episodes),
+        )
+        scene_ids = sorted(first_codes)
+        sorted_codes = np.zeros(len(scene_ids), dtype=np.int64)
+        sorted_codes[list(first_codes.values())] = np.argsort(
+            np.argsort(list(first_codes))
+        )
+        return scene_ids, sorted_codes[codes]
+
     def get_scene_episodes(self, scene_id: str) -> List[T]:
         r"""..
 
         :param scene_id: id of scene in scene dataset.
         :return: list of episodes for the :p:`scene_id`.
         """
+        if isinstance(self.episodes, LazyEpisodeStore):
+            scene_ids, codes = self._scene_codes()
+            if scene_id not in scene_ids:
+                return []
+            return list(
+                self._take_episodes(
+                    np.flatnonzero(codes == scene_ids.index(scene_id))
+                )
+            )
         return list(
             filter(lambda x: x.scene_id == scene_id, iter(self.episodes))
         )
@@ -171,11 +295,7 @@ class Dataset(Generic[T]):
                 if isinstance(obj, np.ndarray):
                     return obj.tolist()
 
-                return (
-                    obj.__getstate__()
-                    if hasattr(obj, "__getstate__")
-                    else obj.__dict__
-                )
+                return serializable_state(obj)
 
         result = DatasetJSONEncoder().encode(self)
         return result
@@ -201,12 +321,17 @@ class Dataset(Generic[T]):
         :param filter_fn: function used to filter the episodes.
         :return: the new dataset.
         """
-        new_episodes = []
-        for episode in self.episodes:
-            if filter_fn(episode):
-                new_episodes.append(episode)
+        # Only a mask is kept until the filtered episodes are taken
+        keep = np.fromiter(
+            map(filter_fn, self.episodes), dtype=bool, count=len(self.episodes)
+        )
         new_dataset = copy.copy(self)
-        new_dataset.episodes = new_episodes
+        if isinstance(self.episodes, LazyEpisodeStore):
+            new_dataset.episodes = self.episodes.take(np.flatnonzero(keep))
+        else:
+            new_dataset.episodes = list(
+                itertools.compress(self.episodes, keep)
+            )
         return new_dataset
 
     def get_splits(
@@ -282,28 +407,39 @@ class Dataset(Generic[T]):
             self.num_episodes, num_episodes, replace=False
         )
         if collate_scene_ids:
-            scene_ids: Dict[str, List[int]] = {}
-            for rand_ind in rand_items:
-                scene = self.episodes[rand_ind].scene_id
-                if scene not in scene_ids:
-                    scene_ids[scene] = []
-                scene_ids[scene].append(rand_ind)
-            rand_items = []
-            list(map(rand_items.extend, scene_ids.values()))
-        ep_ind = 0
-        new_episodes = []
+            # Scenes in the order they are first drawn, the episodes of a
+            # scene in the order they are drawn
+            scene_ids, codes = self._scene_codes()
+            rand_codes = codes[rand_items]
+            unique_codes, first_draws = np.unique(
+                rand_codes, return_index=True
+            )
+            scene_rank = np.zeros(len(scene_ids), dtype=np.int64)
+            scene_rank[unique_codes] = np.argsort(np.argsort(first_draws))
+            rand_items = rand_items[
+                np.argsort(scene_rank[rand_codes], kind="stable")
+            ]
+
+        # Splits are index arrays until their episodes are taken
+        split_starts = np.cumsum([0] + split_lengths)
         for nn in range(num_splits):
+            split_indexes = rand_items[split_starts[nn] : split_starts[nn + 1]]
+            if sort_by_episode_id:
+                split_indexes = np.array(
+                    sorted(
+                        split_indexes.tolist(),
+                        key=lambda i: self.episodes[i].episode_id,
+                    ),
+                    dtype=np.int64,
+                )
+                rand_items[
+                    split_starts[nn] : split_starts[nn + 1]
+                ] = split_indexes
             new_dataset = copy.copy(self)  # Creates a shallow copy
-            new_dataset.episodes = []
+            new_dataset.episodes = self._take_episodes(split_indexes)
             new_datasets.append(new_dataset)
-            for _ii in range(split_lengths[nn]):
-                new_dataset.episodes.append(self.episodes[rand_items[ep_ind]])
-                ep_ind += 1
-            if sort_by_episode_id:
-                new_dataset.episodes.sort(key=lambda ep: ep.episode_id)
-            new_episodes.extend(new_dataset.episodes)
         if remove_unused_episodes:
-            self.episodes = new_episodes
+            self.episodes = self._take_episodes(rand_items[:num_episodes])
         return new_datasets
 
 
@@ -333,6 +469,11 @@ class EpisodeIterator(Iterator):
         loaded consecutively.
     Sample episodes:
         sample the specified number of episodes.
+    Coordinated scene switch:
+        with :p:`scene_switch_semaphore` shared by the iterators of several
+        workers, as many of them as its value may load the scene of a forced
+        switch at the same time, the others keep iterating the episodes of
+        their scene until a switch is possible.
     """
 
     def __init__(
@@ -346,6 +487,7 @@ class EpisodeIterator(Iterator):
         num_episode_sample: int = -1,
         step_repetition_range: float = 0.2,
         seed: int = None,
+        scene_switch_semaphore: Optional[Any] = None,
     ) -> None:
         r"""..
 
@@ -367,18 +509,33 @@ class EpisodeIterator(Iterator):
             [1 - step_repeat_range, 1 + step_repeat_range] * max_scene_repeat_steps
             on each scene switch.  This stops all workers from swapping scenes at
             the same time
+        :param scene_switch_semaphore: semaphore, shared with the iterators
+            of other workers, that a forced scene switch acquires without
+            blocking and :ref:`release_scene_switch` releases once the scene
+            is loaded. :py:`None` to switch whenever a threshold is reached.
         """
         if seed:
             random.seed(seed)
             np.random.seed(seed)
 
+        # Episodes of a LazyEpisodeStore are ordered through their positions
+        # in the store and only built when they are returned
+        self._lazy = isinstance(episodes, LazyEpisodeStore)
+
         # sample episodes
         if num_episode_sample >= 0:
-            episodes = np.random.choice(
-                episodes, num_episode_sample, replace=False
-            )
+            if self._lazy:
+                episodes = episodes.take(  # type: ignore[attr-defined]
+                    np.random.choice(
+                        len(episodes), num_episode_sample, replace=False
+                    )
+                )
+            else:
+                episodes = np.random.choice(
+                    episodes, num_episode_sample, replace=False
+                )
 
-        if not isinstance(episodes, list):
+        if not self._lazy and not isinstance(episodes, list):
             episodes = list(episodes)
 
         self.episodes = episodes
@@ -387,10 +544,20 @@ class EpisodeIterator(Iterator):
         self.shuffle = shuffle
 
         if shuffle:
-            random.shuffle(self.episodes)
+            if self._lazy:
+                order = list(range(len(self.episodes)))
+                random.shuffle(order)
+                self.episodes = self.episodes.take(order)  # type: ignore
+            else:
+                random.shuffle(self.episodes)  # type: ignore[arg-type]
 
         if group_by_scene:
-            self.episodes = self._group_scenes(self.episodes)
+            if self._lazy:
+                self.episodes = self.episodes.take(  # type: ignore
+                    self._group_scenes(range(len(self.episodes)))
+                )
+            else:
+                self.episodes = self._group_scenes(self.episodes)
 
         self.max_scene_repetition_episodes = max_scene_repeat_episodes
         self.max_scene_repetition_steps = max_scene_repeat_steps
@@ -398,8 +565,10 @@ class EpisodeIterator(Iterator):
         self._rep_count = -1  # 0 corresponds to first episode already returned
         self._step_count = 0
         self._prev_scene_id: Optional[str] = None
+        self.scene_switch_semaphore = scene_switch_semaphore
+        self._holds_scene_switch = False
 
-        self._iterator = iter(self.episodes)
+        self._iterator = iter(self._items())
 
         self.step_repetition_range = step_repetition_range
         self._set_shuffle_intervals()
@@ -407,6 +576,19 @@ class EpisodeIterator(Iterator):
     def __iter__(self) -> "EpisodeIterator":
         return self
 
+    def _items(self) -> Sequence:
+        r"""What is iterated over: the episodes, or their positions in the
+        store for a :ref:`LazyEpisodeStore`.
+        """
+        if self._lazy:
+            return range(len(self.episodes))
+        return self.episodes
+
+    def _scene_of(self, item) -> str:
+        if self._lazy:
+            return self.episodes.scene_id_of(item)  # type: ignore
+        return item.scene_id
+
     def __next__(self) -> Episode:
         r"""The main logic for handling how episodes will be iterated.
 
@@ -414,17 +596,19 @@ class EpisodeIterator(Iterator):
         """
         self._forced_scene_switch_if()
 
-        next_episode = next(self._iterator, None)
-        if next_episode is None:
+        next_item = next(self._iterator, None)
+        if next_item is None:
             if not self.cycle:
                 raise StopIteration
 
-            self._iterator = iter(self.episodes)
+            self._iterator = iter(self._items())
 
             if self.shuffle:
                 self._shuffle()
 
-            next_episode = next(self._iterator)
+            next_item = next(self._iterator)
+
+        next_episode = self.episodes[next_item] if self._lazy else next_item
 
         if (
             self._prev_scene_id != next_episode.scene_id
@@ -441,8 +625,7 @@ class EpisodeIterator(Iterator):
         from current scene to the end and switch to next scene episodes.
         """
         grouped_episodes = [
-            list(g)
-            for k, g in groupby(self._iterator, key=lambda x: x.scene_id)
+            list(g) for k, g in groupby(self._iterator, key=self._scene_of)
         ]
 
         if len(grouped_episodes) > 1:
@@ -465,9 +648,7 @@ class EpisodeIterator(Iterator):
 
         self._iterator = iter(episodes)
 
-    def _group_scenes(
-        self, episodes: Union[Sequence[Episode], List[Episode], ndarray]
-    ) -> List[T]:
+    def _group_scenes(self, episodes: Sequence[Any]) -> List[Any]:
         r"""Internal method that groups episodes by scene
         Groups will be ordered by the order the first episode of a given
         scene is in the list of episodes
@@ -479,10 +660,13 @@ class EpisodeIterator(Iterator):
 
         scene_sort_keys: Dict[str, int] = {}
         for e in episodes:
-            if e.scene_id not in scene_sort_keys:
-                scene_sort_keys[e.scene_id] = len(scene_sort_keys)
+            scene_id = self._scene_of(e)
+            if scene_id not in scene_sort_keys:
+                scene_sort_keys[scene_id] = len(scene_sort_keys)
 
-        return sorted(episodes, key=lambda e: scene_sort_keys[e.scene_id])  # type: ignore[arg-type]
+        return sorted(
+            episodes, key=lambda e: scene_sort_keys[self._scene_of(e)]
+        )
 
     def step_taken(self) -> None:
         self._step_count += 1
@@ -524,6 +708,20 @@ class EpisodeIterator(Iterator):
         ):
             do_switch = True
 
-        if do_switch:
+        if do_switch and self._acquire_scene_switch():
             self._forced_scene_switch()
             self._set_shuffle_intervals()
+
+    def _acquire_scene_switch(self) -> bool:
+        if self.scene_switch_semaphore is None or self._holds_scene_switch:
+            return True
+        self._holds_scene_switch = self.scene_switch_semaphore.acquire(False)
+        return self._holds_scene_switch
+
+    def release_scene_switch(self) -> None:
+        r"""Lets another worker switch scenes, called by :ref:`Env` once the
+        scene of the current episode is loaded.
+        """
+        if self._holds_scene_switch:
+            self._holds_scene_switch = False
+            self.scene_switch_semaphore.release()
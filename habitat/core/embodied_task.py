@@ -8,13 +8,28 @@ r"""Implements tasks and measurements needed for training and benchmarking of
 """
 
 from collections import OrderedDict
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 
 from habitat.config import Config
 from habitat.core.dataset import Dataset, Episode
-from habitat.core.simulator import Observations, SensorSuite, Simulator
+from habitat.core.simulator import (
+    AgentStateSnapshot,
+    Observations,
+    SensorSuite,
+    Simulator,
+)
 from habitat.core.spaces import ActionSpace, EmptySpace, Space
 
 
@@ -89,11 +104,22 @@ class Measure:
     :ref:`update_metric()` method and the user is also required to set the
     :ref:`uuid <Measure.uuid>` and :ref:`_metric` attributes.
 
+    :data dependencies: uuids of the measures whose metrics the measure
+        reads, :ref:`Measurements` updates them first.
+    :data is_lazy: whether the metric only depends on the current state of
+        the environment and not on the previous steps. The
+        :ref:`update_metric()` of a lazy measure is only called when its
+        metric is read, at most once per step.
+
     .. (uuid is a builtin Python module, so just :ref:`uuid` would link there)
     """
 
     _metric: Any
     uuid: str
+    dependencies: Sequence[str] = ()
+    is_lazy: bool = False
+    # Arguments of the update_metric() call a lazy measure has yet to make
+    _pending_update: Optional[Tuple[Tuple[Any, ...], Dict[str, Any]]] = None
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.uuid = self._get_uuid(*args, **kwargs)
@@ -119,6 +145,10 @@ class Measure:
 
         :return: the current metric for :ref:`Measure`.
         """
+        if self._pending_update is not None:
+            args, kwargs = self._pending_update
+            self._pending_update = None
+            self.update_metric(*args, **kwargs)
         return self._metric
 
 
@@ -140,6 +170,11 @@ class Metrics(dict):
 class Measurements:
     r"""Represents a set of Measures, with each :ref:`Measure` being
     identified through a unique id.
+
+    Measures are updated after the :ref:`Measure.dependencies` that are in
+    the set, and otherwise in the order they are given. Lazy measures are
+    only updated when their metric is read, e.g. by another measure or
+    :ref:`get_metrics()`.
     """
 
     measures: Dict[str, Measure]
@@ -157,12 +192,51 @@ class Measurements:
             ), "'{}' is duplicated measure uuid".format(measure.uuid)
             self.measures[measure.uuid] = measure
 
-    def reset_measures(self, *args: Any, **kwargs: Any) -> None:
+        self._update_order = self._sort_measures()
+        self._measure_indices = {
+            measure.uuid: i for i, measure in enumerate(self._update_order)
+        }
+        self._eager_measures = [
+            measure for measure in self._update_order if not measure.is_lazy
+        ]
+        self._lazy_measures = [
+            measure for measure in self._update_order if measure.is_lazy
+        ]
+
+    def _sort_measures(self) -> List[Measure]:
+        r"""Orders the measures so that each one comes after its
+        dependencies, keeping the given order otherwise.
+        """
+        order: List[Measure] = []
+        visited: Dict[str, bool] = {}
+
+        def visit(measure: Measure, path: List[str]) -> None:
+            if visited.get(measure.uuid):
+                return
+            assert (
+                measure.uuid not in path
+            ), "Cyclic dependencies between measures {}".format(
+                " -> ".join(path + [measure.uuid])
+            )
+            for dependency in measure.dependencies:
+                if dependency in self.measures:
+                    visit(self.measures[dependency], path + [measure.uuid])
+            visited[measure.uuid] = True
+            order.append(measure)
+
         for measure in self.measures.values():
+            visit(measure, [])
+        return order
+
+    def reset_measures(self, *args: Any, **kwargs: Any) -> None:
+        for measure in self._update_order:
+            measure._pending_update = None
             measure.reset_metric(*args, **kwargs)
 
     def update_measures(self, *args: Any, **kwargs: Any) -> None:
-        for measure in self.measures.values():
+        for measure in self._lazy_measures:
+            measure._pending_update = (args, kwargs)
+        for measure in self._eager_measures:
             measure.update_metric(*args, **kwargs)
 
     def get_metrics(self) -> Metrics:
@@ -172,7 +246,7 @@ class Measurements:
         return Metrics(self.measures)
 
     def _get_measure_index(self, measure_name):
-        return list(self.measures.keys()).index(measure_name)
+        return self._measure_indices[measure_name]
 
     def check_measure_dependencies(
         self, measure_name: str, dependencies: List[str]
@@ -191,7 +265,10 @@ class Measurements:
                 listed in the measures list in the config."""
 
         for dependency_measure in dependencies:
-            assert measure_index > self._get_measure_index(
+            # Lazy measures are up to date whenever they are read
+            assert self.measures[
+                dependency_measure
+            ].is_lazy or measure_index > self._get_measure_index(
                 dependency_measure
             ), f"""{measure_name} measure requires be listed after {dependency_measure}
                 in the measures list in the config."""
@@ -214,12 +291,17 @@ class EmbodiedTask:
 
     :data measurements: set of task measures.
     :data sensor_suite: suite of task sensors.
+
+    The state of the agent is read from the simulator at most once per step
+    and shared by the sensors and measures, see
+    :ref:`get_agent_state_snapshot`.
     """
 
     _config: Any
     _sim: Optional[Simulator]
     _dataset: Optional[Dataset]
     _is_episode_active: bool
+    _agent_state_snapshots: Dict[int, AgentStateSnapshot]
     measurements: Measurements
     sensor_suite: SensorSuite
 
@@ -231,6 +313,7 @@ class EmbodiedTask:
         self._config = config
         self._sim = sim
         self._dataset = dataset
+        self._agent_state_snapshots = {}
 
         self.measurements = Measurements(
             self._init_entities(
@@ -254,6 +337,13 @@ class EmbodiedTask:
             entities_config=self._config.ACTIONS,
         )
         self._action_keys = list(self.actions.keys())
+        # Step methods of the actions by name and by index, see step()
+        self._action_steps: Dict[Union[str, int], Callable] = {}
+        for action_index, (action_name, action_instance) in enumerate(
+            self.actions.items()
+        ):
+            self._action_steps[action_name] = action_instance.step
+            self._action_steps[action_index] = action_instance.step
 
     def _init_entities(
         self, entity_names, register_func, entities_config=None
@@ -278,6 +368,8 @@ class EmbodiedTask:
 
     def reset(self, episode: Episode):
         observations = self._sim.reset()
+        self.invalidate_agent_state_snapshots()
+        self.sensor_suite.reset_episode_observations()
         observations.update(
             self.sensor_suite.get_observations(
                 observations=observations, episode=episode, task=self
@@ -290,17 +382,27 @@ class EmbodiedTask:
         return observations
 
     def step(self, action: Dict[str, Any], episode: Episode):
-        if "action_args" not in action or action["action_args"] is None:
-            action["action_args"] = {}
-        action_name = action["action"]
-        if isinstance(action_name, (int, np.integer)):
-            action_name = self.get_action_name(action_name)
-        assert (
-            action_name in self.actions
-        ), f"Can't find '{action_name}' action in {self.actions.keys()}."
-
-        task_action = self.actions[action_name]
-        observations = task_action.step(**action["action_args"], task=self)
+        action_args = action.get("action_args")
+        if action_args is None:
+            action_args = action["action_args"] = {}
+        # The step method of the action is looked up in a single dict for
+        # names and indices, other indices and unknown names are handled by
+        # get_action_name and the assert
+        action_step = self._action_steps.get(action["action"])
+        if action_step is None:
+            action_name = action["action"]
+            if isinstance(action_name, (int, np.integer)):
+                action_name = self.get_action_name(action_name)
+            assert (
+                action_name in self.actions
+            ), f"Can't find '{action_name}' action in {self.actions.keys()}."
+            action_step = self.actions[action_name].step
+
+        if action_args:
+            observations = action_step(**action_args, task=self)
+        else:
+            observations = action_step(task=self)
+        self.invalidate_agent_state_snapshots()
         observations.update(
             self.sensor_suite.get_observations(
                 observations=observations,
@@ -316,6 +418,27 @@ class EmbodiedTask:
 
         return observations
 
+    def get_agent_state_snapshot(
+        self, agent_id: int = 0
+    ) -> AgentStateSnapshot:
+        r"""Returns the state of agent :p:`agent_id` after the last action,
+        read from the simulator the first time it is requested in a step.
+        """
+        snapshot = self._agent_state_snapshots.get(agent_id)
+        if snapshot is None:
+            snapshot = AgentStateSnapshot.from_agent_state(
+                self._sim.get_agent_state(agent_id)
+            )
+            self._agent_state_snapshots[agent_id] = snapshot
+        return snapshot
+
+    def invalidate_agent_state_snapshots(self) -> None:
+        r"""Makes :ref:`get_agent_state_snapshot` read the state from the
+        simulator again. Called after the action of a step and on reset,
+        tasks that move the agent otherwise must call it too.
+        """
+        self._agent_state_snapshots.clear()
+
     def get_action_name(self, action_index: int):
         if action_index >= len(self.actions):
             raise ValueError(f"Action index '{action_index}' is out of range.")
@@ -356,3 +479,15 @@ class EmbodiedTask:
 
     def seed(self, seed: int) -> None:
         return
+
+
+def get_agent_state_snapshot(
+    sim: Simulator, task: Optional[EmbodiedTask] = None, agent_id: int = 0
+) -> AgentStateSnapshot:
+    r"""Returns the state of the agent shared by the sensors and measures of
+    :p:`task` in the current step, or reads it from :p:`sim` when there is
+    no :ref:`EmbodiedTask` to share it.
+    """
+    if task is not None:
+        return task.get_agent_state_snapshot(agent_id)
+    return AgentStateSnapshot.from_agent_state(sim.get_agent_state(agent_id))
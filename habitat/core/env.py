@@ -6,7 +6,7 @@
 
 import random
 import time
-from typing import Any, Dict, Iterator, List, Optional, Tuple, Union, cast
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple, Union, cast
 
 import gym
 import numba
@@ -42,7 +42,7 @@ class Env:
     _config: Config
     _dataset: Optional[Dataset]
     number_of_episodes: Optional[int]
-    _episodes: List[Episode]
+    _episodes: Sequence[Episode]
     _current_episode_index: Optional[int]
     _current_episode: Optional[Episode]
     _episode_iterator: Optional[Iterator]
@@ -81,7 +81,7 @@ class Env:
         self._episodes = (
             self._dataset.episodes
             if self._dataset
-            else cast(List[Episode], [])
+            else cast(Sequence[Episode], [])
         )
         self._current_episode = None
         iter_option_dict = {
@@ -148,11 +148,11 @@ class Env:
         self._episode_iterator = new_iter
 
     @property
-    def episodes(self) -> List[Episode]:
+    def episodes(self) -> Sequence[Episode]:
         return self._episodes
 
     @episodes.setter
-    def episodes(self, episodes: List[Episode]) -> None:
+    def episodes(self, episodes: Sequence[Episode]) -> None:
         assert (
             len(episodes) > 0
         ), "Environment doesn't accept empty episodes list."
@@ -218,6 +218,8 @@ class Env:
 
         self._current_episode = next(self._episode_iterator)
         self.reconfigure(self._config)
+        if isinstance(self._episode_iterator, EpisodeIterator):
+            self._episode_iterator.release_scene_switch()
 
         observations = self.task.reset(episode=self.current_episode)
         self._task.measurements.reset_measures(
@@ -349,11 +351,11 @@ class RLEnv(gym.Env):
         return self._env
 
     @property
-    def episodes(self) -> List[Episode]:
+    def episodes(self) -> Sequence[Episode]:
         return self._env.episodes
 
     @episodes.setter
-    def episodes(self, episodes: List[Episode]) -> None:
+    def episodes(self, episodes: Sequence[Episode]) -> None:
         self._env.episodes = episodes
 
     @property
@@ -10,13 +10,18 @@ from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
 
 import attr
 import numpy as np
+import quaternion
 from gym import Space, spaces
 
 from habitat.config import Config
 from habitat.core.dataset import Episode
+from habitat.utils.geometry_utils import quaternion_rotate_vector
 
 VisualObservation = Union[np.ndarray]
 
+# Marks a sensor that hasn't computed its observation in the episode yet
+_NO_EPISODE_OBSERVATION = object()
+
 
 @attr.s(auto_attribs=True)
 class ActionSpaceConfiguration(metaclass=abc.ABCMeta):
@@ -54,6 +59,12 @@ class Sensor(metaclass=abc.ABCMeta):
         comes under one of it's categories.
     :data observation_space: ``gym.Space`` object corresponding to observation
         of sensor.
+    :data is_static_per_episode: whether the observation doesn't change
+        during an episode. It is then computed on the first step of the
+        episode only and the same object is returned on the other steps, see
+        :ref:`get_episode_observation`. The flag isn't inherited: a subclass
+        can compute its observation differently, so it is only static if it
+        sets the flag itself.
 
     The user of this class needs to implement the get_observation method and
     the user is also required to set the below attributes:
@@ -63,6 +74,13 @@ class Sensor(metaclass=abc.ABCMeta):
     config: Config
     sensor_type: SensorTypes
     observation_space: Space
+    is_static_per_episode: bool = False
+    _episode_observation: Any = _NO_EPISODE_OBSERVATION
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        if "is_static_per_episode" not in cls.__dict__:
+            cls.is_static_per_episode = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.config = kwargs["config"] if "config" in kwargs else None
@@ -91,6 +109,23 @@ class Sensor(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    def get_episode_observation(self, *args: Any, **kwargs: Any) -> Any:
+        r"""Returns :ref:`get_observation`, computed only once per episode if
+        the sensor is static per episode. Cached observations are shared by
+        the steps of the episode and must not be modified.
+        """
+        if not self.is_static_per_episode:
+            return self.get_observation(*args, **kwargs)
+        if self._episode_observation is _NO_EPISODE_OBSERVATION:
+            self._episode_observation = self.get_observation(*args, **kwargs)
+        return self._episode_observation
+
+    def reset_episode_observation(self) -> None:
+        r"""Discards the observation cached by
+        :ref:`get_episode_observation`, called when an episode starts.
+        """
+        self._episode_observation = _NO_EPISODE_OBSERVATION
+
 
 class Observations(Dict[str, Any]):
     r"""Dictionary containing sensor observations"""
@@ -105,12 +140,31 @@ class Observations(Dict[str, Any]):
         """
 
         data = [
-            (uuid, sensor.get_observation(*args, **kwargs))
+            (uuid, sensor.get_episode_observation(*args, **kwargs))
             for uuid, sensor in sensors.items()
         ]
         super().__init__(data)
 
 
+def stack_observations(
+    batch: Dict[str, np.ndarray],
+    observations: Dict[str, Any],
+    index: int,
+    batch_size: int,
+) -> None:
+    r"""Copies :p:`observations` to the :p:`index` of the stacked
+    observations :p:`batch` of :p:`batch_size` poses, allocating their
+    arrays with the first observations.
+    """
+    for uuid, observation in observations.items():
+        observation = np.asarray(observation)
+        if uuid not in batch:
+            batch[uuid] = np.empty(
+                (batch_size, *observation.shape), dtype=observation.dtype
+            )
+        batch[uuid][index] = observation
+
+
 class RGBSensor(Sensor, metaclass=abc.ABCMeta):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
@@ -212,20 +266,78 @@ class SensorSuite:
         """
         return Observations(self.sensors, *args, **kwargs)
 
+    def reset_episode_observations(self) -> None:
+        r"""Discards the observations cached by the sensors that are static
+        per episode.
+        """
+        for sensor in self.sensors.values():
+            sensor.reset_episode_observation()
 
-@attr.s(auto_attribs=True)
+
+@attr.s(auto_attribs=True, slots=True, getstate_setstate=False)
 class AgentState:
     position: Optional["np.ndarray"]
     rotation: Optional["np.ndarray"] = None
 
 
-@attr.s(auto_attribs=True)
+@attr.s(auto_attribs=True, slots=True, getstate_setstate=False)
 class ShortestPathPoint:
     position: List[Any]
     rotation: List[Any]
     action: Optional[int] = None
 
 
+class AgentStateSnapshot:
+    r"""State of an agent read from the simulator once per step and shared
+    by the sensors and measures of the task, see
+    :ref:`EmbodiedTask.get_agent_state_snapshot`. The quantities derived from
+    the rotation are computed when they are first used.
+
+    :property position: read-only position of the agent.
+    :property rotation: rotation of the agent, a :py:`np.quaternion`.
+    """
+
+    __slots__ = ("position", "rotation", "_heading", "_rotation_matrix")
+
+    def __init__(self, position: np.ndarray, rotation: Any) -> None:
+        position = np.array(position)
+        position.flags.writeable = False
+        self.position = position
+        self.rotation = rotation
+        self._heading: Optional[float] = None
+        self._rotation_matrix: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_agent_state(cls, agent_state: Any) -> "AgentStateSnapshot":
+        r"""Takes the position and rotation of the agent state returned by
+        :ref:`Simulator.get_agent_state`.
+        """
+        return cls(agent_state.position, agent_state.rotation)
+
+    @property
+    def heading(self) -> float:
+        r"""Angle of the forward direction (negative z) of the agent around
+        the y axis, in :py:`[-pi, pi]`.
+        """
+        if self._heading is None:
+            heading_vector = quaternion_rotate_vector(
+                self.rotation.inverse(), np.array([0, 0, -1])
+            )
+            self._heading = float(
+                np.arctan2(heading_vector[0], -heading_vector[2])
+            )
+        return self._heading
+
+    @property
+    def rotation_matrix(self) -> np.ndarray:
+        r"""Read-only 3x3 matrix of the rotation of the agent."""
+        if self._rotation_matrix is None:
+            rotation_matrix = quaternion.as_rotation_matrix(self.rotation)
+            rotation_matrix.flags.writeable = False
+            self._rotation_matrix = rotation_matrix
+        return self._rotation_matrix
+
+
 class Simulator:
     r"""Basic simulator class for habitat. New simulators to be added to habtiat
     must derive from this class and implement the abstarct methods.
@@ -313,6 +425,32 @@ class Simulator:
         """
         raise NotImplementedError
 
+    def get_observations_at_poses(
+        self,
+        positions: Sequence[Sequence[float]],
+        rotations: Sequence[Sequence[float]],
+    ) -> Optional[Dict[str, np.ndarray]]:
+        r"""Returns the observations at several poses, as
+        :ref:`get_observations_at` does for each of them. The agent returns
+        to where it started.
+
+        :param positions: the :py:`(x, y, z)` of the poses.
+        :param rotations: the :py:`(x, y, z, w)` of the poses.
+        :return:
+            The observations of every sensor stacked along a first axis of
+            poses, or :py:`None` if it was unable to get valid observations
+            at one of the poses.
+        """
+        batch: Dict[str, np.ndarray] = {}
+        for i, (position, rotation) in enumerate(zip(positions, rotations)):
+            observations = self.get_observations_at(
+                list(position), list(rotation)
+            )
+            if observations is None:
+                return None
+            stack_observations(batch, observations, i, len(positions))
+        return batch
+
     def sample_navigable_point(self) -> List[float]:
         r"""Samples a navigable point from the simulator. A point is defined as
         navigable if the agent can be initialized at that point.
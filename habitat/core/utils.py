@@ -9,6 +9,7 @@ import json
 import math
 from typing import Any, Dict, List, Optional
 
+import attr
 import numpy as np
 import quaternion  # noqa: F401
 
@@ -117,6 +118,28 @@ def center_crop(obs, new_shape):
     return obs
 
 
+def serializable_state(obj: Any) -> Dict[str, Any]:
+    r"""Returns the attributes of :p:`obj` to serialize it to JSON.
+
+    For attrs classes, that may be slotted and have no ``__dict__``, these
+    are the fields that are passed to the constructor, which leaves out
+    caches, and the attributes in the ``__dict__`` if there is one.
+    Otherwise a :py:`__getstate__()` that returns a dict is used.
+    """
+    if attr.has(type(obj)):
+        fields = {
+            field.name: getattr(obj, field.name)
+            for field in attr.fields(type(obj))
+            if field.init
+        }
+        fields.update(getattr(obj, "__dict__", {}))
+        return fields
+    state = obj.__getstate__() if hasattr(obj, "__getstate__") else None
+    if isinstance(state, dict):
+        return state
+    return obj.__dict__
+
+
 class DatasetFloatJSONEncoder(json.JSONEncoder):
     r"""JSON Encoder that sets a float precision for a space saving purpose and
     encodes ndarray and quaternion. The encoder is compatible with JSON
@@ -130,11 +153,7 @@ class DatasetFloatJSONEncoder(json.JSONEncoder):
         if isinstance(obj, np.quaternion):
             return quaternion_to_list(obj)
 
-        return (
-            obj.__getstate__()
-            if hasattr(obj, "__getstate__")
-            else obj.__dict__
-        )
+        return serializable_state(obj)
 
     # Overriding method to inject own `_repr` function for floats with needed
     # precision.
@@ -31,6 +31,7 @@ from gym import spaces
 
 import habitat
 from habitat.config import Config
+from habitat.core.dataset import EpisodeIterator
 from habitat.core.env import Env, RLEnv
 from habitat.core.logging import logger
 from habitat.core.utils import tile_images
@@ -79,6 +80,23 @@ def _make_env_fn(
     return habitat_env
 
 
+def _set_scene_switch_semaphore(env: Any, semaphore: Any) -> None:
+    r"""Shares :p:`semaphore` with the :ref:`EpisodeIterator` of the
+    :ref:`Env` that :p:`env` is or wraps, if any.
+    """
+    while not isinstance(env, Env):
+        if isinstance(env, RLEnv):
+            env = env.habitat_env
+        elif hasattr(env, "_env"):
+            env = env._env
+        elif hasattr(env, "env"):
+            env = env.env
+        else:
+            return
+    if isinstance(env.episode_iterator, EpisodeIterator):
+        env.episode_iterator.scene_switch_semaphore = semaphore
+
+
 @attr.s(auto_attribs=True, slots=True)
 class _ReadWrapper:
     r"""Convenience wrapper to track if a connection to a worker process
@@ -126,6 +144,11 @@ class VectorEnv:
 
 
     All the environments are synchronized on step and reset methods.
+
+    Loading a scene stalls the step of a worker, and the steps of all the
+    others with it. With :p:`max_concurrent_scene_switches`, the workers
+    share a semaphore that caps how many of them load the scene of a forced
+    scene switch of their :ref:`EpisodeIterator` at the same time.
     """
 
     observation_spaces: List[spaces.Dict]
@@ -137,6 +160,7 @@ class VectorEnv:
     _mp_ctx: BaseContext
     _connection_read_fns: List[_ReadWrapper]
     _connection_write_fns: List[_WriteWrapper]
+    _scene_switch_semaphore: Optional[Any]
 
     def __init__(
         self,
@@ -145,6 +169,7 @@ class VectorEnv:
         auto_reset_done: bool = True,
         multiprocessing_start_method: str = "forkserver",
         workers_ignore_signals: bool = False,
+        max_concurrent_scene_switches: int = -1,
     ) -> None:
         """..
 
@@ -162,6 +187,9 @@ class VectorEnv:
             used, the subproccess  must be started before any other GPU usage.
         :param workers_ignore_signals: Whether or not workers will ignore SIGINT and SIGTERM
             and instead will only exit when :ref:`close` is called
+        :param max_concurrent_scene_switches: number of workers that may
+            switch scenes at the same time, :py:`-1` for no limit. The other
+            workers keep running episodes of their current scene.
         """
         self._is_closed = True
 
@@ -176,6 +204,11 @@ class VectorEnv:
         ).format(self._valid_start_methods, multiprocessing_start_method)
         self._auto_reset_done = auto_reset_done
         self._mp_ctx = mp.get_context(multiprocessing_start_method)
+        self._scene_switch_semaphore = (
+            self._mp_ctx.BoundedSemaphore(max_concurrent_scene_switches)
+            if max_concurrent_scene_switches > 0
+            else None
+        )
         self._workers = []
         (
             self._connection_read_fns,
@@ -221,6 +254,7 @@ class VectorEnv:
         mask_signals: bool = False,
         child_pipe: Optional[Connection] = None,
         parent_pipe: Optional[Connection] = None,
+        scene_switch_semaphore: Optional[Any] = None,
     ) -> None:
         r"""process worker for creating and interacting with the environment."""
         if mask_signals:
@@ -231,6 +265,8 @@ class VectorEnv:
             signal.signal(signal.SIGUSR2, signal.SIG_IGN)
 
         env = env_fn(*env_fn_args)
+        if scene_switch_semaphore is not None:
+            _set_scene_switch_semaphore(env, scene_switch_semaphore)
         if parent_pipe is not None:
             parent_pipe.close()
         try:
@@ -322,6 +358,7 @@ class VectorEnv:
                     workers_ignore_signals,
                     worker_conn,
                     parent_conn,
+                    self._scene_switch_semaphore,
                 ),
             )
             self._workers.append(cast(mp.Process, ps))
@@ -631,6 +668,9 @@ class ThreadedVectorEnv(VectorEnv):
                     env_args,
                     self._auto_reset_done,
                 ),
+                kwargs={
+                    "scene_switch_semaphore": self._scene_switch_semaphore
+                },
             )
             self._workers.append(thread)
             thread.daemon = True
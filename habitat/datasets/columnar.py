@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Columnar, memory-mappable on-disk format for episode datasets.
+
+Loading a split stored as ``{split}.json.gz`` decompresses and parses every
+episode of the split, even when only the episodes of a few scenes are needed
+(typically by each of the workers of a ``VectorEnv``). The columnar format
+stores the same episodes in a ``{split}.columnar`` directory next to it,
+sorted by scene:
+
+-   ``index.json``: the row range of every scene and the top-level fields
+    of the split file other than ``episodes``.
+-   ``scene_attrs/{scene}.json``: the top-level fields of the per-scene
+    content files, if any (``goals_by_category`` for ObjectNav).
+-   ``start_position.npy``, ``start_rotation.npy``: one float32 row per
+    episode.
+-   ``goal_offsets.npy``, ``goal_position.npy``, ``goal_radius.npy``: the
+    goals of episode ``i`` are rows
+    ``goal_offsets[i]:goal_offsets[i + 1]``. A missing radius is ``NaN``.
+-   ``extra_offsets.npy``, ``extra.npy``: every other field of episode
+    ``i``, including the goal fields that have no column, is a JSON object
+    stored as bytes ``extra[extra_offsets[i]:extra_offsets[i + 1]]``.
+-   ``file_index.npy``: the position of every episode in the JSON file it
+    was read from, that datasets which number their episodes by it
+    restore.
+
+Arrays are memory mapped, so reading the episodes of a scene only touches
+the pages of its rows. Datasets are converted with:
+
+.. code:: sh
+
+    python -m habitat.datasets.columnar \
+        data/datasets/pointnav/gibson/v1/train/train.json.gz
+
+and are then picked up automatically by :ref:`PointNavDatasetV1` and its
+subclasses, or loaded from ``DATASET.COLUMNAR_PATH`` if it is set.
+
+The workers of a ``VectorEnv`` that memory map the same columnar dataset
+share its pages instead of each holding a copy of the episodes, see
+:ref:`share_columnar_dataset`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from habitat.core.dataset import Dataset
+from habitat.datasets.json_loading import json_loads, read_json_file
+
+COLUMNAR_FORMAT_VERSION = 2
+COLUMNAR_DATASET_EXTENSION = ".columnar"
+DEFAULT_CONTENT_SCENES_PATH = "{data_path}/content/{scene}.json.gz"
+_INDEX_FILE = "index.json"
+_SCENE_ATTRS_DIR = "scene_attrs"
+_COLUMN_FIELDS = ("start_position", "start_rotation")
+_GOAL_FIELDS = ("position", "radius")
+
+
+def columnar_dataset_path(datasetfile_path: str) -> str:
+    r"""Returns the path of the columnar version of the dataset stored in
+    :p:`datasetfile_path`, ``.../train.json.gz`` -> ``.../train.columnar``.
+    """
+    for ext in [".json.gz", ".json"]:
+        if datasetfile_path.endswith(ext):
+            datasetfile_path = datasetfile_path[: -len(ext)]
+            break
+    return datasetfile_path + COLUMNAR_DATASET_EXTENSION
+
+
+def _goal_columns(goal: Dict[str, Any]) -> List[float]:
+    position = goal.get("position")
+    radius = goal.get("radius")
+    return [
+        *(position if position is not None else [np.nan] * 3),
+        radius if radius is not None else np.nan,
+    ]
+
+
+def write_columnar_dataset(
+    path: str,
+    episodes: Iterable[Dict[str, Any]],
+    attrs: Optional[Dict[str, Any]] = None,
+    scene_attrs: Optional[Dict[str, Dict[str, Any]]] = None,
+    file_indices: Optional[Sequence[int]] = None,
+) -> None:
+    r"""Writes episodes in the columnar format.
+
+    :param path: the ``.columnar`` directory to write, it is replaced if it
+        exists.
+    :param episodes: episodes as they are serialized in the JSON datasets.
+    :param attrs: top-level fields of the dataset other than ``episodes``.
+    :param scene_attrs: top-level fields specific to some scenes, only
+        loaded along with the episodes of those scenes.
+    :param file_indices: positions of the episodes in the files they were
+        read from, defaults to their positions in :p:`episodes`.
+    """
+    ColumnarEpisodes.from_episodes(
+        episodes, attrs=attrs, sort_by_scene=True, file_indices=file_indices
+    ).save(path, scene_attrs=scene_attrs)
+
+
+def convert_dataset_to_columnar(
+    datasetfile_path: str, output_path: Optional[str] = None
+) -> str:
+    r"""Converts a JSON dataset, along with its per-scene content files if
+    it has any, to the columnar format.
+
+    :param datasetfile_path: path of the ``{split}.json.gz`` file.
+    :param output_path: where to write the converted dataset, defaults to
+        :ref:`columnar_dataset_path`.
+    :return: the path of the converted dataset.
+    """
+    if output_path is None:
+        output_path = columnar_dataset_path(datasetfile_path)
+
+    attrs = read_json_file(datasetfile_path)
+    episodes = attrs.pop("episodes")
+    file_indices = list(range(len(episodes)))
+    scene_attrs: Dict[str, Dict[str, Any]] = {}
+
+    content_dir, content_ext = _content_dir(
+        datasetfile_path,
+        attrs.pop("content_scenes_path", DEFAULT_CONTENT_SCENES_PATH),
+    )
+    if os.path.isdir(content_dir):
+        for filename in sorted(os.listdir(content_dir)):
+            if not filename.endswith(content_ext):
+                continue
+            scene_content = read_json_file(os.path.join(content_dir, filename))
+            scene_episodes = scene_content.pop("episodes")
+            episodes.extend(scene_episodes)
+            file_indices.extend(range(len(scene_episodes)))
+            if len(scene_episodes) > 0 and len(scene_content) > 0:
+                scene = Dataset.scene_from_scene_path(
+                    scene_episodes[0]["scene_id"]
+                )
+                scene_attrs[scene] = scene_content
+
+    write_columnar_dataset(
+        output_path, episodes, attrs, scene_attrs, file_indices
+    )
+    return output_path
+
+
+def _content_dir(
+    datasetfile_path: str, content_scenes_path: str
+) -> Tuple[str, str]:
+    r"""Returns the directory of the content files of the dataset and their
+    extension.
+    """
+    content_dir, content_ext = content_scenes_path.split("{scene}")
+    return (
+        content_dir.format(data_path=os.path.dirname(datasetfile_path)),
+        content_ext,
+    )
+
+
+def share_columnar_dataset(
+    datasetfile_path: str,
+    shared_dir: str,
+    content_scenes_path: str = DEFAULT_CONTENT_SCENES_PATH,
+) -> str:
+    r"""Returns the path of a columnar version of a JSON dataset that
+    processes can memory map to share its episodes.
+
+    A columnar dataset next to :p:`datasetfile_path` is used if there is
+    one. Otherwise the dataset is converted once into :p:`shared_dir`,
+    typically a ``tmpfs`` like ``/dev/shm``, and the conversion is reused for
+    as long as the split file and its content directory are unchanged.
+
+    :param content_scenes_path: path of the content files of the dataset
+        type, see ``PointNavDatasetV1.content_scenes_path``.
+    """
+    columnar_path = columnar_dataset_path(datasetfile_path)
+    if os.path.isdir(columnar_path):
+        return columnar_path
+
+    datasetfile_path = os.path.abspath(datasetfile_path)
+    content_dir, _ = _content_dir(datasetfile_path, content_scenes_path)
+    key = hashlib.sha1(
+        "{}:{}:{}:{}".format(
+            COLUMNAR_FORMAT_VERSION,
+            datasetfile_path,
+            os.path.getmtime(datasetfile_path),
+            os.path.getmtime(content_dir)
+            if os.path.isdir(content_dir)
+            else None,
+        ).encode("utf-8")
+    ).hexdigest()[:16]
+    shared_path = os.path.join(
+        shared_dir,
+        columnar_dataset_path(os.path.basename(datasetfile_path))[
+            : -len(COLUMNAR_DATASET_EXTENSION)
+        ]
+        + f"-{key}"
+        + COLUMNAR_DATASET_EXTENSION,
+    )
+    if not os.path.isdir(shared_path):
+        os.makedirs(shared_dir, exist_ok=True)
+        convert_dataset_to_columnar(datasetfile_path, shared_path)
+    return shared_path
+
+
+class ColumnarEpisodes:
+    r"""Episodes stored as rows of arrays, either built in memory with
+    :ref:`from_episodes` or memory mapped from disk with :ref:`load`.
+
+    :property scene_names: names of the scenes of the episodes.
+    :property scene_index: for every row, the index of its scene in
+        :ref:`scene_names`.
+    """
+
+    _ARRAYS = (
+        "start_position",
+        "start_rotation",
+        "goal_offsets",
+        "goal_position",
+        "goal_radius",
+        "extra_offsets",
+        "extra",
+        "file_index",
+    )
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        scene_names: List[str],
+        scene_index: np.ndarray,
+        attrs: Optional[Dict[str, Any]] = None,
+        path: Optional[str] = None,
+        scene_ranges: Optional[Dict[str, List[int]]] = None,
+    ) -> None:
+        self.start_position: np.ndarray = arrays["start_position"]
+        self.start_rotation: np.ndarray = arrays["start_rotation"]
+        self.goal_offsets: np.ndarray = arrays["goal_offsets"]
+        self.goal_position: np.ndarray = arrays["goal_position"]
+        self.goal_radius: np.ndarray = arrays["goal_radius"]
+        self.extra_offsets: np.ndarray = arrays["extra_offsets"]
+        self.extra: np.ndarray = arrays["extra"]
+        self.file_index: np.ndarray = arrays["file_index"]
+        self.scene_names = scene_names
+        self.scene_index = scene_index
+        self.attrs: Dict[str, Any] = attrs or {}
+        self.path = path
+        # [start, stop) rows of every scene, if the rows of each scene are
+        # contiguous
+        self._scene_ranges = (
+            scene_ranges
+            if scene_ranges is not None
+            else self._contiguous_scene_ranges(scene_names, scene_index)
+        )
+
+    @staticmethod
+    def _contiguous_scene_ranges(
+        scene_names: List[str], scene_index: np.ndarray
+    ) -> Optional[Dict[str, List[int]]]:
+        starts = np.flatnonzero(
+            np.diff(scene_index, prepend=np.int32(-1)) != 0
+        )
+        codes = scene_index[starts].tolist()
+        if len(set(codes)) != len(codes):
+            return None
+        stops = [*starts[1:].tolist(), len(scene_index)]
+        return {
+            scene_names[code]: [start, stop]
+            for code, start, stop in zip(codes, starts.tolist(), stops)
+        }
+
+    @classmethod
+    def from_episodes(
+        cls,
+        episodes: Iterable[Dict[str, Any]],
+        attrs: Optional[Dict[str, Any]] = None,
+        sort_by_scene: bool = False,
+        file_indices: Optional[Sequence[int]] = None,
+    ) -> "ColumnarEpisodes":
+        r"""Packs episodes, as they are serialized in the JSON datasets,
+        into arrays.
+
+        :param sort_by_scene: if :py:`True`, the rows are sorted by scene,
+            which is required by :ref:`save`. Otherwise they keep the order
+            of :p:`episodes`.
+        :param file_indices: positions of the episodes in the files they
+            were read from, defaults to their positions in :p:`episodes`.
+        """
+        episodes = list(episodes)
+        file_index = np.array(
+            file_indices if file_indices is not None else range(len(episodes)),
+            dtype=np.int64,
+        )
+        if sort_by_scene:
+            order = sorted(
+                range(len(episodes)),
+                key=lambda i: Dataset.scene_from_scene_path(
+                    episodes[i]["scene_id"]
+                ),
+            )
+            episodes = [episodes[i] for i in order]
+            file_index = file_index[np.array(order, dtype=np.int64)]
+        num_episodes = len(episodes)
+
+        scene_codes: Dict[str, int] = {}
+        scene_index = np.zeros(num_episodes, dtype=np.int32)
+        start_position = np.zeros((num_episodes, 3), dtype=np.float32)
+        start_rotation = np.zeros((num_episodes, 4), dtype=np.float32)
+        goal_offsets = np.zeros(num_episodes + 1, dtype=np.int64)
+        goals: List[List[float]] = []
+        extra_offsets = np.zeros(num_episodes + 1, dtype=np.int64)
+        extra = bytearray()
+        for i, episode in enumerate(episodes):
+            scene = Dataset.scene_from_scene_path(episode["scene_id"])
+            scene_index[i] = scene_codes.setdefault(scene, len(scene_codes))
+
+            start_position[i] = episode["start_position"]
+            start_rotation[i] = episode["start_rotation"]
+
+            fields = {
+                k: v
+                for k, v in episode.items()
+                if k not in _COLUMN_FIELDS and k != "goals"
+            }
+            episode_goals = episode.get("goals")
+            if episode_goals is not None:
+                goals.extend(map(_goal_columns, episode_goals))
+                # Goal fields that have no column, e.g. the object ids of
+                # ObjectNav goals, stay in the JSON object
+                fields["goals"] = [
+                    {k: v for k, v in goal.items() if k not in _GOAL_FIELDS}
+                    for goal in episode_goals
+                ]
+            goal_offsets[i + 1] = len(goals)
+
+            extra.extend(json.dumps(fields).encode("utf-8"))
+            extra_offsets[i + 1] = len(extra)
+
+        goal_columns = np.array(goals, dtype=np.float32).reshape(-1, 4)
+        arrays = dict(
+            start_position=start_position,
+            start_rotation=start_rotation,
+            goal_offsets=goal_offsets,
+            goal_position=np.ascontiguousarray(goal_columns[:, :3]),
+            goal_radius=np.ascontiguousarray(goal_columns[:, 3]),
+            extra_offsets=extra_offsets,
+            extra=np.frombuffer(bytes(extra), dtype=np.uint8),
+            file_index=file_index,
+        )
+        return cls(arrays, list(scene_codes.keys()), scene_index, attrs)
+
+    @classmethod
+    def load(cls, path: str) -> "ColumnarEpisodes":
+        r"""Memory maps a dataset written by :ref:`save`."""
+        with open(os.path.join(path, _INDEX_FILE), "r") as f:
+            index = json.load(f)
+        assert index["version"] == COLUMNAR_FORMAT_VERSION, (
+            f"Unsupported columnar dataset version {index['version']}, "
+            "convert the dataset again"
+        )
+
+        arrays = {
+            name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            for name in cls._ARRAYS
+        }
+        scene_names = list(index["scenes"].keys())
+        scene_index = np.zeros(len(arrays["start_position"]), dtype=np.int32)
+        for code, (start, stop) in enumerate(index["scenes"].values()):
+            scene_index[start:stop] = code
+
+        return cls(
+            arrays,
+            scene_names,
+            scene_index,
+            index["attrs"],
+            path,
+            scene_ranges=index["scenes"],
+        )
+
+    def save(
+        self,
+        path: str,
+        scene_attrs: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        r"""Writes the episodes to the :p:`path` directory, replacing it if
+        it exists. The rows must be sorted by scene.
+        """
+        scene_ranges: Dict[str, List[int]] = {}
+        for i, code in enumerate(self.scene_index.tolist()):
+            scene_ranges.setdefault(self.scene_names[code], [i, i])[1] = i + 1
+        assert sum(stop - start for start, stop in scene_ranges.values()) == (
+            len(self)
+        ), "The episodes must be sorted by scene to be saved"
+
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(os.path.join(tmp_path, _SCENE_ATTRS_DIR))
+
+        with open(os.path.join(tmp_path, _INDEX_FILE), "w") as f:
+            json.dump(
+                {
+                    "version": COLUMNAR_FORMAT_VERSION,
+                    "scenes": scene_ranges,
+                    "attrs": self.attrs,
+                },
+                f,
+            )
+        for scene, scene_fields in (scene_attrs or {}).items():
+            with open(
+                os.path.join(tmp_path, _SCENE_ATTRS_DIR, scene + ".json"), "w"
+            ) as f:
+                json.dump(scene_fields, f)
+
+        for name in self._ARRAYS:
+            np.save(os.path.join(tmp_path, name + ".npy"), getattr(self, name))
+
+        # Readers never see a partially written dataset
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process wrote the dataset in the meantime
+            if not os.path.isdir(path):
+                raise
+            shutil.rmtree(tmp_path)
+
+    def __len__(self) -> int:
+        return len(self.start_position)
+
+    @property
+    def scenes(self) -> List[str]:
+        r"""Names of the scenes of the dataset, sorted."""
+        return sorted(self.scene_names)
+
+    def scene_rows(self, scene: str) -> np.ndarray:
+        r"""Rows of the episodes of :p:`scene`, empty if there are none."""
+        if self._scene_ranges is not None:
+            start, stop = self._scene_ranges.get(scene, (0, 0))
+            return np.arange(start, stop, dtype=np.int64)
+        if scene not in self.scene_names:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(
+            self.scene_index == self.scene_names.index(scene)
+        )
+
+    def scene_attrs(self, scene: str) -> Dict[str, Any]:
+        r"""Top-level fields of the content file of :p:`scene`."""
+        if self.path is None:
+            return {}
+        path = os.path.join(self.path, _SCENE_ATTRS_DIR, scene + ".json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def episode(self, index: int) -> Dict[str, Any]:
+        r"""Returns episode :p:`index` as it is serialized in the JSON
+        datasets.
+        """
+        return self.episodes([index])[0]
+
+    def episodes(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        r"""Returns the episodes of :p:`rows`, see :ref:`episode`."""
+        # A single JSON document for all the rows is much faster to parse
+        episodes = json_loads(
+            b"["
+            + b",".join(
+                self.extra[
+                    self.extra_offsets[row] : self.extra_offsets[row + 1]
+                ].tobytes()
+                for row in rows
+            )
+            + b"]"
+        )
+        start_position = self.start_position[rows].tolist()
+        start_rotation = self.start_rotation[rows].tolist()
+        for episode, row, position, rotation in zip(
+            episodes, rows, start_position, start_rotation
+        ):
+            episode["start_position"] = position
+            episode["start_rotation"] = rotation
+
+            goals = episode.get("goals")
+            if goals is not None:
+                for goal, goal_row in zip(
+                    goals,
+                    range(self.goal_offsets[row], self.goal_offsets[row + 1]),
+                ):
+                    position = self.goal_position[goal_row]
+                    if not np.isnan(position).any():
+                        goal["position"] = position.tolist()
+                    radius = self.goal_radius[goal_row]
+                    goal["radius"] = (
+                        None if np.isnan(radius) else float(radius)
+                    )
+
+        return episodes
+
+    def scene_episodes(self, scene: str) -> List[Dict[str, Any]]:
+        r"""Returns the episodes of :p:`scene`, see :ref:`episode`."""
+        return self.episodes(self.scene_rows(scene))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts a JSON episode dataset to the columnar format"
+    )
+    parser.add_argument(
+        "datasets",
+        nargs="+",
+        help="paths of the {split}.json.gz files to convert",
+    )
+    args = parser.parse_args()
+
+    for datasetfile_path in args.datasets:
+        output_path = convert_dataset_to_columnar(datasetfile_path)
+        print(f"{datasetfile_path} -> {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""On-disk cache of loaded datasets.
+
+With ``DATASET.CACHE_DIR`` set, :ref:`make_dataset` pickles every dataset it
+loads into that directory and later loads of the same dataset unpickle it
+instead of parsing the JSON files again. Entries are keyed by the dataset
+class, the ``DATASET`` config and the paths, sizes and modification times
+of the dataset files, so they are never stale: an updated file or a
+different ``CONTENT_SCENES`` gives a new entry. Old entries are never
+removed, delete the directory to reclaim space.
+
+The cache file is the pickle protocol 5 stream of the dataset followed by
+its out-of-band buffers (the numpy arrays), which are loaded without being
+copied.
+"""
+
+import gc
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+from typing import Any, Callable, List, cast
+
+from habitat.config import Config
+from habitat.core.dataset import Dataset, LazyEpisodeStore
+from habitat.core.logging import logger
+
+if sys.version_info[:2] < (3, 8):
+    import pickle5 as pickle
+else:
+    import pickle
+
+# Bump when the pickled form of the datasets changes
+DATASET_CACHE_VERSION = 2
+# Fields of the DATASET config that don't change the loaded dataset
+_IGNORED_CONFIG_KEYS = {"CACHE_DIR", "NUM_LOADER_WORKERS", "LOADER_POOL"}
+_HEADER = struct.Struct("<Q")
+
+
+def _dataset_files(config: Config) -> List[str]:
+    r"""Files that the dataset is loaded from: the directory of the split
+    file, which holds the per-scene files, and the columnar dataset.
+    """
+    datasetfile_path = config.DATA_PATH.format(split=config.SPLIT)
+    # A split file without a directory is hashed alone rather than the
+    # whole working directory
+    roots = [os.path.dirname(datasetfile_path) or datasetfile_path]
+    if config.get("COLUMNAR_PATH", ""):
+        roots.append(config.COLUMNAR_PATH.format(split=config.SPLIT))
+
+    files = []
+    for root in roots:
+        if os.path.isfile(root):
+            files.append(root)
+        for dirpath, _, filenames in os.walk(root):
+            files.extend(os.path.join(dirpath, f) for f in filenames)
+    return sorted(files)
+
+
+def dataset_cache_path(dataset_type: type, config: Config) -> str:
+    r"""Returns the path of the cache entry of the :p:`dataset_type`
+    dataset loaded with :p:`config`.
+    """
+    key = {
+        "version": DATASET_CACHE_VERSION,
+        "type": f"{dataset_type.__module__}.{dataset_type.__qualname__}",
+        "config": {
+            k: v for k, v in config.items() if k not in _IGNORED_CONFIG_KEYS
+        },
+        "files": [
+            (path, os.path.getsize(path), os.path.getmtime(path))
+            for path in _dataset_files(config)
+        ],
+    }
+    digest = hashlib.sha1(
+        json.dumps(key, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(config.CACHE_DIR, f"{digest}.pkl")
+
+
+def save_dataset(dataset: Dataset, path: str) -> None:
+    r"""Pickles :p:`dataset` to :p:`path`. The file is written under another
+    name and then renamed, readers never see a partial file.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(dataset, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    chunks = [memoryview(data), *raw_buffers]
+    with open(tmp_path, "wb") as f:
+        # Number of buffers, size of every chunk, then the chunks
+        f.write(_HEADER.pack(len(raw_buffers)))
+        for chunk in chunks:
+            f.write(_HEADER.pack(chunk.nbytes))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def load_dataset(path: str) -> Dataset:
+    r"""Unpickles a dataset saved with :ref:`save_dataset`."""
+    # The arrays of the dataset are views of this buffer, which must be
+    # writable for them to be
+    content = memoryview(bytearray(os.path.getsize(path)))
+    with open(path, "rb") as f:
+        cast(io.BufferedReader, f).readinto(content)
+
+    (num_buffers,) = _HEADER.unpack_from(content, 0)
+    offset = _HEADER.size
+    sizes: List[int] = []
+    for _ in range(num_buffers + 1):
+        sizes.append(_HEADER.unpack_from(content, offset)[0])
+        offset += _HEADER.size
+
+    chunks = []
+    for size in sizes:
+        chunks.append(content[offset : offset + size])
+        offset += size
+
+    # Unpickling allocates millions of objects, none of which are garbage,
+    # and the garbage collector would go through all of them many times
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(chunks[0], buffers=chunks[1:])
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def make_cached_dataset(
+    dataset_type: Callable[..., Dataset], config: Config, **kwargs: Any
+) -> Dataset:
+    r"""Loads the :p:`dataset_type` dataset of :p:`config` from
+    :p:`config.CACHE_DIR`, or loads it and adds it to the cache.
+    """
+    path = dataset_cache_path(dataset_type, config)  # type: ignore
+    if os.path.exists(path):
+        try:
+            dataset = load_dataset(path)
+            logger.info(f"Loaded dataset from cache {path}")
+            return dataset
+        except Exception as e:
+            logger.warning(f"Failed to load the cached dataset {path}: {e}")
+
+    dataset = dataset_type(config=config, **kwargs)
+    # Lazy episodes are already cheap to load and are only views of the files
+    if not isinstance(dataset.episodes, LazyEpisodeStore):
+        save_dataset(dataset, path)
+    return dataset
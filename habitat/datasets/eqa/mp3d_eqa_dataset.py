@@ -13,9 +13,9 @@ from habitat.config import Config
 from habitat.core.dataset import Dataset
 from habitat.core.registry import registry
 from habitat.core.simulator import AgentState
+from habitat.datasets.shortest_paths import shortest_path_from_json
 from habitat.datasets.utils import VocabDict
 from habitat.tasks.eqa.eqa import EQAEpisode, QuestionData
-from habitat.tasks.nav.nav import ShortestPathPoint
 from habitat.tasks.nav.object_nav_task import ObjectGoal
 
 EQA_MP3D_V1_VAL_EPISODE_COUNT = 1950
@@ -97,7 +97,8 @@ class Matterport3dDatasetV1(Dataset):
                             **agent_state
                         )
             if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        path[p_index] = ShortestPathPoint(**point)
+                episode.shortest_paths = [
+                    shortest_path_from_json(path)
+                    for path in episode.shortest_paths
+                ]
             self.episodes[ep_index] = episode
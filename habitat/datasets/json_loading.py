@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Reading of the JSON files of the datasets, optionally in parallel.
+
+``orjson`` is used to parse the files when it is installed, it is several
+times faster than the ``json`` module of the standard library.
+"""
+
+import collections
+import concurrent.futures
+import gzip
+import json
+import multiprocessing
+from typing import Any, Deque, Dict, Iterator, Sequence, Type, Union
+
+from habitat.core.logging import logger
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+LOADER_POOLS = ("thread", "process")
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    r"""Parses a JSON document with the fastest backend available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than json, e.g. it rejects NaN
+            pass
+    return json.loads(data)
+
+
+def read_json_file(path: str) -> Dict[str, Any]:
+    r"""Reads a JSON file, decompressing it if its name ends with ``.gz``."""
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as gz_file:
+            return json_loads(gz_file.read())
+    with open(path, "rb") as json_file:
+        return json_loads(json_file.read())
+
+
+def read_json_files(
+    paths: Sequence[str], num_workers: int = 0, pool: str = "thread"
+) -> Iterator[Dict[str, Any]]:
+    r"""Reads JSON files in a pool of workers and yields their content in
+    the order of :p:`paths`, as soon as it is available.
+
+    Only a few files are read ahead of the one that is yielded, so that the
+    parsed files don't pile up when the consumer is slower than the pool.
+
+    :param paths: files to read, see :ref:`read_json_file`.
+    :param num_workers: number of workers of the pool, the files are read
+        one after the other in the calling thread if it is 0.
+    :param pool: ``"thread"``, decompression runs in parallel but parsing
+        holds the GIL, or ``"process"``, everything runs in parallel but
+        the parsed files are pickled back to the calling process. Daemonic
+        processes, e.g. the workers of a ``VectorEnv``, can't start
+        processes and use threads instead.
+    """
+    assert pool in LOADER_POOLS, f"Unknown pool {pool}, one of {LOADER_POOLS}"
+    if num_workers <= 0 or len(paths) <= 1:
+        for path in paths:
+            yield read_json_file(path)
+        return
+
+    executor_class: Union[
+        Type[concurrent.futures.ThreadPoolExecutor],
+        Type[concurrent.futures.ProcessPoolExecutor],
+    ] = concurrent.futures.ThreadPoolExecutor
+    if pool == "process":
+        if multiprocessing.current_process().daemon:
+            logger.warning(
+                "Daemonic processes can't have children, reading the "
+                "dataset files in threads"
+            )
+        else:
+            executor_class = concurrent.futures.ProcessPoolExecutor
+
+    with executor_class(max_workers=num_workers) as executor:
+        pending: Deque[concurrent.futures.Future] = collections.deque()
+        paths_iter = iter(paths)
+        for path in paths_iter:
+            pending.append(executor.submit(read_json_file, path))
+            if len(pending) >= 2 * num_workers:
+                break
+
+        while len(pending) > 0:
+            content = pending.popleft().result()
+            path = next(paths_iter, None)
+            if path is not None:
+                pending.append(executor.submit(read_json_file, path))
+            yield content
@@ -4,7 +4,6 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import json
 import os
 from typing import Any, Dict, List, Optional, Sequence
 
@@ -17,6 +16,7 @@ from habitat.datasets.pointnav.pointnav_dataset import (
     DEFAULT_SCENE_PATH_PREFIX,
     PointNavDatasetV1,
 )
+from habitat.datasets.shortest_paths import CompactShortestPath
 from habitat.tasks.nav.object_nav_task import (
     ObjectGoal,
     ObjectGoalNavEpisode,
@@ -31,6 +31,7 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
     category_to_scene_annotation_category_id: Dict[str, int]
     episodes: List[ObjectGoalNavEpisode] = []  # type: ignore
     content_scenes_path: str = "{data_path}/content/{scene}.json.gz"
+    _supports_lazy_episodes = False
     goals_by_category: Dict[str, Sequence[ObjectGoal]]
 
     @staticmethod
@@ -85,10 +86,9 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
 
         return g
 
-    def from_json(
-        self, json_str: str, scenes_dir: Optional[str] = None
+    def _load_deserialized(
+        self, deserialized: Dict[str, Any], scenes_dir: Optional[str] = None
     ) -> None:
-        deserialized = json.loads(json_str)
         if CONTENT_SCENES_PATH_FIELD in deserialized:
             self.content_scenes_path = deserialized[CONTENT_SCENES_PATH_FIELD]
 
@@ -124,7 +124,9 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
         for k, v in deserialized["goals_by_category"].items():
             self.goals_by_category[k] = [self.__deserialize_goal(g) for g in v]
 
-        for i, episode in enumerate(deserialized["episodes"]):
+        for i, episode in zip(
+            self._file_indices(deserialized), deserialized["episodes"]
+        ):
             episode = ObjectGoalNavEpisode(**episode)
             episode.episode_id = str(i)
 
@@ -139,7 +141,12 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
             episode.goals = self.goals_by_category[episode.goals_key]
 
             if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
+                for path_index, path in enumerate(episode.shortest_paths):
+                    if isinstance(path, dict):
+                        episode.shortest_paths[
+                            path_index
+                        ] = CompactShortestPath.from_json(path)
+                        continue
                     for p_index, point in enumerate(path):
                         if point is None or isinstance(point, (int, str)):
                             point = {
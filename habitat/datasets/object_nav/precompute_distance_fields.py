@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Offline computation of the geodesic distance fields of the view points
+of the object categories of an ObjectNav dataset.
+
+A file per scene is written to the output directory, with the
+:ref:`GeodesicDistanceField` of every category of the scene on every floor
+that an episode of the category starts on. With
+``TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD.CACHE_DIR`` set to that directory,
+:ref:`DistanceToGoal` loads them instead of computing them:
+
+.. code:: sh
+
+    python -m habitat.datasets.object_nav.precompute_distance_fields \
+        --config configs/tasks/objectnav_mp3d.yaml \
+        --output-dir data/distance_fields/objectnav_mp3d --num-workers 8
+
+Scenes whose file exists are skipped, an interrupted run can be resumed.
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+from collections import defaultdict
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import tqdm
+
+from habitat.config import Config
+from habitat.config.default import get_config
+from habitat.datasets import make_dataset
+from habitat.sims import make_sim
+from habitat.tasks.nav.geodesic_distance_field import (
+    MAX_FLOOR_DISTANCE,
+    GeodesicDistanceField,
+    GeodesicDistanceFieldCache,
+    save_distance_fields,
+)
+from habitat.tasks.nav.nav import DistanceToGoal
+from habitat.tasks.nav.object_nav_task import ObjectGoalNavEpisode
+
+if TYPE_CHECKING:
+    from habitat.sims.habitat_simulator.habitat_simulator import HabitatSim
+
+# View points and floor heights of a category of a scene
+SceneFieldSpecs = Dict[
+    str, Tuple[List[Tuple[float, float, float]], List[float]]
+]
+
+
+def make_pathfinder_sim(sim_config: Config, scene_id: str) -> "HabitatSim":
+    r"""Creates the simulator of :p:`sim_config` without sensors for
+    :p:`scene_id`.
+    """
+    sim_config = sim_config.clone()
+    sim_config.defrost()
+    sim_config.SCENE = scene_id
+    sim_config.AGENT_0.SENSORS = []
+    sim_config.freeze()
+    return make_sim(sim_config.TYPE, config=sim_config)
+
+
+def get_floor_heights(heights: Sequence[float]) -> List[float]:
+    r"""Returns heights such that each of :p:`heights` is on the floor of
+    one of them.
+    """
+    floors: List[float] = []
+    for height in sorted(heights):
+        if not floors or height - floors[-1] > MAX_FLOOR_DISTANCE:
+            floors.append(height)
+    return floors
+
+
+def get_scene_field_specs(
+    episodes: Sequence[ObjectGoalNavEpisode],
+) -> Dict[str, SceneFieldSpecs]:
+    r"""Returns the view points of the categories of the scenes of
+    :p:`episodes` and the floors that they start on, by scene id.
+    """
+    start_heights: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    view_points = {}
+    for episode in episodes:
+        key = (episode.scene_id, episode.goals_key)
+        start_heights[key].append(episode.start_position[1])
+        if key not in view_points:
+            view_points[key] = DistanceToGoal.get_view_point_positions(
+                episode.goals
+            )
+
+    specs: Dict[str, SceneFieldSpecs] = defaultdict(dict)
+    for (scene_id, goals_key), heights in start_heights.items():
+        specs[scene_id][goals_key] = (
+            view_points[(scene_id, goals_key)],
+            get_floor_heights(heights),
+        )
+    return specs
+
+
+def precompute_scene_distance_fields(
+    scene_id: str,
+    field_specs: SceneFieldSpecs,
+    output_dir: str,
+    sim_config: Config,
+    meters_per_pixel: float = 0.05,
+    make_sim_fn: Callable[[Config, str], "HabitatSim"] = make_pathfinder_sim,
+) -> str:
+    r"""Computes the fields of a scene into its file in :p:`output_dir`.
+
+    :param field_specs: view points and floor heights of the categories of
+        the scene, see :ref:`get_scene_field_specs`.
+    :param sim_config: config of the simulator the scene is loaded in.
+    :return: the path of the file of the scene.
+    """
+    path = GeodesicDistanceFieldCache.scene_file_path(output_dir, scene_id)
+    if os.path.exists(path):
+        return path
+
+    fields: Dict[str, List[GeodesicDistanceField]] = {}
+    sim = make_sim_fn(sim_config, scene_id)
+    try:
+        for goals_key, (view_points, heights) in field_specs.items():
+            fields[goals_key] = []
+            for height in heights:
+                field = GeodesicDistanceField.from_pathfinder(
+                    sim.pathfinder,
+                    view_points,
+                    height=height,
+                    meters_per_pixel=meters_per_pixel,
+                )
+                if field is not None:
+                    fields[goals_key].append(field)
+    finally:
+        sim.close()
+    save_distance_fields(path, fields)
+    return path
+
+
+def precompute_distance_fields(
+    config: Config,
+    output_dir: str,
+    num_workers: int = 1,
+    make_sim_fn: Callable[[Config, str], "HabitatSim"] = make_pathfinder_sim,
+    episodes: Optional[Sequence[ObjectGoalNavEpisode]] = None,
+) -> List[str]:
+    r"""Computes the fields of the scenes of the dataset of :p:`config`,
+    each in a process of a pool of :p:`num_workers`.
+
+    :param episodes: episodes to compute the fields of instead of those of
+        the dataset.
+    :return: the paths of the files of the scenes.
+    """
+    if episodes is None:
+        episodes = make_dataset(
+            config.DATASET.TYPE, config=config.DATASET
+        ).episodes
+    scene_specs = get_scene_field_specs(episodes)
+
+    precompute_fn = functools.partial(
+        _precompute_scene,
+        output_dir=output_dir,
+        sim_config=config.SIMULATOR,
+        meters_per_pixel=config.TASK.DISTANCE_TO_GOAL.DISTANCE_FIELD.METERS_PER_PIXEL,
+        make_sim_fn=make_sim_fn,
+    )
+    scene_files = []
+    with tqdm.tqdm(total=len(scene_specs)) as pbar:
+        if num_workers <= 1:
+            for scene_spec in scene_specs.items():
+                scene_files.append(precompute_fn(scene_spec))
+                pbar.update()
+        else:
+            with multiprocessing.Pool(num_workers) as pool:
+                for scene_file in pool.imap(
+                    precompute_fn, scene_specs.items()
+                ):
+                    scene_files.append(scene_file)
+                    pbar.update()
+    return scene_files
+
+
+def _precompute_scene(
+    scene_spec: Tuple[str, SceneFieldSpecs], **kwargs
+) -> str:
+    return precompute_scene_distance_fields(*scene_spec, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Computes the distance fields of the view points of an "
+        "ObjectNav dataset"
+    )
+    parser.add_argument(
+        "--config", type=str, default="configs/tasks/objectnav_mp3d.yaml"
+    )
+    parser.add_argument("--output-dir", type=str, required=True)
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify config options from command line",
+    )
+    args = parser.parse_args()
+
+    config = get_config(args.config, args.opts)
+    scene_files = precompute_distance_fields(
+        config, args.output_dir, num_workers=args.num_workers
+    )
+    print(f"{len(scene_files)} scenes")
+
+
+if __name__ == "__main__":
+    main()
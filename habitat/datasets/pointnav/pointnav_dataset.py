@@ -4,21 +4,28 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import gzip
-import json
+import functools
 import os
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
 
 from habitat.config import Config
-from habitat.core.dataset import ALL_SCENES_MASK, Dataset
+from habitat.core.dataset import ALL_SCENES_MASK, Dataset, LazyEpisodeStore
 from habitat.core.registry import registry
-from habitat.tasks.nav.nav import (
-    NavigationEpisode,
-    NavigationGoal,
-    ShortestPathPoint,
+from habitat.datasets.columnar import ColumnarEpisodes, columnar_dataset_path
+from habitat.datasets.json_loading import (
+    json_loads,
+    read_json_file,
+    read_json_files,
 )
+from habitat.datasets.shortest_paths import shortest_path_from_json
+from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
 
 CONTENT_SCENES_PATH_FIELD = "content_scenes_path"
+# Positions of the episodes of a deserialized dict in their JSON file, when
+# they are not all of the file
+FILE_INDICES_FIELD = "file_indices"
 DEFAULT_SCENE_PATH_PREFIX = "data/scene_datasets/"
 
 
@@ -26,13 +33,26 @@ DEFAULT_SCENE_PATH_PREFIX = "data/scene_datasets/"
 class PointNavDatasetV1(Dataset):
     r"""Class inherited from Dataset that loads Point Navigation dataset."""
 
-    episodes: List[NavigationEpisode]
+    episodes: Sequence[NavigationEpisode]
     content_scenes_path: str = "{data_path}/content/{scene}.json.gz"
+    # Whether DATASET.LAZY_EPISODES is honored, subclasses that build their
+    # episodes differently load them eagerly
+    _supports_lazy_episodes: bool = True
 
     @staticmethod
-    def check_config_paths_exist(config: Config) -> bool:
-        return os.path.exists(
+    def _columnar_path(config: Config) -> str:
+        if config.COLUMNAR_PATH:
+            return config.COLUMNAR_PATH.format(split=config.SPLIT)
+        return columnar_dataset_path(
             config.DATA_PATH.format(split=config.SPLIT)
+        )
+
+    @classmethod
+    def check_config_paths_exist(cls, config: Config) -> bool:
+        datasetfile_path = config.DATA_PATH.format(split=config.SPLIT)
+        return (
+            os.path.exists(datasetfile_path)
+            or os.path.isdir(cls._columnar_path(config))
         ) and os.path.exists(config.SCENES_DIR)
 
     @classmethod
@@ -41,9 +61,12 @@ class PointNavDatasetV1(Dataset):
         episodes.
         """
         assert cls.check_config_paths_exist(config)
-        dataset_dir = os.path.dirname(
-            config.DATA_PATH.format(split=config.SPLIT)
-        )
+        datasetfile_path = config.DATA_PATH.format(split=config.SPLIT)
+        columnar_path = cls._columnar_path(config)
+        if os.path.isdir(columnar_path):
+            return ColumnarEpisodes.load(columnar_path).scenes
+
+        dataset_dir = os.path.dirname(datasetfile_path)
 
         cfg = config.clone()
         cfg.defrost()
@@ -89,18 +112,71 @@ class PointNavDatasetV1(Dataset):
         if config is None:
             return
 
+        lazy = config.LAZY_EPISODES and self._supports_lazy_episodes
         datasetfile_path = config.DATA_PATH.format(split=config.SPLIT)
-        with gzip.open(datasetfile_path, "rt") as f:
-            self.from_json(f.read(), scenes_dir=config.SCENES_DIR)
+        columnar_path = self._columnar_path(config)
+        if os.path.isdir(columnar_path):
+            columnar = ColumnarEpisodes.load(columnar_path)
+            if lazy:
+                self.episodes = self._lazy_episode_store(
+                    columnar, config.CONTENT_SCENES, config.SCENES_DIR
+                )
+            else:
+                self._load_columnar(columnar, config)
+            return
 
-        # Read separate file for each scene
         dataset_dir = os.path.dirname(datasetfile_path)
-        has_individual_scene_files = os.path.exists(
+        if lazy:
+            episodes = []
+            for deserialized in self._read_dataset_files(
+                datasetfile_path, config
+            ):
+                if CONTENT_SCENES_PATH_FIELD in deserialized:
+                    self.content_scenes_path = deserialized[
+                        CONTENT_SCENES_PATH_FIELD
+                    ]
+                episodes.extend(deserialized["episodes"])
+            content_scenes = (
+                [ALL_SCENES_MASK]
+                if self._has_individual_scene_files(dataset_dir)
+                else config.CONTENT_SCENES
+            )
+            self.episodes = self._lazy_episode_store(
+                ColumnarEpisodes.from_episodes(episodes),
+                content_scenes,
+                config.SCENES_DIR,
+            )
+            return
+
+        for deserialized in self._read_dataset_files(datasetfile_path, config):
+            self._load_deserialized(deserialized, scenes_dir=config.SCENES_DIR)
+
+        if not self._has_individual_scene_files(dataset_dir):
+            self.episodes = list(
+                filter(self.build_content_scenes_filter(config), self.episodes)
+            )
+
+    def _has_individual_scene_files(self, dataset_dir: str) -> bool:
+        return os.path.exists(
             self.content_scenes_path.split("{scene}")[0].format(
                 data_path=dataset_dir
             )
         )
-        if has_individual_scene_files:
+
+    def _read_dataset_files(
+        self, datasetfile_path: str, config: Config
+    ) -> Iterator[Dict[str, Any]]:
+        r"""Yields the deserialized split file, then the files of the
+        :p:`config.CONTENT_SCENES` if the dataset has a file per scene. The
+        scene files are read by a pool of :p:`config.NUM_LOADER_WORKERS`
+        workers while the previous ones are loaded.
+        """
+        yield read_json_file(datasetfile_path)
+
+        # Read separate file for each scene. The split file can override
+        # the content_scenes_path
+        dataset_dir = os.path.dirname(datasetfile_path)
+        if self._has_individual_scene_files(dataset_dir):
             scenes = config.CONTENT_SCENES
             if ALL_SCENES_MASK in scenes:
                 scenes = self._get_scenes_from_folder(
@@ -108,40 +184,134 @@ class PointNavDatasetV1(Dataset):
                     dataset_dir=dataset_dir,
                 )
 
-            for scene in scenes:
-                scene_filename = self.content_scenes_path.format(
-                    data_path=dataset_dir, scene=scene
-                )
-                with gzip.open(scene_filename, "rt") as f:
-                    self.from_json(f.read(), scenes_dir=config.SCENES_DIR)
+            yield from read_json_files(
+                [
+                    self.content_scenes_path.format(
+                        data_path=dataset_dir, scene=scene
+                    )
+                    for scene in scenes
+                ],
+                num_workers=config.NUM_LOADER_WORKERS,
+                pool=config.LOADER_POOL,
+            )
+
+    def _load_columnar(
+        self, columnar: ColumnarEpisodes, config: Config
+    ) -> None:
+        r"""Loads the episodes of the :p:`config.CONTENT_SCENES` from a
+        dataset converted with :ref:`habitat.datasets.columnar`, without
+        reading the rows of the other scenes.
+        """
+        scenes = config.CONTENT_SCENES
+        if ALL_SCENES_MASK in scenes:
+            scenes = columnar.scenes
+
+        for scene in scenes:
+            rows = columnar.scene_rows(scene)
+            self._load_deserialized(
+                {
+                    **columnar.attrs,
+                    **columnar.scene_attrs(scene),
+                    "episodes": columnar.episodes(rows),
+                    FILE_INDICES_FIELD: columnar.file_index[rows].tolist(),
+                },
+                scenes_dir=config.SCENES_DIR,
+            )
 
+    @classmethod
+    def _lazy_episode_store(
+        cls,
+        columnar: ColumnarEpisodes,
+        content_scenes: List[str],
+        scenes_dir: Optional[str],
+    ) -> LazyEpisodeStore:
+        r"""Returns the episodes of :p:`content_scenes` as a
+        :ref:`LazyEpisodeStore` over the rows of :p:`columnar`.
+        """
+        build_episode = functools.partial(
+            cls._build_columnar_episode, columnar, scenes_dir
+        )
+        # Episodes of a scene share their scene id, so building one episode
+        # per scene is enough to know them all
+        _, first_rows = np.unique(columnar.scene_index, return_index=True)
+        scene_ids = [build_episode(row).scene_id for row in first_rows]
+
+        if ALL_SCENES_MASK in content_scenes:
+            rows = None
+        elif columnar.path is not None:
+            # Same order as _load_columnar
+            rows = np.concatenate(
+                [np.zeros(0, dtype=np.int64)]
+                + [columnar.scene_rows(scene) for scene in content_scenes]
+            )
         else:
-            self.episodes = list(
-                filter(self.build_content_scenes_filter(config), self.episodes)
+            # Same order as filtering the episodes of the dataset files
+            rows = np.flatnonzero(
+                np.isin(
+                    columnar.scene_index,
+                    [
+                        code
+                        for code, scene in enumerate(columnar.scene_names)
+                        if scene in content_scenes
+                    ],
+                )
             )
+        return LazyEpisodeStore(
+            build_episode, scene_ids, columnar.scene_index, rows
+        )
+
+    @classmethod
+    def _build_columnar_episode(
+        cls, columnar: ColumnarEpisodes, scenes_dir: Optional[str], row: int
+    ) -> NavigationEpisode:
+        return cls._episode_from_dict(columnar.episode(row), scenes_dir)
 
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
     ) -> None:
-        deserialized = json.loads(json_str)
+        self._load_deserialized(json_loads(json_str), scenes_dir=scenes_dir)
+
+    @staticmethod
+    def _file_indices(deserialized: Dict[str, Any]) -> Sequence[int]:
+        r"""Positions of the episodes of :p:`deserialized` in their JSON
+        file, for the subclasses that number their episodes by them.
+        """
+        return deserialized.get(
+            FILE_INDICES_FIELD, range(len(deserialized["episodes"]))
+        )
+
+    def _load_deserialized(
+        self, deserialized: Dict[str, Any], scenes_dir: Optional[str] = None
+    ) -> None:
         if CONTENT_SCENES_PATH_FIELD in deserialized:
             self.content_scenes_path = deserialized[CONTENT_SCENES_PATH_FIELD]
 
+        assert isinstance(
+            self.episodes, list
+        ), "Episodes can't be added to a LazyEpisodeStore"
         for episode in deserialized["episodes"]:
-            episode = NavigationEpisode(**episode)
+            self.episodes.append(self._episode_from_dict(episode, scenes_dir))
 
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
+    @staticmethod
+    def _episode_from_dict(
+        serialized_episode: Dict[str, Any], scenes_dir: Optional[str] = None
+    ) -> NavigationEpisode:
+        episode = NavigationEpisode(**serialized_episode)
+
+        if scenes_dir is not None:
+            if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
+                episode.scene_id = episode.scene_id[
+                    len(DEFAULT_SCENE_PATH_PREFIX) :
+                ]
 
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
+            episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
 
-            for g_index, goal in enumerate(episode.goals):
-                episode.goals[g_index] = NavigationGoal(**goal)
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        path[p_index] = ShortestPathPoint(**point)
-            self.episodes.append(episode)
+        episode.goals = [
+            NavigationGoal(**goal) for goal in serialized_episode["goals"]
+        ]
+        if episode.shortest_paths is not None:
+            episode.shortest_paths = [
+                shortest_path_from_json(path)
+                for path in serialized_episode["shortest_paths"]
+            ]
+        return episode
@@ -55,6 +55,9 @@ def is_compatible_episode(
     if np.abs(s[1] - t[1]) > 0.5:  # check height difference to assure s and
         #  t are from same floor
         return False, 0
+    # The geodesic distance is never shorter than the Euclidean one
+    if euclid_dist > far_dist:
+        return False, 0
     d_separation = sim.geodesic_distance(s, [t])
     if d_separation == np.inf:
         return False, 0
@@ -77,7 +80,7 @@ def _create_episode(
     start_position: List[float],
     start_rotation: List[Union[int, float64]],
     target_position: List[float],
-    shortest_paths: Optional[List[List[ShortestPathPoint]]] = None,
+    shortest_paths: Optional[List[Sequence[ShortestPathPoint]]] = None,
     radius: Optional[float] = None,
     info: Optional[Dict[str, float]] = None,
 ) -> Optional[NavigationEpisode]:
@@ -142,6 +145,8 @@ def generate_pointnav_episode(
         if sim.island_radius(target_position) < ISLAND_RADIUS_LIMIT:
             continue
 
+        # Sources are sampled one at a time so that no more are drawn than
+        # needed to find a compatible one
         for _retry in range(number_retries_per_target):
             source_position = sim.sample_navigable_point()
 
@@ -159,7 +164,7 @@ def generate_pointnav_episode(
             angle = np.random.uniform(0, 2 * np.pi)
             source_rotation = [0, np.sin(angle / 2), 0, np.cos(angle / 2)]
 
-            shortest_paths = None
+            shortest_paths: Optional[List[Sequence[ShortestPathPoint]]] = None
             if is_gen_shortest_path:
                 try:
                     shortest_paths = [
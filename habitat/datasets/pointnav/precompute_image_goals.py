@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Offline rendering of the goal images of the episodes of an ImageNav
+dataset.
+
+The image of every episode is written to the output directory, see
+:ref:`ImageGoalCache`. With ``TASK.IMAGEGOAL_SENSOR.CACHE_DIR`` set to that
+directory, :ref:`ImageGoalSensor` loads them instead of rendering them:
+
+.. code:: sh
+
+    python -m habitat.datasets.pointnav.precompute_image_goals \
+        --config configs/tasks/imagenav.yaml \
+        --output-dir data/image_goals/imagenav_gibson --num-workers 4
+
+Episodes whose image exists are skipped, an interrupted run can be resumed.
+"""
+
+import argparse
+import functools
+import multiprocessing
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import tqdm
+
+from habitat.config import Config
+from habitat.config.default import get_config
+from habitat.core.simulator import Simulator
+from habitat.datasets import make_dataset
+from habitat.sims import make_sim
+from habitat.tasks.nav.image_goal_cache import (
+    ImageGoalCache,
+    image_goal_sensors_key,
+)
+from habitat.tasks.nav.nav import ImageGoalSensor, NavigationEpisode
+
+
+def make_scene_sim(sim_config: Config, scene_id: str) -> Simulator:
+    r"""Creates the simulator of :p:`sim_config` for :p:`scene_id`."""
+    sim_config = sim_config.clone()
+    sim_config.defrost()
+    sim_config.SCENE = scene_id
+    sim_config.freeze()
+    return make_sim(sim_config.TYPE, config=sim_config)
+
+
+def precompute_scene_image_goals(
+    scene_id: str,
+    episodes: Sequence[NavigationEpisode],
+    output_dir: str,
+    config: Config,
+    batch_size: int = 64,
+    make_sim_fn: Callable[[Config, str], Simulator] = make_scene_sim,
+) -> int:
+    r"""Renders the goal images of the episodes of a scene into
+    :p:`output_dir`, :p:`batch_size` at a time.
+
+    :param config: config of the task, with the simulator the scene is
+        loaded in and the ImageGoal sensor.
+    :return: the number of rendered images.
+    """
+    cache = ImageGoalCache(
+        cache_dir=output_dir,
+        sensors_key=image_goal_sensors_key(config.SIMULATOR),
+    )
+    episodes = [
+        episode
+        for episode in episodes
+        if (episode.scene_id, episode.episode_id, episode.goals[0].position)
+        not in cache
+    ]
+    if len(episodes) == 0:
+        return 0
+
+    sensor_config = config.TASK.IMAGEGOAL_SENSOR.clone()
+    sensor_config.defrost()
+    sensor_config.CACHE_SIZE = 0
+    sensor_config.CACHE_DIR = ""
+    sensor_config.freeze()
+
+    sim = make_sim_fn(config.SIMULATOR, scene_id)
+    try:
+        sensor = ImageGoalSensor(sim=sim, config=sensor_config)
+        for i in range(0, len(episodes), batch_size):
+            batch = episodes[i : i + batch_size]
+            images = sensor.get_image_goals(batch)
+            for episode, image in zip(batch, images):
+                cache.put(
+                    episode.scene_id,
+                    episode.episode_id,
+                    episode.goals[0].position,
+                    image,
+                )
+    finally:
+        sim.close()
+    return len(episodes)
+
+
+def precompute_image_goals(
+    config: Config,
+    output_dir: str,
+    num_workers: int = 1,
+    batch_size: int = 64,
+    make_sim_fn: Callable[[Config, str], Simulator] = make_scene_sim,
+    episodes: Optional[Sequence[NavigationEpisode]] = None,
+) -> int:
+    r"""Renders the goal images of the episodes of the dataset of
+    :p:`config`, the episodes of each scene in a process of a pool of
+    :p:`num_workers`.
+
+    :param episodes: episodes to render the goal images of instead of those
+        of the dataset.
+    :return: the number of rendered images.
+    """
+    if episodes is None:
+        episodes = make_dataset(
+            config.DATASET.TYPE, config=config.DATASET
+        ).episodes
+    scene_episodes: Dict[str, List[NavigationEpisode]] = defaultdict(list)
+    for episode in episodes:
+        scene_episodes[episode.scene_id].append(episode)
+
+    precompute_fn = functools.partial(
+        _precompute_scene,
+        output_dir=output_dir,
+        config=config,
+        batch_size=batch_size,
+        make_sim_fn=make_sim_fn,
+    )
+    num_images = 0
+    with tqdm.tqdm(total=len(episodes)) as pbar:
+        if num_workers <= 1:
+            for scene in scene_episodes.items():
+                num_images += precompute_fn(scene)
+                pbar.update(len(scene[1]))
+        else:
+            with multiprocessing.Pool(num_workers) as pool:
+                for scene, scene_images in zip(
+                    scene_episodes.items(),
+                    pool.imap(precompute_fn, scene_episodes.items()),
+                ):
+                    num_images += scene_images
+                    pbar.update(len(scene[1]))
+    return num_images
+
+
+def _precompute_scene(
+    scene: Tuple[str, Sequence[NavigationEpisode]], **kwargs
+) -> int:
+    return precompute_scene_image_goals(*scene, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Renders the goal images of an ImageNav dataset"
+    )
+    parser.add_argument(
+        "--config", type=str, default="configs/tasks/imagenav.yaml"
+    )
+    parser.add_argument("--output-dir", type=str, required=True)
+    parser.add_argument("--num-workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify config options from command line",
+    )
+    args = parser.parse_args()
+
+    config = get_config(args.config, args.opts)
+    num_images = precompute_image_goals(
+        config,
+        args.output_dir,
+        num_workers=args.num_workers,
+        batch_size=args.batch_size,
+    )
+    print(f"{num_images} goal images")
+
+
+if __name__ == "__main__":
+    main()
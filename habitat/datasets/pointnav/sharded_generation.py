@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Generation of PointNav datasets with a process per scene.
+
+Every scene is generated by :ref:`generate_pointnav_episode` in its own
+worker and written to ``content/{scene}.json.gz`` next to the split file,
+the layout that :ref:`PointNavDatasetV1` loads scene by scene.
+
+Episodes are generated in chunks that are each written to a file as soon as
+they are done, and every chunk is seeded from the seed of the dataset, the
+scene and the index of the chunk. An interrupted generation resumes from the
+last chunk written, and gives the same episodes as one that wasn't
+interrupted:
+
+.. code:: sh
+
+    python -m habitat.datasets.pointnav.sharded_generation \
+        --scenes "data/scene_datasets/gibson/*.glb" \
+        --output-path data/datasets/pointnav/gibson/v2/train/train.json.gz \
+        --num-episodes-per-scene 10000 --num-workers 8
+"""
+
+import argparse
+import functools
+import glob
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence
+
+import numpy as np
+import tqdm
+
+from habitat.config.default import get_config
+from habitat.core.dataset import Dataset
+from habitat.datasets.pointnav.pointnav_generator import (
+    generate_pointnav_episode,
+)
+from habitat.sims import make_sim
+from habitat.tasks.nav.nav import NavigationEpisode
+
+if TYPE_CHECKING:
+    from habitat.sims.habitat_simulator.habitat_simulator import HabitatSim
+
+_PARTS_DIR_EXTENSION = ".parts"
+
+
+def chunk_seed(seed: int, scene: str, chunk_index: int) -> int:
+    r"""Seed of a chunk of the episodes of :p:`scene`. It doesn't depend on
+    the process that generates the chunk, unlike :py:`hash()`.
+    """
+    digest = hashlib.sha1(f"{seed}:{scene}:{chunk_index}".encode("utf-8"))
+    return int(digest.hexdigest()[:8], 16)
+
+
+def make_habitat_sim(scene_path: str) -> "HabitatSim":
+    r"""Creates a simulator without sensors for :p:`scene_path`."""
+    config = get_config()
+    config.defrost()
+    config.SIMULATOR.SCENE = scene_path
+    config.SIMULATOR.AGENT_0.SENSORS = []
+    config.freeze()
+    return make_sim("Sim-v0", config=config.SIMULATOR)
+
+
+def _write_json_gz(path: str, json_str: str) -> None:
+    r"""Writes a file that readers see either whole or not at all."""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with gzip.open(tmp_path, "wt") as f:
+        f.write(json_str)
+    os.replace(tmp_path, path)
+
+
+def _chunk_path(parts_dir: str, chunk_index: int) -> str:
+    return os.path.join(parts_dir, f"{chunk_index:06d}.json.gz")
+
+
+def generate_scene_episodes(
+    scene_path: str,
+    content_dir: str,
+    num_episodes: int,
+    seed: int = 0,
+    chunk_size: int = 500,
+    scenes_dir: Optional[str] = None,
+    make_sim_fn: Callable[[str], "HabitatSim"] = make_habitat_sim,
+    **generator_kwargs: Any,
+) -> str:
+    r"""Generates the episodes of a scene into
+    ``{content_dir}/{scene}.json.gz``, resuming from the chunks a previous
+    call wrote if there are any.
+
+    :param scene_path: path of the scene to generate episodes in.
+    :param content_dir: directory of the per-scene files of the dataset.
+    :param num_episodes: number of episodes of the scene.
+    :param seed: seed of the dataset.
+    :param chunk_size: number of episodes generated between two writes.
+    :param scenes_dir: if given, the scene ids of the episodes are relative
+        to it.
+    :param make_sim_fn: creates the simulator the scene is loaded in.
+    :param generator_kwargs: passed to :ref:`generate_pointnav_episode`.
+    :return: the path of the file of the scene.
+    """
+    scene = Dataset.scene_from_scene_path(scene_path)
+    scene_file = os.path.join(content_dir, f"{scene}.json.gz")
+    if os.path.exists(scene_file):
+        return scene_file
+
+    scene_id = scene_path
+    if scenes_dir is not None and os.path.normpath(scene_path).startswith(
+        os.path.normpath(scenes_dir) + os.sep
+    ):
+        scene_id = os.path.relpath(scene_path, scenes_dir)
+
+    parts_dir = os.path.join(content_dir, scene + _PARTS_DIR_EXTENSION)
+    os.makedirs(parts_dir, exist_ok=True)
+    num_chunks = (num_episodes + chunk_size - 1) // chunk_size
+    sim: Optional["HabitatSim"] = None
+    try:
+        for chunk_index in range(num_chunks):
+            chunk_file = _chunk_path(parts_dir, chunk_index)
+            if os.path.exists(chunk_file):
+                continue
+            if sim is None:
+                sim = make_sim_fn(scene_path)
+
+            chunk_start = chunk_index * chunk_size
+            chunk_seed_ = chunk_seed(seed, scene, chunk_index)
+            random.seed(chunk_seed_)
+            np.random.seed(chunk_seed_)
+            sim.seed(chunk_seed_)
+
+            episodes = []
+            for i, episode in enumerate(
+                generate_pointnav_episode(
+                    sim,
+                    min(chunk_size, num_episodes - chunk_start),
+                    **generator_kwargs,
+                )
+            ):
+                episode.episode_id = str(chunk_start + i)
+                episode.scene_id = scene_id
+                episodes.append(episode)
+
+            chunk: Dataset[NavigationEpisode] = Dataset()
+            chunk.episodes = episodes
+            _write_json_gz(chunk_file, chunk.to_json())
+    finally:
+        if sim is not None:
+            sim.close()
+
+    episodes = []
+    for chunk_index in range(num_chunks):
+        with gzip.open(_chunk_path(parts_dir, chunk_index), "rt") as f:
+            episodes.extend(json.load(f)["episodes"])
+    _write_json_gz(scene_file, json.dumps({"episodes": episodes}))
+    shutil.rmtree(parts_dir)
+    return scene_file
+
+
+def generate_pointnav_dataset(
+    scene_paths: Sequence[str],
+    datasetfile_path: str,
+    num_episodes_per_scene: int,
+    num_workers: int = 1,
+    seed: int = 0,
+    chunk_size: int = 500,
+    scenes_dir: Optional[str] = None,
+    make_sim_fn: Callable[[str], "HabitatSim"] = make_habitat_sim,
+    **generator_kwargs: Any,
+) -> List[str]:
+    r"""Generates a PointNav dataset with a file per scene, see
+    :ref:`generate_scene_episodes` for the parameters.
+
+    :param datasetfile_path: path of the split file, the scene files are
+        written to the ``content`` directory next to it.
+    :param num_workers: number of scenes generated in parallel, each by a
+        process. They are generated one after the other in the calling
+        process if it is 1.
+    :return: the paths of the files of the scenes.
+    """
+    content_dir = os.path.join(os.path.dirname(datasetfile_path), "content")
+    os.makedirs(content_dir, exist_ok=True)
+
+    generate_fn = functools.partial(
+        generate_scene_episodes,
+        content_dir=content_dir,
+        num_episodes=num_episodes_per_scene,
+        seed=seed,
+        chunk_size=chunk_size,
+        scenes_dir=scenes_dir,
+        make_sim_fn=make_sim_fn,
+        **generator_kwargs,
+    )
+    scene_files = []
+    with tqdm.tqdm(total=len(scene_paths)) as pbar:
+        if num_workers <= 1:
+            for scene_path in scene_paths:
+                scene_files.append(generate_fn(scene_path))
+                pbar.update()
+        else:
+            with multiprocessing.Pool(num_workers) as pool:
+                for scene_file in pool.imap(generate_fn, scene_paths):
+                    scene_files.append(scene_file)
+                    pbar.update()
+
+    if not os.path.exists(datasetfile_path):
+        _write_json_gz(datasetfile_path, json.dumps({"episodes": []}))
+    return scene_files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generates a PointNav dataset with a process per scene"
+    )
+    parser.add_argument(
+        "--scenes", type=str, required=True, help="glob of the scene files"
+    )
+    parser.add_argument(
+        "--output-path",
+        type=str,
+        required=True,
+        help="path of the {split}.json.gz file of the dataset",
+    )
+    parser.add_argument(
+        "--scenes-dir", type=str, default="data/scene_datasets"
+    )
+    parser.add_argument("--num-episodes-per-scene", type=int, default=10000)
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--shortest-paths",
+        action="store_true",
+        help="also generate the shortest paths of the episodes",
+    )
+    args = parser.parse_args()
+
+    generate_pointnav_dataset(
+        sorted(glob.glob(args.scenes)),
+        args.output_path,
+        args.num_episodes_per_scene,
+        num_workers=args.num_workers,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        scenes_dir=args.scenes_dir,
+        is_gen_shortest_path=args.shortest_paths,
+    )
+
+
+if __name__ == "__main__":
+    main()
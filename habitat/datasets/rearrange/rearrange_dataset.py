@@ -4,7 +4,6 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import json
 from typing import Any, Dict, List, Optional
 
 import attr
@@ -38,6 +37,7 @@ class RearrangeDatasetV0(PointNavDatasetV1):
     r"""Class inherited from PointNavDataset that loads Rearrangement dataset."""
     episodes: List[RearrangeEpisode] = []  # type: ignore
     content_scenes_path: str = "{data_path}/content/{scene}.json.gz"
+    _supports_lazy_episodes = False
 
     def to_json(self) -> str:
         result = DatasetFloatJSONEncoder().encode(self)
@@ -59,12 +59,12 @@ class RearrangeDatasetV0(PointNavDatasetV1):
 
         super().__init__(config)
 
-    def from_json(
-        self, json_str: str, scenes_dir: Optional[str] = None
+    def _load_deserialized(
+        self, deserialized: Dict[str, Any], scenes_dir: Optional[str] = None
     ) -> None:
-        deserialized = json.loads(json_str)
-
-        for i, episode in enumerate(deserialized["episodes"]):
+        for i, episode in zip(
+            self._file_indices(deserialized), deserialized["episodes"]
+        ):
             rearrangement_episode = RearrangeEpisode(**episode)
             rearrangement_episode.episode_id = str(i)
 
@@ -6,6 +6,7 @@
 
 from habitat.core.logging import logger
 from habitat.core.registry import registry
+from habitat.datasets.dataset_cache import make_cached_dataset
 from habitat.datasets.eqa import _try_register_mp3d_eqa_dataset
 from habitat.datasets.object_nav import _try_register_objectnavdatasetv1
 from habitat.datasets.pointnav import _try_register_pointnavdatasetv1
@@ -18,6 +19,10 @@ def make_dataset(id_dataset, **kwargs):
     _dataset = registry.get_dataset(id_dataset)
     assert _dataset is not None, "Could not find dataset {}".format(id_dataset)
 
+    config = kwargs.get("config")
+    if config is not None and config.get("CACHE_DIR", ""):
+        return make_cached_dataset(_dataset, **kwargs)
+
     return _dataset(**kwargs)  # type: ignore
 
 
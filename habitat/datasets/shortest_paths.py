@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Compact encoding of the shortest paths of the episodes.
+
+A shortest path is stored in the JSON of an episode as a list of
+``{"position", "rotation", "action"}`` objects, several hundred bytes per
+step. :ref:`CompactShortestPath` stores it instead as
+
+.. code:: json
+
+    {"actions": "<uint8, base64>", "start": "<float32 pose, base64>",
+     "deltas": "<float16 poses, base64>"}
+
+where a pose is the position followed by the rotation of a step, and the
+deltas are the differences between the poses of consecutive steps. Deltas
+are taken to the previous pose as it is decoded, so the rounding to float16
+doesn't add up along the path. Paths whose points have no pose keep only
+their actions.
+
+The dataset loaders accept both encodings, see
+:ref:`shortest_path_from_json`, and compact paths are only decoded into
+:ref:`ShortestPathPoint` when their points are accessed. The actions can be
+read without decoding the poses. Datasets are converted, and their missing
+shortest paths computed, with a process per scene file:
+
+.. code:: sh
+
+    python -m habitat.datasets.shortest_paths \
+        data/datasets/pointnav/gibson/v1/train/train.json.gz --num-workers 8
+"""
+
+import argparse
+import base64
+import functools
+import glob
+import gzip
+import multiprocessing
+import os
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+    overload,
+)
+
+import numpy as np
+import tqdm
+
+from habitat.core.simulator import ShortestPathPoint
+from habitat.core.utils import DatasetFloatJSONEncoder
+from habitat.datasets.json_loading import read_json_file
+from habitat.datasets.utils import get_action_shortest_path
+
+if TYPE_CHECKING:
+    from habitat.sims.habitat_simulator.habitat_simulator import HabitatSim
+
+_NO_ACTION = 255
+_POSE_SIZE = 7
+
+
+def _encode_array(array: np.ndarray) -> str:
+    return base64.b64encode(array.tobytes()).decode("ascii")
+
+
+def _decode_array(data: str, dtype: Any) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=dtype)
+
+
+class CompactShortestPath(Sequence[ShortestPathPoint]):
+    r"""A shortest path stored as uint8 actions and float16 pose deltas,
+    that behaves as the list of its :ref:`ShortestPathPoint`.
+    """
+
+    __slots__ = ("_actions", "_start", "_deltas", "_points")
+
+    def __init__(
+        self,
+        actions: str,
+        start: Optional[str] = None,
+        deltas: Optional[str] = None,
+    ) -> None:
+        r"""Takes the fields of the JSON encoding, see
+        :ref:`from_points` to encode a path.
+        """
+        self._actions = actions
+        self._start = start
+        self._deltas = deltas
+        self._points: Optional[List[ShortestPathPoint]] = None
+
+    @classmethod
+    def from_points(
+        cls, points: Sequence[ShortestPathPoint]
+    ) -> "CompactShortestPath":
+        for point in points:
+            assert (
+                point.action is None or 0 <= point.action < _NO_ACTION
+            ), f"Action {point.action} can't be encoded as uint8"
+        actions = np.array(
+            [_NO_ACTION if p.action is None else p.action for p in points],
+            dtype=np.uint8,
+        )
+        if len(points) == 0 or any(
+            p.position is None or p.rotation is None for p in points
+        ):
+            return cls(_encode_array(actions))
+
+        poses = np.array(
+            [[*p.position, *p.rotation] for p in points], dtype=np.float64
+        )
+        start = poses[0].astype(np.float32)
+        deltas = np.empty((len(poses) - 1, _POSE_SIZE), dtype=np.float16)
+        # The decoded poses, to take the deltas from
+        pose = start.astype(np.float64)
+        for i in range(1, len(poses)):
+            deltas[i - 1] = poses[i] - pose
+            pose = pose + deltas[i - 1].astype(np.float64)
+        return cls(
+            _encode_array(actions), _encode_array(start), _encode_array(deltas)
+        )
+
+    @classmethod
+    def from_json(cls, serialized: Dict[str, str]) -> "CompactShortestPath":
+        return cls(**serialized)
+
+    def to_json(self) -> Dict[str, str]:
+        serialized = {"actions": self._actions}
+        if self._start is not None:
+            serialized["start"] = self._start
+            serialized["deltas"] = self._deltas
+        return serialized
+
+    @property
+    def actions(self) -> np.ndarray:
+        r"""The actions of the steps, without decoding their poses.
+        ``255`` stands for a step without an action.
+        """
+        return _decode_array(self._actions, np.uint8)
+
+    def poses(self) -> Optional[np.ndarray]:
+        r"""Returns the positions followed by the rotations of the steps,
+        one row per step, or :py:`None` if the path has no poses.
+        """
+        if self._start is None:
+            return None
+        poses = np.concatenate(
+            [
+                _decode_array(self._start, np.float32)[None],
+                _decode_array(self._deltas, np.float16).reshape(
+                    -1, _POSE_SIZE
+                ),
+            ]
+        ).astype(np.float64)
+        return np.cumsum(poses, axis=0)
+
+    def _decoded(self) -> List[ShortestPathPoint]:
+        if self._points is None:
+            actions = [
+                None if a == _NO_ACTION else a for a in self.actions.tolist()
+            ]
+            poses = self.poses()
+            if poses is None:
+                self._points = [
+                    ShortestPathPoint(None, None, action) for action in actions
+                ]
+            else:
+                self._points = [
+                    ShortestPathPoint(pose[:3], pose[3:], action)
+                    for pose, action in zip(poses.tolist(), actions)
+                ]
+        return self._points
+
+    def __len__(self) -> int:
+        return len(base64.b64decode(self._actions))
+
+    @overload
+    def __getitem__(self, index: int) -> ShortestPathPoint:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[ShortestPathPoint]:
+        ...
+
+    def __getitem__(self, index):
+        return self._decoded()[index]
+
+    def __getstate__(self) -> Dict[str, str]:
+        # Also used by the JSON encoder of the datasets
+        return self.to_json()
+
+    def __setstate__(self, state: Dict[str, str]) -> None:
+        self.__init__(**state)  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"CompactShortestPath({len(self)} steps)"
+
+
+def shortest_path_from_json(
+    serialized: Union[Dict[str, str], List[Dict[str, Any]]]
+) -> Union[CompactShortestPath, List[ShortestPathPoint]]:
+    r"""Deserializes a shortest path of an episode in either encoding."""
+    if isinstance(serialized, dict):
+        return CompactShortestPath.from_json(serialized)
+    return [ShortestPathPoint(**point) for point in serialized]
+
+
+def _as_point(point: Any) -> ShortestPathPoint:
+    if isinstance(point, ShortestPathPoint):
+        return point
+    if isinstance(point, dict):
+        return ShortestPathPoint(**point)
+    # ObjectNav datasets may only have the actions
+    return ShortestPathPoint(None, None, point)
+
+
+def _make_sim(scene_path: str) -> "HabitatSim":
+    from habitat.datasets.pointnav.sharded_generation import make_habitat_sim
+
+    return make_habitat_sim(scene_path)
+
+
+def compact_scene_file(
+    dataset_file: str,
+    scenes_dir: Optional[str] = None,
+    compute_missing: bool = False,
+    success_distance: float = 0.2,
+    max_episode_steps: int = 500,
+    make_sim_fn: Callable[[str], "HabitatSim"] = _make_sim,
+) -> int:
+    r"""Rewrites the shortest paths of the episodes of :p:`dataset_file`
+    with the compact encoding.
+
+    :param scenes_dir: directory the scene ids of the episodes are
+        relative to.
+    :param compute_missing: whether to compute the shortest path to the
+        first goal of the episodes that have none, with a simulator per
+        scene.
+    :param success_distance: see :ref:`get_action_shortest_path`.
+    :param max_episode_steps: see :ref:`get_action_shortest_path`.
+    :param make_sim_fn: creates the simulator of a scene.
+    :return: the number of shortest paths in the file.
+    """
+    deserialized = read_json_file(dataset_file)
+    episodes = deserialized["episodes"]
+    num_paths = 0
+    sim: Optional["HabitatSim"] = None
+    sim_scene = None
+    try:
+        for episode in sorted(episodes, key=lambda ep: ep["scene_id"]):
+            paths = episode.get("shortest_paths")
+            if paths is None and compute_missing and episode.get("goals"):
+                scene_path = episode["scene_id"]
+                if scenes_dir is not None:
+                    scene_path = os.path.join(scenes_dir, scene_path)
+                if sim_scene != scene_path:
+                    if sim is not None:
+                        sim.close()
+                    sim = make_sim_fn(scene_path)
+                    sim_scene = scene_path
+                paths = [
+                    get_action_shortest_path(
+                        sim,
+                        source_position=episode["start_position"],
+                        source_rotation=episode["start_rotation"],
+                        goal_position=episode["goals"][0]["position"],
+                        success_distance=success_distance,
+                        max_episode_steps=max_episode_steps,
+                    )
+                ]
+            if paths is None:
+                continue
+            episode["shortest_paths"] = [
+                path
+                if isinstance(path, dict)
+                else CompactShortestPath.from_points(
+                    [_as_point(point) for point in path]
+                )
+                for path in paths
+            ]
+            num_paths += len(paths)
+    finally:
+        if sim is not None:
+            sim.close()
+
+    tmp_file = f"{dataset_file}.tmp{os.getpid()}"
+    json_str = DatasetFloatJSONEncoder().encode(deserialized)
+    with gzip.open(tmp_file, "wt") as f:
+        f.write(json_str)
+    os.replace(tmp_file, dataset_file)
+    return num_paths
+
+
+def compact_dataset(
+    datasetfile_path: str, num_workers: int = 1, **kwargs: Any
+) -> int:
+    r"""Applies :ref:`compact_scene_file` to the split file
+    :p:`datasetfile_path` and to its per-scene content files, each in a
+    process of a pool of :p:`num_workers`.
+
+    :return: the number of shortest paths in the dataset.
+    """
+    dataset_files = [datasetfile_path] + sorted(
+        glob.glob(
+            os.path.join(
+                os.path.dirname(datasetfile_path), "content", "*.json.gz"
+            )
+        )
+    )
+    compact_fn = functools.partial(compact_scene_file, **kwargs)
+    num_paths = 0
+    with tqdm.tqdm(total=len(dataset_files)) as pbar:
+        if num_workers <= 1:
+            for dataset_file in dataset_files:
+                num_paths += compact_fn(dataset_file)
+                pbar.update()
+        else:
+            with multiprocessing.Pool(num_workers) as pool:
+                for file_paths in pool.imap_unordered(
+                    compact_fn, dataset_files
+                ):
+                    num_paths += file_paths
+                    pbar.update()
+    return num_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stores the shortest paths of a dataset compactly"
+    )
+    parser.add_argument(
+        "dataset_path", type=str, help="path of the {split}.json.gz file"
+    )
+    parser.add_argument(
+        "--scenes-dir", type=str, default="data/scene_datasets"
+    )
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument(
+        "--compute-missing",
+        action="store_true",
+        help="compute the shortest paths of the episodes that have none",
+    )
+    parser.add_argument("--success-distance", type=float, default=0.2)
+    parser.add_argument("--max-episode-steps", type=int, default=500)
+    args = parser.parse_args()
+
+    num_paths = compact_dataset(
+        args.dataset_path,
+        num_workers=args.num_workers,
+        scenes_dir=args.scenes_dir,
+        compute_missing=args.compute_missing,
+        success_distance=args.success_distance,
+        max_episode_steps=args.max_episode_steps,
+    )
+    print(f"{num_paths} shortest paths")
+
+
+if __name__ == "__main__":
+    main()
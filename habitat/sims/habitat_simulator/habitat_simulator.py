@@ -40,6 +40,7 @@ from habitat.core.simulator import (
     ShortestPathPoint,
     Simulator,
     VisualObservation,
+    stack_observations,
 )
 from habitat.core.spaces import Space
 
@@ -599,6 +600,40 @@ class HabitatSim(habitat_sim.Simulator, Simulator):
         else:
             return None
 
+    def get_observations_at_poses(
+        self,
+        positions: Sequence[Sequence[float]],
+        rotations: Sequence[Sequence[float]],
+    ) -> Optional[Dict[str, np.ndarray]]:
+        r"""Renders the poses one after the other, reading the state of the
+        agent and putting it back only once for all of them.
+        """
+        agent = self.get_agent(0)
+        current_state = agent.get_state()
+        # Without sensor states, the sensors follow the body of the agent,
+        # see set_agent_state
+        new_state = agent.get_state()
+        new_state.sensor_states = {}
+
+        batch: Dict[str, np.ndarray] = {}
+        for i, (position, rotation) in enumerate(zip(positions, rotations)):
+            new_state.position = position
+            new_state.rotation = rotation
+            agent.set_state(new_state, False)
+            sim_obs = self.get_sensor_observations()
+            self._prev_sim_obs = sim_obs
+            stack_observations(
+                batch,
+                self._sensor_suite.get_observations(sim_obs),
+                i,
+                len(positions),
+            )
+
+        new_state.position = current_state.position
+        new_state.rotation = current_state.rotation
+        agent.set_state(new_state, False)
+        return batch
+
     def distance_to_closest_obstacle(
         self, position: ndarray, max_search_radius: float = 2.0
     ) -> float:
@@ -55,6 +55,8 @@ class EQAEpisode(NavigationEpisode):
 
 @registry.register_sensor
 class QuestionSensor(Sensor):
+    is_static_per_episode = True
+
     def __init__(self, dataset, *args: Any, **kwargs: Any):
         self._dataset = dataset
         super().__init__(*args, **kwargs)
@@ -112,7 +114,7 @@ class EpisodeInfo(Measure):
         return "episode_info"
 
     def reset_metric(self, episode, *args: Any, **kwargs: Any):
-        self._metric = vars(episode).copy()
+        self._metric = attr.asdict(episode, recurse=False)
 
     def update_metric(self, episode, action, *args: Any, **kwargs: Any):
         pass
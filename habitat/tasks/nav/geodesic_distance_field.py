@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Geodesic distances to the goals of an episode, computed once for a
+floor of the navmesh.
+
+:ref:`GeodesicDistanceField` samples the floor with
+``pathfinder.get_topdown_view()`` and runs a Dijkstra from all the goals at
+once over the grid of navigable points, with the 16 moves to the
+neighbouring points and to the points a knight's move away. Distances along
+the grid are at most 3% longer than the geodesic distances. The distance of
+a position is then interpolated between the four grid points around it, in
+constant time. Goals on other floors can't be reached along the grid, the
+field only gives the distances that are shorter than the straight line to
+them.
+
+The fields of the goals shared by many episodes, those of a category of
+objects in a scene for ObjectNav, are kept by
+:ref:`GeodesicDistanceFieldCache` for the episodes of the scene, and can be
+computed offline into a file per scene with
+:ref:`habitat.datasets.object_nav.precompute_distance_fields`.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.npyio import NpzFile
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# Positions and goals further than this from the height of the field are on
+# another floor
+MAX_FLOOR_DISTANCE = 0.5
+# Goals are connected to the navigable grid points in the square of this
+# many points around them
+_GOAL_RADIUS = 2
+# Distances are stored in centimeters, with this for the unreachable points
+_UNREACHABLE_CM = np.iinfo(np.uint16).max
+# Moves along the grid, each with the points it goes by, which must be
+# navigable too. The opposite moves are the same edges.
+_MOVES: List[Tuple[Tuple[int, int], List[Tuple[int, int]]]] = [
+    ((0, 1), []),
+    ((1, 0), []),
+    ((1, 1), [(0, 1), (1, 0)]),
+    ((1, -1), [(0, -1), (1, 0)]),
+    ((1, 2), [(0, 1), (1, 1)]),
+    ((2, 1), [(1, 0), (1, 1)]),
+    ((1, -2), [(0, -1), (1, -1)]),
+    ((2, -1), [(1, 0), (1, -1)]),
+]
+
+
+def _shifted(grid: np.ndarray, di: int, dj: int) -> np.ndarray:
+    r"""Returns :py:`shifted[i, j] = grid[i + di, j + dj]`, False outside of
+    the grid.
+    """
+    shifted = np.zeros_like(grid)
+    rows, cols = grid.shape
+    shifted[
+        max(0, -di) : rows - max(0, di), max(0, -dj) : cols - max(0, dj)
+    ] = grid[max(0, di) : rows + min(0, di), max(0, dj) : cols + min(0, dj)]
+    return shifted
+
+
+class GeodesicDistanceField:
+    r"""Geodesic distances to a set of goals on a grid of the points of a
+    floor, see :ref:`from_pathfinder`.
+
+    :data distances: distance of the grid points, :py:`inf` for the points
+        that aren't navigable or from which no goal is reachable. Rows go
+        along z and columns along x.
+    :data lower_bound: x and z of the grid point :py:`[0, 0]`.
+    :data meters_per_pixel: distance between neighbouring grid points.
+    :data height: y of the floor.
+    :data other_floor_goals: positions of the goals that aren't on the
+        floor, one per row.
+    """
+
+    def __init__(
+        self,
+        distances: np.ndarray,
+        lower_bound: Tuple[float, float],
+        meters_per_pixel: float,
+        height: float,
+        other_floor_goals: Optional[np.ndarray] = None,
+    ) -> None:
+        self.distances = distances
+        self.lower_bound = lower_bound
+        self.meters_per_pixel = meters_per_pixel
+        self.height = height
+        if other_floor_goals is None:
+            other_floor_goals = np.empty((0, 3))
+        self.other_floor_goals = other_floor_goals
+
+    @classmethod
+    def from_navigable_grid(
+        cls,
+        navigable: np.ndarray,
+        lower_bound: Tuple[float, float],
+        meters_per_pixel: float,
+        height: float,
+        goal_positions: Sequence[Sequence[float]],
+    ) -> Optional["GeodesicDistanceField"]:
+        r"""Computes the field of :p:`goal_positions` on the grid of
+        navigable points :p:`navigable`, laid out as
+        ``pathfinder.get_topdown_view()``.
+
+        :return: the field, or :py:`None` if no goal on the floor is next
+            to a navigable grid point.
+        """
+        navigable = np.asarray(navigable, dtype=bool)
+        rows, cols = navigable.shape
+        num_points = rows * cols
+        index = np.arange(num_points).reshape(rows, cols)
+
+        sources = []
+        targets = []
+        weights = []
+        for (di, dj), passed_by in _MOVES:
+            valid = navigable & _shifted(navigable, di, dj)
+            for pi, pj in passed_by:
+                valid &= _shifted(navigable, pi, pj)
+            sources.append(index[valid])
+            targets.append(index[valid] + di * cols + dj)
+            weights.append(
+                np.full(
+                    sources[-1].shape,
+                    math.hypot(di, dj) * meters_per_pixel,
+                )
+            )
+
+        # All the goals are connected to one more point, the distances are
+        # those from it
+        goal_index = num_points
+        num_connected_goals = 0
+        other_floor_goals = []
+        for goal_position in goal_positions:
+            if abs(goal_position[1] - height) > MAX_FLOOR_DISTANCE:
+                other_floor_goals.append(goal_position)
+                continue
+            gi = (goal_position[2] - lower_bound[1]) / meters_per_pixel
+            gj = (goal_position[0] - lower_bound[0]) / meters_per_pixel
+            i_range = np.arange(
+                max(0, math.floor(gi) - _GOAL_RADIUS + 1),
+                min(rows, math.floor(gi) + _GOAL_RADIUS + 1),
+            )
+            j_range = np.arange(
+                max(0, math.floor(gj) - _GOAL_RADIUS + 1),
+                min(cols, math.floor(gj) + _GOAL_RADIUS + 1),
+            )
+            ii, jj = np.meshgrid(i_range, j_range, indexing="ij")
+            near = navigable[ii, jj]
+            if not near.any():
+                continue
+            num_connected_goals += 1
+            sources.append(np.full(near.sum(), goal_index))
+            targets.append(index[ii[near], jj[near]])
+            # Explicit zeros aren't edges of the graph
+            weights.append(
+                np.maximum(
+                    np.hypot(ii[near] - gi, jj[near] - gj) * meters_per_pixel,
+                    1e-6,
+                )
+            )
+        if num_connected_goals == 0:
+            return None
+
+        graph = coo_matrix(
+            (
+                np.concatenate(weights),
+                (np.concatenate(sources), np.concatenate(targets)),
+            ),
+            shape=(num_points + 1, num_points + 1),
+        ).tocsr()
+        distances = dijkstra(graph, directed=False, indices=goal_index)
+        return cls(
+            distances[:num_points].reshape(rows, cols).astype(np.float32),
+            lower_bound,
+            meters_per_pixel,
+            height,
+            np.array(other_floor_goals, dtype=np.float64).reshape(-1, 3),
+        )
+
+    @classmethod
+    def from_pathfinder(
+        cls,
+        pathfinder,
+        goal_positions: Sequence[Sequence[float]],
+        height: float,
+        meters_per_pixel: float = 0.05,
+    ) -> Optional["GeodesicDistanceField"]:
+        r"""Computes the field of :p:`goal_positions` on the floor of the
+        navmesh of :p:`pathfinder` at :p:`height`, see
+        :ref:`from_navigable_grid`.
+        """
+        lower_bound, _ = pathfinder.get_bounds()
+        navigable = pathfinder.get_topdown_view(
+            meters_per_pixel=meters_per_pixel, height=height
+        )
+        return cls.from_navigable_grid(
+            navigable,
+            (float(lower_bound[0]), float(lower_bound[2])),
+            meters_per_pixel,
+            height,
+            goal_positions,
+        )
+
+    def distance(self, position: Sequence[float]) -> Optional[float]:
+        r"""Returns the geodesic distance from :p:`position` to the closest
+        goal, interpolated between the grid points around it that a goal is
+        reachable from.
+
+        :return: the distance, or :py:`None` if :p:`position` is on another
+            floor, has no such grid point around it or if a goal on another
+            floor could be closer.
+        """
+        if abs(position[1] - self.height) > MAX_FLOOR_DISTANCE:
+            return None
+        fi = (position[2] - self.lower_bound[1]) / self.meters_per_pixel
+        fj = (position[0] - self.lower_bound[0]) / self.meters_per_pixel
+        i0 = math.floor(fi)
+        j0 = math.floor(fj)
+        rows, cols = self.distances.shape
+        if i0 < -1 or j0 < -1 or i0 >= rows or j0 >= cols:
+            return None
+
+        total = 0.0
+        total_weight = 0.0
+        for i, wi in ((i0, i0 + 1 - fi), (i0 + 1, fi - i0)):
+            if not 0 <= i < rows:
+                continue
+            for j, wj in ((j0, j0 + 1 - fj), (j0 + 1, fj - j0)):
+                if not 0 <= j < cols:
+                    continue
+                distance = float(self.distances[i, j])
+                if math.isinf(distance):
+                    continue
+                total += wi * wj * distance
+                total_weight += wi * wj
+        if total_weight == 0.0:
+            return None
+        distance = total / total_weight
+        if len(self.other_floor_goals) > 0:
+            # Geodesic distances are at least the straight line
+            closest_other_floor_goal = np.sqrt(
+                np.min(
+                    np.sum(
+                        (self.other_floor_goals - np.asarray(position)) ** 2,
+                        axis=1,
+                    )
+                )
+            )
+            if distance > closest_other_floor_goal:
+                return None
+        return distance
+
+
+def save_distance_fields(
+    path: str, fields: Dict[str, List[GeodesicDistanceField]]
+) -> None:
+    r"""Writes the fields of the goals of a scene, by key of the goals, to
+    the compressed :p:`path`. Distances are rounded to centimeters.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    keys: List[str] = []
+    heights: List[float] = []
+    for key, key_fields in fields.items():
+        for field in key_fields:
+            i = len(keys)
+            keys.append(key)
+            heights.append(field.height)
+            arrays[f"distances_{i}"] = np.where(
+                np.isinf(field.distances),
+                _UNREACHABLE_CM,
+                np.minimum(
+                    np.round(field.distances * 100), _UNREACHABLE_CM - 1
+                ),
+            ).astype(np.uint16)
+            arrays[f"grid_{i}"] = np.array(
+                [*field.lower_bound, field.meters_per_pixel]
+            )
+            arrays[f"other_floor_goals_{i}"] = field.other_floor_goals
+    arrays["keys"] = np.array(keys, dtype=str)
+    arrays["heights"] = np.array(heights, dtype=np.float64)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # np.savez adds the extension to names without it
+    tmp_path = f"{path}.tmp{os.getpid()}.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+class GeodesicDistanceFieldCache:
+    r"""Fields of the goals shared by the episodes of a scene, by key of the
+    goals.
+
+    Fields are looked up in the file of the scene in :p:`cache_dir`,
+    written by :ref:`save_distance_fields`, which is opened when an episode
+    of the scene first asks for one and only decompresses the fields that
+    are asked for. Fields computed for the scene are kept with :ref:`add`.
+    Only the fields of the last scene are kept.
+    """
+
+    def __init__(self, cache_dir: str = "") -> None:
+        self.cache_dir = cache_dir
+        self._scene: Optional[str] = None
+        self._scene_file: Optional[NpzFile] = None
+        # Heights and indices of the fields of the file not loaded yet
+        self._file_fields: Dict[str, List[Tuple[float, int]]] = {}
+        self._fields: Dict[str, List[GeodesicDistanceField]] = {}
+
+    @staticmethod
+    def scene_file_path(cache_dir: str, scene_id: str) -> str:
+        scene = os.path.splitext(os.path.basename(scene_id))[0]
+        return os.path.join(cache_dir, f"{scene}.npz")
+
+    def _enter_scene(self, scene_id: str) -> None:
+        if scene_id == self._scene:
+            return
+        if self._scene_file is not None:
+            self._scene_file.close()
+        self._scene = scene_id
+        self._scene_file = None
+        self._file_fields = {}
+        self._fields = {}
+        if not self.cache_dir:
+            return
+        path = self.scene_file_path(self.cache_dir, scene_id)
+        if not os.path.exists(path):
+            return
+
+        self._scene_file = np.load(path)
+        keys = self._scene_file["keys"].tolist()
+        heights = self._scene_file["heights"].tolist()
+        for i, (key, height) in enumerate(zip(keys, heights)):
+            self._file_fields.setdefault(key, []).append((height, i))
+
+    def _load_field(self, i: int, height: float) -> GeodesicDistanceField:
+        distances_cm = self._scene_file[f"distances_{i}"]
+        distances = distances_cm.astype(np.float32) / 100
+        distances[distances_cm == _UNREACHABLE_CM] = np.inf
+        lower_x, lower_z, meters_per_pixel = self._scene_file[f"grid_{i}"]
+        return GeodesicDistanceField(
+            distances,
+            (float(lower_x), float(lower_z)),
+            float(meters_per_pixel),
+            height,
+            self._scene_file[f"other_floor_goals_{i}"],
+        )
+
+    def get(
+        self, scene_id: str, goals_key: str, height: float
+    ) -> Optional[GeodesicDistanceField]:
+        r"""Returns the field of the goals :p:`goals_key` of the scene on the
+        floor at :p:`height`, or :py:`None` if there is none.
+        """
+        self._enter_scene(scene_id)
+        for field in self._fields.get(goals_key, []):
+            if abs(field.height - height) <= MAX_FLOOR_DISTANCE:
+                return field
+
+        file_fields = self._file_fields.get(goals_key, [])
+        for j, (field_height, i) in enumerate(file_fields):
+            if abs(field_height - height) <= MAX_FLOOR_DISTANCE:
+                del file_fields[j]
+                field = self._load_field(i, field_height)
+                self._fields.setdefault(goals_key, []).append(field)
+                return field
+        return None
+
+    def add(
+        self, scene_id: str, goals_key: str, field: GeodesicDistanceField
+    ) -> None:
+        self._enter_scene(scene_id)
+        self._fields.setdefault(goals_key, []).append(field)
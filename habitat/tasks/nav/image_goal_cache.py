@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Cache of the goal images of the ImageNav episodes.
+
+:ref:`ImageGoalSensor` renders the goal image of an episode on its first
+step. With :ref:`ImageGoalCache`, the images are kept in memory for the
+last episodes, and in a compressed file per episode on disk,
+``{cache_dir}/{sensors_key}/{scene}/{episode_id}-{goal_key}.npz``. The
+files of a dataset can be written offline with
+:ref:`habitat.datasets.pointnav.precompute_image_goals`.
+
+An image depends on the sensors of the agent and on the goal it is
+rendered at, not only on the scene and the episode id: ``sensors_key`` is a
+hash of the configs of the sensors of the agent, see
+:ref:`image_goal_sensors_key`, and ``goal_key`` a hash of the goal
+position. Both are also stored in the files, files that don't match them or
+hold images of another shape are ignored.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from habitat.config import Config
+
+
+def image_goal_sensors_key(sim_config: Optional[Config]) -> str:
+    r"""Returns a hash of the configs of the sensors of the default agent of
+    :p:`sim_config`, their type, resolution, field of view, position and
+    orientation among others. Empty without a config of agents.
+    """
+    if sim_config is None or "AGENTS" not in sim_config:
+        return ""
+    agent_config = getattr(
+        sim_config, sim_config.AGENTS[sim_config.DEFAULT_AGENT_ID]
+    )
+    sensor_configs = {
+        sensor_name: getattr(sim_config, sensor_name)
+        for sensor_name in agent_config.SENSORS
+    }
+    return hashlib.sha1(
+        json.dumps(sensor_configs, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def _goal_key(goal_position: Sequence[float]) -> str:
+    return hashlib.sha1(
+        np.asarray(goal_position, dtype=np.float32).tobytes()
+    ).hexdigest()[:16]
+
+
+class ImageGoalCache:
+    r"""Goal images by scene, episode id and goal position, the
+    :p:`max_size` last used in memory and all of them in :p:`cache_dir`.
+
+    :param max_size: number of images kept in memory, none if 0.
+    :param cache_dir: directory of the files of the images, the images are
+        only kept in memory if empty.
+    :param image_shape: shape of the images, files with images of another
+        shape are ignored.
+    :param sensors_key: :ref:`image_goal_sensors_key` of the simulator the
+        images are rendered with, files of other sensors are ignored.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 0,
+        cache_dir: str = "",
+        image_shape: Optional[Sequence[int]] = None,
+        sensors_key: str = "",
+    ) -> None:
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.image_shape = (
+            tuple(image_shape) if image_shape is not None else None
+        )
+        self.sensors_key = sensors_key
+        self._images: "OrderedDict[Tuple[str, str, str], np.ndarray]" = (
+            OrderedDict()
+        )
+
+    def image_path(
+        self, scene_id: str, episode_id: str, goal_position: Sequence[float]
+    ) -> str:
+        scene = os.path.splitext(os.path.basename(scene_id))[0]
+        return os.path.join(
+            self.cache_dir,
+            self.sensors_key,
+            scene,
+            f"{episode_id}-{_goal_key(goal_position)}.npz",
+        )
+
+    def _remember(self, key: Tuple[str, str, str], image: np.ndarray) -> None:
+        if self.max_size <= 0:
+            return
+        self._images[key] = image
+        self._images.move_to_end(key)
+        while len(self._images) > self.max_size:
+            self._images.popitem(last=False)
+
+    def get(
+        self, scene_id: str, episode_id: str, goal_position: Sequence[float]
+    ) -> Optional[np.ndarray]:
+        r"""Returns the goal image of the episode, or :py:`None` if it isn't
+        cached.
+        """
+        key = (scene_id, str(episode_id), _goal_key(goal_position))
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            return image
+        if not self.cache_dir:
+            return None
+
+        path = self.image_path(scene_id, str(episode_id), goal_position)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as image_file:
+            if (
+                "sensors_key" not in image_file
+                or str(image_file["sensors_key"]) != self.sensors_key
+                or str(image_file["goal_key"]) != key[2]
+            ):
+                return None
+            image = image_file["image"]
+        if self.image_shape is not None and image.shape != self.image_shape:
+            return None
+        self._remember(key, image)
+        return image
+
+    def put(
+        self,
+        scene_id: str,
+        episode_id: str,
+        goal_position: Sequence[float],
+        image: np.ndarray,
+    ) -> None:
+        r"""Caches the goal image of the episode, writing its file if it
+        doesn't exist.
+        """
+        key = (scene_id, str(episode_id), _goal_key(goal_position))
+        self._remember(key, image)
+        if not self.cache_dir:
+            return
+
+        path = self.image_path(scene_id, str(episode_id), goal_position)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # np.savez adds the extension to names without it
+        tmp_path = f"{path}.tmp{os.getpid()}.npz"
+        np.savez_compressed(
+            tmp_path,
+            image=np.asarray(image, dtype=np.uint8),
+            sensors_key=np.array(self.sensors_key),
+            goal_key=np.array(key[2]),
+        )
+        os.replace(tmp_path, path)
+
+    def __contains__(self, key: Tuple[str, str, Sequence[float]]) -> bool:
+        scene_id, episode_id, goal_position = key
+        return (
+            scene_id,
+            str(episode_id),
+            _goal_key(goal_position),
+        ) in self._images or (
+            bool(self.cache_dir)
+            and os.path.exists(
+                self.image_path(scene_id, str(episode_id), goal_position)
+            )
+        )
@@ -6,7 +6,7 @@
 
 # TODO, lots of typing errors in here
 
-from typing import Any, List, Optional, Tuple
+from typing import Any, List, Optional, Sequence, Tuple, cast
 
 import attr
 import numpy as np
@@ -18,11 +18,13 @@ from habitat.core.embodied_task import (
     EmbodiedTask,
     Measure,
     SimulatorTaskAction,
+    get_agent_state_snapshot,
 )
 from habitat.core.logging import logger
 from habitat.core.registry import registry
 from habitat.core.simulator import (
     AgentState,
+    AgentStateSnapshot,
     RGBSensor,
     Sensor,
     SensorTypes,
@@ -32,6 +34,14 @@ from habitat.core.simulator import (
 from habitat.core.spaces import ActionSpace
 from habitat.core.utils import not_none_validator, try_cv2_import
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.tasks.nav.geodesic_distance_field import (
+    GeodesicDistanceField,
+    GeodesicDistanceFieldCache,
+)
+from habitat.tasks.nav.image_goal_cache import (
+    ImageGoalCache,
+    image_goal_sensors_key,
+)
 from habitat.tasks.utils import cartesian_to_polar
 from habitat.utils.geometry_utils import (
     quaternion_from_coeff,
@@ -75,7 +85,7 @@ def merge_sim_episode_config(sim_config: Config, episode: Episode) -> Any:
     return sim_config
 
 
-@attr.s(auto_attribs=True, kw_only=True)
+@attr.s(auto_attribs=True, kw_only=True, slots=True, getstate_setstate=False)
 class NavigationGoal:
     r"""Base class for a goal specification hierarchy."""
 
@@ -83,7 +93,7 @@ class NavigationGoal:
     radius: Optional[float] = None
 
 
-@attr.s(auto_attribs=True, kw_only=True)
+@attr.s(auto_attribs=True, kw_only=True, slots=True, getstate_setstate=False)
 class RoomGoal(NavigationGoal):
     r"""Room goal that can be specified by room_id or position with radius."""
 
@@ -91,7 +101,7 @@ class RoomGoal(NavigationGoal):
     room_name: Optional[str] = None
 
 
-@attr.s(auto_attribs=True, kw_only=True)
+@attr.s(auto_attribs=True, kw_only=True, slots=True, getstate_setstate=False)
 class NavigationEpisode(Episode):
     r"""Class for episode specification that includes initial position and
     rotation of agent, scene name, goal and optional shortest paths. An
@@ -106,14 +116,15 @@ class NavigationEpisode(Episode):
             orientation. ref: https://en.wikipedia.org/wiki/Versor
         goals: list of goals specifications
         start_room: room id
-        shortest_paths: list containing shortest paths to goals
+        shortest_paths: list containing shortest paths to goals, lists of
+            points or :ref:`CompactShortestPath`
     """
 
     goals: List[NavigationGoal] = attr.ib(
         default=None, validator=not_none_validator
     )
     start_room: Optional[str] = None
-    shortest_paths: Optional[List[List[ShortestPathPoint]]] = None
+    shortest_paths: Optional[List[Sequence[ShortestPathPoint]]] = None
 
 
 @registry.register_sensor
@@ -139,6 +150,8 @@ class PointGoalSensor(Sensor):
         _dimensionality: number of dimensions used to specify the goal
     """
     cls_uuid: str = "pointgoal"
+    # The goal is given from the start of the episode
+    is_static_per_episode = True
 
     def __init__(
         self, sim: Simulator, config: Config, *args: Any, **kwargs: Any
@@ -253,6 +266,19 @@ class ImageGoalSensor(Sensor):
         self._current_image_goal = None
         super().__init__(config=config)
 
+        self._image_goal_cache: Optional[ImageGoalCache] = None
+        cache_size = getattr(config, "CACHE_SIZE", 0)
+        cache_dir = getattr(config, "CACHE_DIR", "")
+        if cache_size > 0 or cache_dir:
+            self._image_goal_cache = ImageGoalCache(
+                max_size=cache_size,
+                cache_dir=cache_dir,
+                image_shape=self.observation_space.shape,
+                sensors_key=image_goal_sensors_key(
+                    getattr(self._sim, "habitat_config", None)
+                ),
+            )
+
     def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
         return self.cls_uuid
 
@@ -264,7 +290,9 @@ class ImageGoalSensor(Sensor):
             self._rgb_sensor_uuid
         ]
 
-    def _get_pointnav_episode_image_goal(self, episode: NavigationEpisode):
+    def _get_image_goal_pose(
+        self, episode: NavigationEpisode
+    ) -> Tuple[List[float], List[float]]:
         goal_position = np.array(episode.goals[0].position, dtype=np.float32)
         # to be sure that the rotation is the same for the same episode_id
         # since the task is currently using pointnav Dataset.
@@ -272,11 +300,30 @@ class ImageGoalSensor(Sensor):
         rng = np.random.RandomState(seed)
         angle = rng.uniform(0, 2 * np.pi)
         source_rotation = [0, np.sin(angle / 2), 0, np.cos(angle / 2)]
+        return goal_position.tolist(), source_rotation
+
+    def _get_pointnav_episode_image_goal(self, episode: NavigationEpisode):
+        goal_position, source_rotation = self._get_image_goal_pose(episode)
         goal_observation = self._sim.get_observations_at(
-            position=goal_position.tolist(), rotation=source_rotation
+            position=goal_position, rotation=source_rotation
         )
         return goal_observation[self._rgb_sensor_uuid]
 
+    def get_image_goals(
+        self, episodes: Sequence[NavigationEpisode]
+    ) -> np.ndarray:
+        r"""Renders the goal images of :p:`episodes`, which are in the scene
+        of the simulator, at once.
+
+        :return: the images stacked along a first axis of episodes.
+        """
+        poses = [self._get_image_goal_pose(episode) for episode in episodes]
+        goal_observations = self._sim.get_observations_at_poses(
+            [position for position, _ in poses],
+            [rotation for _, rotation in poses],
+        )
+        return goal_observations[self._rgb_sensor_uuid]
+
     def get_observation(
         self,
         *args: Any,
@@ -288,9 +335,21 @@ class ImageGoalSensor(Sensor):
         if episode_uniq_id == self._current_episode_id:
             return self._current_image_goal
 
-        self._current_image_goal = self._get_pointnav_episode_image_goal(
-            episode
-        )
+        image_goal = None
+        if self._image_goal_cache is not None:
+            image_goal = self._image_goal_cache.get(
+                episode.scene_id, episode.episode_id, episode.goals[0].position
+            )
+        if image_goal is None:
+            image_goal = self._get_pointnav_episode_image_goal(episode)
+            if self._image_goal_cache is not None:
+                self._image_goal_cache.put(
+                    episode.scene_id,
+                    episode.episode_id,
+                    episode.goals[0].position,
+                    image_goal,
+                )
+        self._current_image_goal = image_goal
         self._current_episode_id = episode_uniq_id
 
         return self._current_image_goal
@@ -326,7 +385,7 @@ class IntegratedPointGoalGPSAndCompassSensor(PointGoalSensor):
     def get_observation(
         self, observations, episode, *args: Any, **kwargs: Any
     ):
-        agent_state = self._sim.get_agent_state()
+        agent_state = get_agent_state_snapshot(self._sim, kwargs.get("task"))
         agent_position = agent_state.position
         rotation_world_agent = agent_state.rotation
         goal_position = np.array(episode.goals[0].position, dtype=np.float32)
@@ -373,10 +432,9 @@ class HeadingSensor(Sensor):
     def get_observation(
         self, observations, episode, *args: Any, **kwargs: Any
     ):
-        agent_state = self._sim.get_agent_state()
-        rotation_world_agent = agent_state.rotation
+        agent_state = get_agent_state_snapshot(self._sim, kwargs.get("task"))
 
-        return self._quat_to_xy_heading(rotation_world_agent.inverse())
+        return np.array([agent_state.heading], dtype=np.float32)
 
 
 @registry.register_sensor(name="CompassSensor")
@@ -392,7 +450,7 @@ class EpisodicCompassSensor(HeadingSensor):
     def get_observation(
         self, observations, episode, *args: Any, **kwargs: Any
     ):
-        agent_state = self._sim.get_agent_state()
+        agent_state = get_agent_state_snapshot(self._sim, kwargs.get("task"))
         rotation_world_agent = agent_state.rotation
         rotation_world_start = quaternion_from_coeff(episode.start_rotation)
 
@@ -441,7 +499,7 @@ class EpisodicGPSSensor(Sensor):
     def get_observation(
         self, observations, episode, *args: Any, **kwargs: Any
     ):
-        agent_state = self._sim.get_agent_state()
+        agent_state = get_agent_state_snapshot(self._sim, kwargs.get("task"))
 
         origin = np.array(episode.start_position, dtype=np.float32)
         rotation_world_start = quaternion_from_coeff(episode.start_rotation)
@@ -493,7 +551,9 @@ class ProximitySensor(Sensor):
     def get_observation(
         self, observations, *args: Any, episode, **kwargs: Any
     ):
-        current_position = self._sim.get_agent_state().position
+        current_position = get_agent_state_snapshot(
+            self._sim, kwargs.get("task")
+        ).position
 
         return np.array(
             [
@@ -513,6 +573,8 @@ class Success(Measure):
     """
 
     cls_uuid: str = "success"
+    dependencies = ("distance_to_goal",)
+    is_lazy = True
 
     def __init__(
         self, sim: Simulator, config: Config, *args: Any, **kwargs: Any
@@ -559,6 +621,8 @@ class SPL(Measure):
     performance for sophisticated goal areas.
     """
 
+    dependencies: Sequence[str] = ("distance_to_goal", "success")
+
     def __init__(
         self, sim: Simulator, config: Config, *args: Any, **kwargs: Any
     ):
@@ -579,7 +643,9 @@ class SPL(Measure):
             self.uuid, [DistanceToGoal.cls_uuid, Success.cls_uuid]
         )
 
-        self._previous_position = self._sim.get_agent_state().position
+        self._previous_position = get_agent_state_snapshot(
+            self._sim, task
+        ).position
         self._agent_episode_distance = 0.0
         self._start_end_episode_distance = task.measurements.measures[
             DistanceToGoal.cls_uuid
@@ -596,7 +662,7 @@ class SPL(Measure):
     ):
         ep_success = task.measurements.measures[Success.cls_uuid].get_metric()
 
-        current_position = self._sim.get_agent_state().position
+        current_position = get_agent_state_snapshot(self._sim, task).position
         self._agent_episode_distance += self._euclidean_distance(
             current_position, self._previous_position
         )
@@ -619,6 +685,8 @@ class SoftSPL(SPL):
     success is now calculated as 1 - (ratio of distance covered to target).
     """
 
+    dependencies = ("distance_to_goal",)
+
     def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
         return "softspl"
 
@@ -627,7 +695,9 @@ class SoftSPL(SPL):
             self.uuid, [DistanceToGoal.cls_uuid]
         )
 
-        self._previous_position = self._sim.get_agent_state().position
+        self._previous_position = get_agent_state_snapshot(
+            self._sim, task
+        ).position
         self._agent_episode_distance = 0.0
         self._start_end_episode_distance = task.measurements.measures[
             DistanceToGoal.cls_uuid
@@ -635,7 +705,7 @@ class SoftSPL(SPL):
         self.update_metric(episode=episode, task=task, *args, **kwargs)  # type: ignore
 
     def update_metric(self, episode, task, *args: Any, **kwargs: Any):
-        current_position = self._sim.get_agent_state().position
+        current_position = get_agent_state_snapshot(self._sim, task).position
         distance_to_target = task.measurements.measures[
             DistanceToGoal.cls_uuid
         ].get_metric()
@@ -683,7 +753,12 @@ class Collisions(Measure):
 
 @registry.register_measure
 class TopDownMap(Measure):
-    r"""Top Down Map measure"""
+    r"""Top Down Map measure
+
+    The trajectory of the agent is drawn on the map when the metric is
+    read, so that steps in which it isn't read only record the pose of the
+    agent.
+    """
 
     def __init__(
         self, sim: "HabitatSim", config: Config, *args: Any, **kwargs: Any
@@ -700,6 +775,9 @@ class TopDownMap(Measure):
         self._previous_xy_location: Optional[Tuple[int, int]] = None
         self._top_down_map: Optional[np.ndarray] = None
         self._shortest_path_points: Optional[List[Tuple[int, int]]] = None
+        # Step count, position and angle of the agent in the steps that
+        # aren't drawn yet
+        self._pending_steps: List[Tuple[int, np.ndarray, np.ndarray]] = []
         self.line_thickness = int(
             np.round(self._map_resolution * 2 / MAP_THICKNESS_SCALAR)
         )
@@ -843,8 +921,10 @@ class TopDownMap(Measure):
     def reset_metric(self, episode, *args: Any, **kwargs: Any):
         self._step_count = 0
         self._metric = None
+        self._pending_steps = []
         self._top_down_map = self.get_original_map()
-        agent_position = self._sim.get_agent_state().position
+        agent_state = get_agent_state_snapshot(self._sim, kwargs.get("task"))
+        agent_position = agent_state.position
         a_x, a_y = maps.to_grid(
             agent_position[2],
             agent_position[0],
@@ -853,7 +933,9 @@ class TopDownMap(Measure):
         )
         self._previous_xy_location = (a_y, a_x)
 
-        self.update_fog_of_war_mask(np.array([a_x, a_y]))
+        self.update_fog_of_war_mask(
+            np.array([a_x, a_y]), self.get_polar_angle(agent_state)
+        )
 
         # draw source and target parts last to avoid overlap
         self._draw_goals_view_points(episode)
@@ -869,31 +951,41 @@ class TopDownMap(Measure):
 
     def update_metric(self, episode, action, *args: Any, **kwargs: Any):
         self._step_count += 1
-        house_map, map_agent_x, map_agent_y = self.update_map(
-            self._sim.get_agent_state().position
+        agent_state = get_agent_state_snapshot(self._sim, kwargs.get("task"))
+        self._pending_steps.append(
+            (
+                self._step_count,
+                agent_state.position,
+                self.get_polar_angle(agent_state),
+            )
         )
 
-        self._metric = {
-            "map": house_map,
-            "fog_of_war_mask": self._fog_of_war_mask,
-            "agent_map_coord": (map_agent_x, map_agent_y),
-            "agent_angle": self.get_polar_angle(),
-        }
-
-    def get_polar_angle(self):
-        agent_state = self._sim.get_agent_state()
-        # quaternion is in x, y, z, w format
-        ref_rotation = agent_state.rotation
+    def get_metric(self):
+        if len(self._pending_steps) > 0:
+            for step_count, agent_position, agent_angle in self._pending_steps:
+                self._step_count = step_count
+                house_map, map_agent_x, map_agent_y = self.update_map(
+                    agent_position, agent_angle
+                )
+            self._pending_steps = []
 
-        heading_vector = quaternion_rotate_vector(
-            ref_rotation.inverse(), np.array([0, 0, -1])
-        )
+            self._metric = {
+                "map": house_map,
+                "fog_of_war_mask": self._fog_of_war_mask,
+                "agent_map_coord": (map_agent_x, map_agent_y),
+                "agent_angle": agent_angle,
+            }
+        return super().get_metric()
 
-        phi = cartesian_to_polar(-heading_vector[2], heading_vector[0])[1]
+    def get_polar_angle(
+        self, agent_state: Optional[AgentStateSnapshot] = None
+    ):
+        if agent_state is None:
+            agent_state = get_agent_state_snapshot(self._sim)
         z_neg_z_flip = np.pi
-        return np.array(phi) + z_neg_z_flip
+        return np.array(agent_state.heading) + z_neg_z_flip
 
-    def update_map(self, agent_position):
+    def update_map(self, agent_position, agent_angle=None):
         a_x, a_y = maps.to_grid(
             agent_position[2],
             agent_position[0],
@@ -915,18 +1007,20 @@ class TopDownMap(Measure):
                 thickness=thickness,
             )
 
-        self.update_fog_of_war_mask(np.array([a_x, a_y]))
+        self.update_fog_of_war_mask(np.array([a_x, a_y]), agent_angle)
 
         self._previous_xy_location = (a_y, a_x)
         return self._top_down_map, a_x, a_y
 
-    def update_fog_of_war_mask(self, agent_position):
+    def update_fog_of_war_mask(self, agent_position, agent_angle=None):
         if self._config.FOG_OF_WAR.DRAW:
+            if agent_angle is None:
+                agent_angle = self.get_polar_angle()
             self._fog_of_war_mask = fog_of_war.reveal_fog_of_war(
                 self._top_down_map,
                 self._fog_of_war_mask,
                 agent_position,
-                self.get_polar_angle(),
+                agent_angle,
                 fov=self._config.FOG_OF_WAR.FOV,
                 max_line_len=self._config.FOG_OF_WAR.VISIBILITY_DIST
                 / maps.calculate_meters_per_pixel(
@@ -937,9 +1031,20 @@ class TopDownMap(Measure):
 
 @registry.register_measure
 class DistanceToGoal(Measure):
-    """The measure calculates a distance towards the goal."""
+    """The measure calculates a distance towards the goal.
+
+    With ``DISTANCE_FIELD.ENABLED``, the distances are looked up in a
+    :ref:`GeodesicDistanceField` of the goals computed on reset instead of
+    queried from the navmesh on every step. Distances below
+    ``DISTANCE_FIELD.EXACT_DISTANCE`` and those of positions out of the
+    field are still queried. The fields of the view points of episodes that
+    share their goals, see :ref:`ObjectGoalNavEpisode.goals_key`, are kept
+    for the episodes of the scene, and loaded from the files of
+    ``DISTANCE_FIELD.CACHE_DIR`` if they were computed offline.
+    """
 
     cls_uuid: str = "distance_to_goal"
+    is_lazy = True
 
     def __init__(
         self, sim: Simulator, config: Config, *args: Any, **kwargs: Any
@@ -950,6 +1055,13 @@ class DistanceToGoal(Measure):
         self._episode_view_points: Optional[
             List[Tuple[float, float, float]]
         ] = None
+        self._distance_field: Optional[GeodesicDistanceField] = None
+        self._distance_field_cache: Optional[GeodesicDistanceFieldCache] = None
+        field_config = config.get("DISTANCE_FIELD", None)
+        if field_config is not None and field_config.ENABLED:
+            self._distance_field_cache = GeodesicDistanceFieldCache(
+                field_config.CACHE_DIR
+            )
 
         super().__init__(**kwargs)
 
@@ -960,41 +1072,102 @@ class DistanceToGoal(Measure):
         self._previous_position = None
         self._metric = None
         if self._config.DISTANCE_TO == "VIEW_POINTS":
-            if hasattr(episode.goals[0].view_points[0], 'agent_state'):
-                self._episode_view_points = [
-                    view_point.agent_state.position
-                    for goal in episode.goals
-                    for view_point in goal.view_points
-                ]
-            else:
-                self._episode_view_points = [
-                    view_point.position
-                    for goal in episode.goals
-                    for view_point in goal.view_points
-                ]
+            self._episode_view_points = self.get_view_point_positions(
+                episode.goals
+            )
+        self._distance_field = None
+        if self._distance_field_cache is not None:
+            self._distance_field = self._get_distance_field(episode)
         self.update_metric(episode=episode, *args, **kwargs)  # type: ignore
 
+    @staticmethod
+    def get_view_point_positions(
+        goals: Sequence[Any],
+    ) -> List[Tuple[float, float, float]]:
+        if hasattr(goals[0].view_points[0], "agent_state"):
+            return [
+                view_point.agent_state.position
+                for goal in goals
+                for view_point in goal.view_points
+            ]
+        else:
+            return [
+                view_point.position
+                for goal in goals
+                for view_point in goal.view_points
+            ]
+
+    def _get_distance_field(
+        self, episode: NavigationEpisode
+    ) -> Optional[GeodesicDistanceField]:
+        height = episode.start_position[1]
+        # Only the view points of the goals are shared by the episodes
+        goals_key = None
+        if self._config.DISTANCE_TO == "VIEW_POINTS":
+            goals_key = getattr(episode, "goals_key", None)
+        if goals_key is not None:
+            field = self._distance_field_cache.get(
+                episode.scene_id, goals_key, height
+            )
+            if field is not None:
+                return field
+
+        goal_positions: Sequence[Sequence[float]]
+        if self._config.DISTANCE_TO == "POINT":
+            goal_positions = [goal.position for goal in episode.goals]
+        else:
+            goal_positions = self._episode_view_points
+        # DISTANCE_FIELD requires a simulator with a pathfinder
+        field = GeodesicDistanceField.from_pathfinder(
+            cast("HabitatSim", self._sim).pathfinder,
+            goal_positions,
+            height=height,
+            meters_per_pixel=self._config.DISTANCE_FIELD.METERS_PER_PIXEL,
+        )
+        if field is not None and goals_key is not None:
+            self._distance_field_cache.add(episode.scene_id, goals_key, field)
+        return field
+
+    def _field_distance(self, position) -> Optional[float]:
+        if self._distance_field is None:
+            return None
+        distance = self._distance_field.distance(position)
+        if (
+            distance is None
+            or distance < self._config.DISTANCE_FIELD.EXACT_DISTANCE
+        ):
+            return None
+        return distance
+
+    def _query_distance(self, position, episode: NavigationEpisode):
+        if self._config.DISTANCE_TO == "POINT":
+            return self._sim.geodesic_distance(
+                position, [goal.position for goal in episode.goals], episode
+            )
+        elif self._config.DISTANCE_TO == "VIEW_POINTS":
+            return self._sim.geodesic_distance(
+                position, self._episode_view_points, episode
+            )
+        else:
+            logger.error(
+                f"Non valid DISTANCE_TO parameter was provided: {self._config.DISTANCE_TO}"
+            )
+            return None
+
     def update_metric(
         self, episode: NavigationEpisode, *args: Any, **kwargs: Any
     ):
-        current_position = self._sim.get_agent_state().position
+        current_position = get_agent_state_snapshot(
+            self._sim, kwargs.get("task")
+        ).position
 
         if self._previous_position is None or not np.allclose(
             self._previous_position, current_position, atol=1e-4
         ):
-            if self._config.DISTANCE_TO == "POINT":
-                distance_to_target = self._sim.geodesic_distance(
-                    current_position,
-                    [goal.position for goal in episode.goals],
-                    episode,
-                )
-            elif self._config.DISTANCE_TO == "VIEW_POINTS":
-                distance_to_target = self._sim.geodesic_distance(
-                    current_position, self._episode_view_points, episode
-                )
-            else:
-                logger.error(
-                    f"Non valid DISTANCE_TO parameter was provided: {self._config.DISTANCE_TO}"
+            distance_to_target = self._field_distance(current_position)
+            if distance_to_target is None:
+                distance_to_target = self._query_distance(
+                    current_position, episode
                 )
 
             self._previous_position = current_position
@@ -28,7 +28,7 @@ except ImportError:
     pass
 
 
-@attr.s(auto_attribs=True, kw_only=True)
+@attr.s(auto_attribs=True, kw_only=True, slots=True, getstate_setstate=False)
 class ObjectGoalNavEpisode(NavigationEpisode):
     r"""ObjectGoal Navigation Episode
 
@@ -42,7 +42,7 @@ class ObjectGoalNavEpisode(NavigationEpisode):
         return f"{os.path.basename(self.scene_id)}_{self.object_category}"
 
 
-@attr.s(auto_attribs=True)
+@attr.s(auto_attribs=True, slots=True, getstate_setstate=False)
 class ObjectViewLocation:
     r"""ObjectViewLocation provides information about a position around an object goal
     usually that is navigable and the object is visible with specific agent
@@ -65,7 +65,7 @@ class ObjectViewLocation:
     iou: Optional[float]
 
 
-@attr.s(auto_attribs=True, kw_only=True)
+@attr.s(auto_attribs=True, kw_only=True, slots=True, getstate_setstate=False)
 class ObjectGoal(NavigationGoal):
     r"""Object goal provides information about an object that is target for
     navigation. That can be specify object_id, position and object
@@ -112,6 +112,7 @@ class ObjectGoalSensor(Sensor):
         of categories id to text mapping.
     """
     cls_uuid: str = "objectgoal"
+    is_static_per_episode = True
 
     def __init__(
         self,
@@ -117,6 +117,7 @@ class AbsTargetStartSensor(MultiObjSensor):
     """
 
     cls_uuid: str = "abs_obj_start_sensor"
+    is_static_per_episode = True
 
     def _get_observation_space(self, *args, **kwargs):
         n_targets = self._task.get_n_targets()
@@ -153,6 +154,7 @@ class GoalSensor(MultiObjSensor):
 @registry.register_sensor
 class AbsGoalSensor(MultiObjSensor):
     cls_uuid: str = "abs_obj_goal_sensor"
+    is_static_per_episode = True
 
     def get_observation(self, *args, observations, episode, **kwargs):
         _, pos = self._sim.get_targets()
@@ -544,6 +546,7 @@ class RobotForce(Measure):
 @registry.register_measure
 class RearrangeReachReward(Measure):
     cls_uuid: str = "rearrange_reach_reward"
+    dependencies = (EndEffectorToRestDistance.cls_uuid,)
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -587,6 +590,7 @@ class RearrangeReachReward(Measure):
 @registry.register_measure
 class RearrangeReachSuccess(Measure):
     cls_uuid: str = "rearrange_reach_success"
+    dependencies = (EndEffectorToRestDistance.cls_uuid,)
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -623,6 +627,12 @@ class RearrangeReachSuccess(Measure):
 @registry.register_measure
 class RearrangePickReward(Measure):
     cls_uuid: str = "rearrangepick_reward"
+    dependencies = (
+        EndEffectorToObjectDistance.cls_uuid,
+        EndEffectorToRestDistance.cls_uuid,
+        "rearrangepick_success",
+        RobotForce.cls_uuid,
+    )
 
     def __init__(self, *args, sim, config, task, **kwargs):
         self._sim = sim
@@ -639,6 +649,7 @@ class RearrangePickReward(Measure):
             self.uuid,
             [
                 EndEffectorToObjectDistance.cls_uuid,
+                EndEffectorToRestDistance.cls_uuid,
                 RearrangePickSuccess.cls_uuid,
                 RobotForce.cls_uuid,
             ],
@@ -750,6 +761,10 @@ class RearrangePickReward(Measure):
 @registry.register_measure
 class RearrangePickSuccess(Measure):
     cls_uuid: str = "rearrangepick_success"
+    dependencies = (
+        EndEffectorToObjectDistance.cls_uuid,
+        EndEffectorToRestDistance.cls_uuid,
+    )
 
     def __init__(self, sim, config, *args, **kwargs):
         self._sim = sim
@@ -763,7 +778,11 @@ class RearrangePickSuccess(Measure):
 
     def reset_metric(self, *args, episode, task, observations, **kwargs):
         task.measurements.check_measure_dependencies(
-            self.uuid, [EndEffectorToObjectDistance.cls_uuid]
+            self.uuid,
+            [
+                EndEffectorToObjectDistance.cls_uuid,
+                EndEffectorToRestDistance.cls_uuid,
+            ],
         )
         self._prev_ee_pos = observations["ee_pos"]
         self.update_metric(
@@ -7,6 +7,7 @@
 import copy
 from typing import Any, Dict, List, Union
 
+import attr
 import numpy as np
 
 from habitat.core.dataset import Episode
@@ -17,7 +18,7 @@ from habitat.tasks.rearrange.utils import CollisionDetails, rearrange_collision
 
 def merge_sim_episode_with_object_config(sim_config, episode):
     sim_config.defrost()
-    sim_config.ep_info = [episode.__dict__]
+    sim_config.ep_info = [attr.asdict(episode, recurse=False)]
     sim_config.freeze()
     return sim_config
 
@@ -55,6 +55,8 @@ class VLNEpisode(NavigationEpisode):
 
 @registry.register_sensor(name="InstructionSensor")
 class InstructionSensor(Sensor):
+    is_static_per_episode = True
+
     def __init__(self, **kwargs):
         self.uuid = "instruction"
         self.observation_space = spaces.Discrete(0)
@@ -1,4 +1,24 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import quaternion
+from gym import spaces
+
+from habitat.config import Config
+from habitat.core.simulator import (
+    AgentState,
+    Observations,
+    RGBSensor,
+    SensorSuite,
+    Simulator,
+    stack_observations,
+)
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
 from habitat.tasks.nav.nav import StopAction
+from habitat.utils.geometry_utils import (
+    quaternion_from_coeff,
+    quaternion_rotate_vector,
+)
 
 
 def sample_non_stop_action(action_space, num_samples=1):
@@ -13,3 +33,166 @@ def sample_non_stop_action(action_space, num_samples=1):
         return samples[0]["action"]
     else:
         return samples
+
+
+class StubRGBSensor(RGBSensor):
+    r"""RGB sensor of :ref:`StubSimulator`."""
+
+    def __init__(
+        self, config: Optional[Config] = None, resolution: int = 8
+    ) -> None:
+        self._resolution = resolution
+        super().__init__(config=config)
+
+    def _get_observation_space(self, *args: Any, **kwargs: Any):
+        return spaces.Box(
+            low=0,
+            high=255,
+            shape=(self._resolution, self._resolution, 3),
+            dtype=np.uint8,
+        )
+
+    def get_observation(self, sim_obs, *args: Any, **kwargs: Any):
+        return sim_obs["rgb"]
+
+
+class StubSimulator(Simulator):
+    r"""Simulator without a scene, for tests. The agent can stand anywhere,
+    moves forward by 0.25m and turns by 10 degrees, and its RGB sensor
+    renders images that only depend on its pose. Renders and changes of the
+    state of the agent are counted.
+    """
+
+    def __init__(
+        self, config: Optional[Config] = None, resolution: int = 8
+    ) -> None:
+        self.habitat_config = config
+        self._sensor_suite = SensorSuite(
+            [StubRGBSensor(resolution=resolution)]
+        )
+        self._resolution = resolution
+        self._position = np.zeros(3, dtype=np.float32)
+        self._rotation = np.quaternion(1, 0, 0, 0)
+        self.num_renders = 0
+        self.num_state_sets = 0
+
+    @property
+    def sensor_suite(self) -> SensorSuite:
+        return self._sensor_suite
+
+    def get_sensor_observations(self) -> Dict[str, np.ndarray]:
+        r"""Renders the pose of the agent: the channels of the image are its
+        x, its z and its heading, in centimeters and degrees.
+        """
+        self.num_renders += 1
+        heading = quaternion.as_rotation_vector(self._rotation)[1]
+        values = np.array(
+            [
+                self._position[0] * 100,
+                self._position[2] * 100,
+                np.rad2deg(heading),
+            ]
+        )
+        rgb = np.empty((self._resolution, self._resolution, 3), np.uint8)
+        rgb[...] = np.round(values).astype(np.int64) % 256
+        return {"rgb": rgb}
+
+    def reset(self) -> Observations:
+        return self._sensor_suite.get_observations(
+            self.get_sensor_observations()
+        )
+
+    def step(self, action, *args, **kwargs) -> Observations:
+        if action == HabitatSimActions.MOVE_FORWARD:
+            self._position = self._position + quaternion_rotate_vector(
+                self._rotation, np.array([0, 0, -0.25])
+            ).astype(np.float32)
+        elif action in (
+            HabitatSimActions.TURN_LEFT,
+            HabitatSimActions.TURN_RIGHT,
+        ):
+            angle = np.deg2rad(10)
+            if action == HabitatSimActions.TURN_RIGHT:
+                angle = -angle
+            self._rotation = (
+                quaternion.from_rotation_vector([0, angle, 0]) * self._rotation
+            )
+        return self._sensor_suite.get_observations(
+            self.get_sensor_observations()
+        )
+
+    def seed(self, seed: int) -> None:
+        pass
+
+    def get_agent_state(self, agent_id: int = 0) -> AgentState:
+        return AgentState(self._position.copy(), self._rotation)
+
+    def set_agent_state(
+        self,
+        position: Sequence[float],
+        rotation: Any,
+        agent_id: int = 0,
+        reset_sensors: bool = True,
+    ) -> bool:
+        self.num_state_sets += 1
+        self._position = np.array(position, dtype=np.float32)
+        if not isinstance(rotation, np.quaternion):
+            rotation = quaternion_from_coeff(rotation)
+        self._rotation = rotation
+        return True
+
+    def get_observations_at(
+        self,
+        position: Optional[List[float]] = None,
+        rotation: Optional[List[float]] = None,
+        keep_agent_at_new_pose: bool = False,
+    ) -> Optional[Observations]:
+        current_state = self.get_agent_state()
+        if position is not None and rotation is not None:
+            self.set_agent_state(position, rotation)
+        observations = self._sensor_suite.get_observations(
+            self.get_sensor_observations()
+        )
+        if not keep_agent_at_new_pose:
+            self.set_agent_state(
+                current_state.position, current_state.rotation
+            )
+        return observations
+
+    def get_observations_at_poses(
+        self,
+        positions: Sequence[Sequence[float]],
+        rotations: Sequence[Sequence[float]],
+    ) -> Optional[Dict[str, np.ndarray]]:
+        current_state = self.get_agent_state()
+        batch: Dict[str, np.ndarray] = {}
+        for i, (position, rotation) in enumerate(zip(positions, rotations)):
+            self.set_agent_state(position, rotation)
+            stack_observations(
+                batch,
+                self._sensor_suite.get_observations(
+                    self.get_sensor_observations()
+                ),
+                i,
+                len(positions),
+            )
+        self.set_agent_state(current_state.position, current_state.rotation)
+        return batch
+
+    def geodesic_distance(
+        self,
+        position_a: Sequence[float],
+        position_b: Any,
+        episode=None,
+    ) -> float:
+        ends = np.array(position_b, dtype=np.float64).reshape(-1, 3)
+        return float(np.min(np.linalg.norm(ends - position_a, axis=1)))
+
+    def sample_navigable_point(self) -> List[float]:
+        return np.random.uniform(-5, 5, 3).tolist()
+
+    def is_navigable(self, point: List[float]) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Compares an int8 quantized :ref:`PPOAgent` against its fp32 version on
+CPU: success, SPL and time spent acting.
+
+.. code:: sh
+
+    python -m habitat_baselines.agents.benchmark_quantization \
+        --model-path data/checkpoints/gibson-rgb-best.pth \
+        --quantization static \
+        --calibration-path data/calibration.pth
+"""
+
+import argparse
+import os.path as osp
+import time
+from typing import Dict, List
+
+import numpy as np
+import torch
+
+import habitat
+from habitat.core.agent import Agent
+from habitat.core.simulator import Observations
+from habitat_baselines.agents.ppo_agents import PPOAgent, get_default_config
+from habitat_baselines.rl.ddppo.policy.quantization import (
+    save_calibration_observations,
+)
+
+
+class TimedAgent(Agent):
+    r"""Wraps an agent to time its steps and optionally record the
+    observations it receives.
+    """
+
+    def __init__(self, agent: PPOAgent, record: bool = False) -> None:
+        self.agent = agent
+        self.record = record
+        self.observations: List[Dict[str, np.ndarray]] = []
+        self.act_time = 0.0
+        self.num_steps = 0
+
+    def reset(self) -> None:
+        self.agent.reset()
+
+    def act(self, observations: Observations) -> Dict[str, int]:
+        if self.record:
+            self.observations.append(
+                {
+                    k: np.asarray(observations[k])
+                    for k in self.agent.observation_space.spaces
+                }
+            )
+
+        t_start = time.perf_counter()
+        action = self.agent.act(observations)
+        self.act_time += time.perf_counter() - t_start
+        self.num_steps += 1
+        return action
+
+    def save_observations(self, path: str) -> None:
+        save_calibration_observations(
+            {
+                k: torch.from_numpy(
+                    np.stack([obs[k] for obs in self.observations])
+                )
+                for k in self.agent.observation_space.spaces
+            },
+            path,
+            num_leading_dims=1,
+        )
+
+
+def evaluate(
+    agent: TimedAgent, task_config: str, num_episodes: int
+) -> Dict[str, float]:
+    torch.set_num_threads(1)
+    benchmark = habitat.Benchmark(config_paths=task_config)
+    metrics = benchmark.evaluate(agent, num_episodes=num_episodes)
+    metrics["ms_per_act"] = 1e3 * agent.act_time / max(agent.num_steps, 1)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input-type",
+        default="rgb",
+        choices=["blind", "rgb", "depth", "rgbd"],
+    )
+    parser.add_argument("--model-path", type=str, required=True)
+    parser.add_argument(
+        "--quantization", default="dynamic", choices=["dynamic", "static"]
+    )
+    parser.add_argument(
+        "--calibration-path",
+        type=str,
+        default="data/calibration.pth",
+        help="Observations to calibrate the static quantization with. "
+        "They are recorded during the fp32 evaluation if the file "
+        "doesn't exist",
+    )
+    parser.add_argument(
+        "--task-config", type=str, default="configs/tasks/pointnav.yaml"
+    )
+    parser.add_argument("--num-episodes", type=int, default=50)
+    args = parser.parse_args()
+
+    agent_config = get_default_config()
+    agent_config.INPUT_TYPE = args.input_type
+    agent_config.MODEL_PATH = args.model_path
+    agent_config.PTH_GPU_ID = -1
+
+    record = args.quantization == "static" and not osp.exists(
+        args.calibration_path
+    )
+    fp32_agent = TimedAgent(PPOAgent(agent_config), record=record)
+    fp32_metrics = evaluate(fp32_agent, args.task_config, args.num_episodes)
+    if record:
+        fp32_agent.save_observations(args.calibration_path)
+
+    agent_config.QUANTIZATION = args.quantization
+    agent_config.QUANTIZATION_CALIBRATION_PATH = args.calibration_path
+    int8_agent = TimedAgent(PPOAgent(agent_config))
+    int8_metrics = evaluate(int8_agent, args.task_config, args.num_episodes)
+
+    for k in ["success", "spl", "ms_per_act"]:
+        if k not in fp32_metrics:
+            continue
+        habitat.logger.info(
+            "{}: fp32 {:.3f}, int8 {:.3f}, delta {:+.3f}".format(
+                k,
+                fp32_metrics[k],
+                int8_metrics[k],
+                int8_metrics[k] - fp32_metrics[k],
+            )
+        )
+    habitat.logger.info(
+        "Speedup: {:.2f}x".format(
+            fp32_metrics["ms_per_act"] / int8_metrics["ms_per_act"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@
 
 import argparse
 import random
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
 import numpy as np
 import torch
@@ -20,6 +20,12 @@ from habitat.config import Config
 from habitat.core.agent import Agent
 from habitat.core.simulator import Observations
 from habitat_baselines.rl.ddppo.policy import PointNavResNetPolicy
+from habitat_baselines.rl.ddppo.policy.export import (
+    ExportedPolicy,
+    export_policy,
+)
+from habitat_baselines.rl.ddppo.policy.quantization import quantize_policy
+from habitat_baselines.rl.ppo.policy import Policy
 from habitat_baselines.utils.common import batch_obs
 
 
@@ -27,9 +33,18 @@ def get_default_config() -> Config:
     c = Config()
     c.INPUT_TYPE = "rgb"
     c.MODEL_PATH = "data/checkpoints/gibson-rgb-best.pth"
+    # "checkpoint" for a training checkpoint, "torchscript" for an artifact
+    # produced by habitat_baselines.rl.ddppo.policy.export.export_policy
+    c.MODEL_FORMAT = "checkpoint"
+    # Post-training int8 quantization of a checkpoint for CPU evaluation,
+    # either "dynamic" or "static". Static quantization is calibrated on
+    # observations saved with save_calibration_observations
+    c.QUANTIZATION = ""
+    c.QUANTIZATION_CALIBRATION_PATH = ""
     c.RESOLUTION = 256
     c.HIDDEN_SIZE = 512
     c.RANDOM_SEED = 7
+    # A negative id evaluates on CPU
     c.PTH_GPU_ID = 0
     c.GOAL_SENSOR_UUID = "pointgoal_with_gps_compass"
     return c
@@ -61,13 +76,15 @@ class PPOAgent(Agent):
                 shape=(config.RESOLUTION, config.RESOLUTION, 3),
                 dtype=np.uint8,
             )
-        observation_spaces = SpaceDict(spaces)
+        self.observation_space = SpaceDict(spaces)
 
         action_spaces = Discrete(4)
 
         self.device = (
             torch.device("cuda:{}".format(config.PTH_GPU_ID))
             if torch.cuda.is_available()
+            and config.PTH_GPU_ID >= 0
+            and not config.QUANTIZATION
             else torch.device("cpu")
         )
         self.hidden_size = config.HIDDEN_SIZE
@@ -77,18 +94,45 @@ class PPOAgent(Agent):
         if torch.cuda.is_available():
             torch.backends.cudnn.deterministic = True  # type: ignore
 
-        self.actor_critic = PointNavResNetPolicy(
-            observation_space=observation_spaces,
-            action_space=action_spaces,
+        self.actor_critic: Union[Policy, ExportedPolicy]
+        if config.MODEL_FORMAT == "torchscript":
+            assert not config.QUANTIZATION, "Only checkpoints can be quantized"
+            self.actor_critic = ExportedPolicy(
+                config.MODEL_PATH, map_location=self.device
+            )
+            self.num_recurrent_layers = self.actor_critic.num_recurrent_layers
+            self.hidden_size = self.actor_critic.hidden_size
+        else:
+            assert (
+                config.MODEL_FORMAT == "checkpoint"
+            ), f"Unknown model format {config.MODEL_FORMAT}"
+            policy = self._load_checkpoint(config, action_spaces)
+            if config.QUANTIZATION:
+                policy = quantize_policy(
+                    policy,
+                    config.QUANTIZATION,
+                    config.QUANTIZATION_CALIBRATION_PATH,
+                )
+            self.actor_critic = policy
+
+        self.test_recurrent_hidden_states: Optional[torch.Tensor] = None
+        self.not_done_masks: Optional[torch.Tensor] = None
+        self.prev_actions: Optional[torch.Tensor] = None
+
+    def _load_checkpoint(self, config: Config, action_space) -> Policy:
+        actor_critic = PointNavResNetPolicy(
+            observation_space=self.observation_space,
+            action_space=action_space,
             hidden_size=self.hidden_size,
-            normalize_visual_inputs="rgb" in spaces,
+            normalize_visual_inputs="rgb" in self.observation_space.spaces,
         )
-        self.actor_critic.to(self.device)
+        actor_critic.to(self.device)
+        self.num_recurrent_layers = actor_critic.net.num_recurrent_layers
 
         if config.MODEL_PATH:
             ckpt = torch.load(config.MODEL_PATH, map_location=self.device)
             #  Filter only actor_critic weights
-            self.actor_critic.load_state_dict(
+            actor_critic.load_state_dict(
                 {
                     k[len("actor_critic.") :]: v
                     for k, v in ckpt["state_dict"].items()
@@ -100,15 +144,21 @@ class PPOAgent(Agent):
             habitat.logger.error(
                 "Model checkpoint wasn't loaded, evaluating " "a random model."
             )
+        return actor_critic
 
-        self.test_recurrent_hidden_states: Optional[torch.Tensor] = None
-        self.not_done_masks: Optional[torch.Tensor] = None
-        self.prev_actions: Optional[torch.Tensor] = None
+    def export(self, path: str) -> None:
+        r"""Saves the policy as a TorchScript artifact that can be loaded
+        back with ``MODEL_FORMAT = "torchscript"``.
+        """
+        assert not isinstance(
+            self.actor_critic, ExportedPolicy
+        ), "The policy is already exported"
+        export_policy(self.actor_critic, self.observation_space, path)
 
     def reset(self) -> None:
         self.test_recurrent_hidden_states = torch.zeros(
             1,
-            self.actor_critic.net.num_recurrent_layers,
+            self.num_recurrent_layers,
             self.hidden_size,
             device=self.device,
         )
@@ -149,6 +199,21 @@ def main():
         choices=["blind", "rgb", "depth", "rgbd"],
     )
     parser.add_argument("--model-path", type=str, default=None)
+    parser.add_argument(
+        "--model-format",
+        default="checkpoint",
+        choices=["checkpoint", "torchscript"],
+    )
+    parser.add_argument(
+        "--quantization", default="", choices=["", "dynamic", "static"]
+    )
+    parser.add_argument("--quantization-calibration-path", default="")
+    parser.add_argument(
+        "--export-path",
+        type=str,
+        default=None,
+        help="Export the policy to TorchScript at this path and exit",
+    )
     parser.add_argument(
         "--task-config", type=str, default="configs/tasks/pointnav.yaml"
     )
@@ -158,8 +223,17 @@ def main():
     agent_config.INPUT_TYPE = args.input_type
     if args.model_path is not None:
         agent_config.MODEL_PATH = args.model_path
+    agent_config.MODEL_FORMAT = args.model_format
+    agent_config.QUANTIZATION = args.quantization
+    agent_config.QUANTIZATION_CALIBRATION_PATH = (
+        args.quantization_calibration_path
+    )
 
     agent = PPOAgent(agent_config)
+    if args.export_path is not None:
+        agent.export(args.export_path)
+        return
+
     benchmark = habitat.Benchmark(config_paths=args.task_config)
     metrics = benchmark.evaluate(agent)
 
@@ -53,6 +53,10 @@ _C.VERBOSE = True
 # PyTorch normally behaves, but all configs we provide
 # set it to true and yours likely should too
 _C.FORCE_TORCH_SINGLE_THREADED = False
+# Directory, ideally in shared memory (e.g. /dev/shm), where the dataset is
+# converted once to the columnar format for all the environments to memory map
+# it instead of each loading its own copy. Empty to disable
+_C.SHARED_DATASET_DIR = ""
 # -----------------------------------------------------------------------------
 # EVAL CONFIG
 # -----------------------------------------------------------------------------
@@ -167,6 +171,9 @@ _C.RL.DDPPO.train_encoder = True
 _C.RL.DDPPO.reset_critic = True
 # Forces distributed mode for testing
 _C.RL.DDPPO.force_distributed = False
+# Keeps the visual observations and the ResNet backbone in channels-last
+# (NHWC) memory format
+_C.RL.DDPPO.channels_last = False
 # -----------------------------------------------------------------------------
 # ORBSLAM2 BASELINE
 # -----------------------------------------------------------------------------
@@ -214,16 +214,20 @@ class EQADataset(wds.Dataset):
     ) -> None:
         r"""Writes episode's frame queue to disk."""
 
-        for idx, pos in enumerate(pos_queue[::-1]):
-            observation = self.env.sim.get_observations_at(
-                pos.position, pos.rotation
-            )
-            if self.config.CAMERA_TYPE=="equirectangular":
-                img = observation["rgb_equirectangular"]
-            elif self.config.CAMERA_TYPE == "pinhole":
-                img = observation["rgb"]
-            else:
-                raise Exception
+        if len(pos_queue) == 0:
+            return
+        pos_queue = pos_queue[::-1]
+        observations = self.env.sim.get_observations_at_poses(
+            [pos.position for pos in pos_queue],
+            [pos.rotation for pos in pos_queue],
+        )
+        if self.config.CAMERA_TYPE=="equirectangular":
+            imgs = observations["rgb_equirectangular"]
+        elif self.config.CAMERA_TYPE == "pinhole":
+            imgs = observations["rgb"]
+        else:
+            raise Exception
+        for idx, img in enumerate(imgs):
             idx = "{0:0=3d}".format(idx)
             episode_id = "{0:0=4d}".format(int(episode_id))
             new_path = os.path.join(
@@ -91,46 +91,48 @@ class EQACNNPretrainDataset(Dataset):
         Writes rgb, seg, depth frames to LMDB.
         """
 
-        for pos in pos_queue:
-
-            observation = self.env.sim.get_observations_at(
-                pos.position, pos.rotation
-            )
+        if len(pos_queue) == 0:
+            return
+        observations = self.env.sim.get_observations_at_poses(
+            [pos.position for pos in pos_queue],
+            [pos.rotation for pos in pos_queue],
+        )
+
+        if self.config.CAMERA_TYPE == "equirectangular":
+            depths = observations["depth_equirectangular"]
+            rgbs = observations["rgb_equirectangular"]
+        elif  self.config.CAMERA_TYPE == "pinhole":
+            depths = observations["depth"]
+            rgbs = observations["rgb"]
+
+        scene = self.env.sim.semantic_annotations()
+        instance_id_to_label_id = {
+            int(obj.id.split("_")[-1]): obj.category.index()
+            for obj in scene.objects
+        }
+        self.mapping = np.array(
+            [
+                instance_id_to_label_id[i]
+                for i in range(len(instance_id_to_label_id))
+            ]
+        )
+        if self.config.CAMERA_TYPE == "equirectangular":
+            segs = np.take(self.mapping, observations["semantic_equirectangular"])
+        elif self.config.CAMERA_TYPE == "pinhole":
+            segs = np.take(self.mapping, observations["semantic"])
+        else:
+            raise Exception
+        segs[segs == -1] = 0
+        segs = segs.astype("uint8")
 
-            if self.config.CAMERA_TYPE == "equirectangular":
-                depth = observation["depth_equirectangular"]
-                rgb = observation["rgb_equirectangular"]
-            elif  self.config.CAMERA_TYPE == "pinhole":
-                depth = observation["depth"]
-                rgb = observation["rgb"]
-
-            scene = self.env.sim.semantic_annotations()
-            instance_id_to_label_id = {
-                int(obj.id.split("_")[-1]): obj.category.index()
-                for obj in scene.objects
-            }
-            self.mapping = np.array(
-                [
-                    instance_id_to_label_id[i]
-                    for i in range(len(instance_id_to_label_id))
-                ]
-            )
-            if self.config.CAMERA_TYPE == "equirectangular":
-                seg = np.take(self.mapping, observation["semantic_equirectangular"])
-            elif self.config.CAMERA_TYPE == "pinhole":
-                seg = np.take(self.mapping, observation["semantic"])
-            else:
-                raise Exception
-            seg[seg == -1] = 0
-            seg = seg.astype("uint8")
-
-            sample_key = "{0:0=6d}".format(self.count)
-            with self.lmdb_env.begin(write=True) as txn:
+        with self.lmdb_env.begin(write=True) as txn:
+            for rgb, depth, seg in zip(rgbs, depths, segs):
+                sample_key = "{0:0=6d}".format(self.count)
                 txn.put((sample_key + "_rgb").encode(), rgb.tobytes())
                 txn.put((sample_key + "_depth").encode(), depth.tobytes())
                 txn.put((sample_key + "_seg").encode(), seg.tobytes())
 
-            self.count += 1
+                self.count += 1
 
     def cache_exists(self) -> bool:
         if os.path.exists(self.dataset_path):
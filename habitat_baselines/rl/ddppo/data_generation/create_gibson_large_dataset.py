@@ -11,17 +11,11 @@ details). This script generates data for all scenes with a minimum quality of
 q_thresh.
 """
 import glob
-import gzip
 import json
-import multiprocessing
-import os
 from os import path as osp
 
-import tqdm
-
-import habitat
-from habitat.datasets.pointnav.pointnav_generator import (
-    generate_pointnav_episode,
+from habitat.datasets.pointnav.sharded_generation import (
+    generate_pointnav_dataset,
 )
 
 NUM_EPISODES_PER_SCENE = int(1e4)
@@ -29,41 +23,6 @@ NUM_EPISODES_PER_SCENE = int(1e4)
 QUAL_THRESH = 2
 
 
-def safe_mkdir(path):
-    try:
-        os.mkdir(path)
-    except OSError:
-        pass
-
-
-def _generate_fn(scene):
-    cfg = habitat.get_config()
-    cfg.defrost()
-    cfg.SIMULATOR.SCENE = scene
-    cfg.SIMULATOR.AGENT_0.SENSORS = []
-    cfg.freeze()
-
-    sim = habitat.sims.make_sim("Sim-v0", config=cfg.SIMULATOR)
-
-    dset = habitat.datasets.make_dataset("PointNav-v1")
-    dset.episodes = list(
-        generate_pointnav_episode(
-            sim, NUM_EPISODES_PER_SCENE, is_gen_shortest_path=False
-        )
-    )
-    for ep in dset.episodes:
-        ep.scene_id = ep.scene_id[len("./data/scene_datasets/") :]
-
-    scene_key = scene.split("/")[-1].split(".")[0]
-    out_file = (
-        f"./data/datasets/pointnav/gibson/v2/train_large/content/"
-        f"{scene_key}.json.gz"
-    )
-    os.makedirs(osp.dirname(out_file), exist_ok=True)
-    with gzip.open(out_file, "wt") as f:
-        f.write(dset.to_json())
-
-
 def generate_gibson_large_dataset():
     # Load train / val statistics
     with open(
@@ -87,14 +46,15 @@ def generate_gibson_large_dataset():
     scenes = list(filter(_fltr, scenes))
     print(f"Total number of training scenes: {len(scenes)}")
 
-    safe_mkdir("./data/datasets/pointnav/gibson/v2/train_large")
-    with multiprocessing.Pool(8) as pool, tqdm.tqdm(total=len(scenes)) as pbar:
-        for _ in pool.imap_unordered(_generate_fn, scenes):
-            pbar.update()
-
-    path = "./data/datasets/pointnav/gibson/v2/train_large/train_large.json.gz"
-    with gzip.open(path, "wt") as f:
-        json.dump(dict(episodes=[]), f)
+    # Interrupted generations resume where they stopped
+    generate_pointnav_dataset(
+        scenes,
+        "./data/datasets/pointnav/gibson/v2/train_large/train_large.json.gz",
+        NUM_EPISODES_PER_SCENE,
+        num_workers=8,
+        scenes_dir="./data/scene_datasets",
+        is_gen_shortest_path=False,
+    )
 
 
 if __name__ == "__main__":
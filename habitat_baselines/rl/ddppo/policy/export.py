@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Export of a trained policy to a self-contained TorchScript acting graph.
+
+Acting with the eager :ref:`PointNavResNetPolicy` goes through dict lookups,
+``if sensor in observations`` checks and the distribution classes at every
+step, and on CPU that python overhead dominates. :ref:`export_policy` bakes
+the policy into a traced graph that takes the sensors as positional tensors
+in a fixed order, with the observation normalization fused into a single
+``addcmul`` and convolutions followed by batch norms folded together.
+:ref:`ExportedPolicy` loads the artifact back and exposes the same ``act``
+interface as :ref:`Policy`.
+"""
+
+import copy
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from gym import spaces
+from torch import nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from habitat_baselines.rl.ddppo.policy.running_mean_and_var import (
+    FusedRunningMeanAndVar,
+    RunningMeanAndVar,
+)
+from habitat_baselines.rl.ppo.policy import Policy
+from habitat_baselines.utils.common import CustomFixedCategorical
+
+EXPORT_METADATA_FILE = "policy_metadata.json"
+
+
+def fuse_running_mean_and_var(module: nn.Module) -> int:
+    r"""Replaces, in place, every :ref:`RunningMeanAndVar` below
+    :p:`module` by its frozen :ref:`FusedRunningMeanAndVar` equivalent.
+
+    :return: the number of replaced modules.
+    """
+    num_fused = 0
+    for name, child in module.named_children():
+        if isinstance(child, RunningMeanAndVar):
+            setattr(
+                module,
+                name,
+                FusedRunningMeanAndVar.from_running_mean_and_var(child),
+            )
+            num_fused += 1
+        else:
+            num_fused += fuse_running_mean_and_var(child)
+
+    return num_fused
+
+
+def fuse_conv_bn(module: nn.Module) -> int:
+    r"""Folds, in place, every ``BatchNorm2d`` that directly follows a
+    ``Conv2d`` inside a ``nn.Sequential`` into that convolution.
+
+    The backbones in :ref:`resnet` use ``GroupNorm``, whose statistics depend
+    on the input and can't be folded, so this only applies to custom
+    backbones built with batch norms. :p:`module` must be in eval mode.
+
+    :return: the number of folded batch norms.
+    """
+    assert not module.training, "Batch norms can only be folded in eval mode"
+
+    num_fused = 0
+    for child in module.children():
+        num_fused += fuse_conv_bn(child)
+
+    if isinstance(module, nn.Sequential):
+        names = list(module._modules.keys())
+        for prev_name, name in zip(names[:-1], names[1:]):
+            prev_layer, layer = (
+                module._modules[prev_name],
+                module._modules[name],
+            )
+            if isinstance(prev_layer, nn.Conv2d) and isinstance(
+                layer, nn.BatchNorm2d
+            ):
+                module._modules[prev_name] = fuse_conv_bn_eval(
+                    prev_layer, layer
+                )
+                module._modules[name] = nn.Identity()
+                num_fused += 1
+
+    return num_fused
+
+
+class _ActingGraph(nn.Module):
+    r"""Wraps a :ref:`Policy` into a module with a tensor-only signature
+    that can be traced.
+    """
+
+    def __init__(self, policy: Policy, sensor_keys: Sequence[str]) -> None:
+        super().__init__()
+        assert (
+            policy.action_distribution_type == "categorical"
+        ), "Only categorical policies can be exported"
+        self.policy = policy
+        self.sensor_keys = list(sensor_keys)
+
+    def forward(
+        self,
+        rnn_hidden_states: torch.Tensor,
+        prev_actions: torch.Tensor,
+        masks: torch.Tensor,
+        *sensors: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        observations = dict(zip(self.sensor_keys, sensors))
+        features, rnn_hidden_states = self.policy.net(
+            observations, rnn_hidden_states, prev_actions, masks
+        )
+        value = self.policy.critic(features)
+        logits = self.policy.action_distribution.linear(features)
+        return value, logits, rnn_hidden_states
+
+
+def _example_observations(
+    observation_space: spaces.Dict,
+    sensor_keys: Sequence[str],
+    batch_size: int,
+    device: torch.device,
+) -> List[torch.Tensor]:
+    return [
+        torch.from_numpy(
+            np.zeros(
+                (batch_size, *observation_space.spaces[k].shape),
+                dtype=observation_space.spaces[k].dtype,
+            )
+        ).to(device)
+        for k in sensor_keys
+    ]
+
+
+def export_policy(
+    policy: Policy,
+    observation_space: spaces.Dict,
+    path: str,
+    sensor_keys: Optional[Sequence[str]] = None,
+    batch_size: int = 1,
+) -> torch.jit.ScriptModule:
+    r"""Traces the acting graph of :p:`policy` and saves it to :p:`path`.
+
+    :param policy: a categorical policy, it is left untouched.
+    :param observation_space: observation space the policy was built with.
+    :param path: where to save the TorchScript artifact.
+    :param sensor_keys: sensors fed to the exported graph, in that order.
+        Defaults to all the sensors of :p:`observation_space`, sorted.
+    :param batch_size: batch size used to trace, the exported graph accepts
+        any batch size.
+    :return: the traced module.
+    """
+    if sensor_keys is None:
+        sensor_keys = sorted(observation_space.spaces.keys())
+
+    policy = copy.deepcopy(policy).eval()
+    fuse_running_mean_and_var(policy)
+    fuse_conv_bn(policy)
+
+    device = next(policy.parameters()).device
+    example_inputs = (
+        torch.zeros(
+            batch_size,
+            policy.net.num_recurrent_layers,
+            policy.net.output_size,
+            device=device,
+        ),
+        torch.zeros(batch_size, 1, dtype=torch.long, device=device),
+        torch.ones(batch_size, 1, dtype=torch.bool, device=device),
+        *_example_observations(
+            observation_space, sensor_keys, batch_size, device
+        ),
+    )
+
+    with torch.no_grad():
+        traced = torch.jit.trace(
+            _ActingGraph(policy, sensor_keys), example_inputs
+        )
+
+    metadata = dict(
+        sensor_keys=list(sensor_keys),
+        num_recurrent_layers=policy.net.num_recurrent_layers,
+        hidden_size=policy.net.output_size,
+    )
+    torch.jit.save(
+        traced, path, _extra_files={EXPORT_METADATA_FILE: json.dumps(metadata)}
+    )
+    return traced
+
+
+class ExportedPolicy:
+    r"""Policy loaded from an artifact produced by :ref:`export_policy`.
+
+    It can be used in place of a :ref:`Policy` for acting.
+    """
+
+    def __init__(
+        self, path: str, map_location: Optional[torch.device] = None
+    ) -> None:
+        extra_files = {EXPORT_METADATA_FILE: ""}
+        self.graph = torch.jit.load(
+            path, map_location=map_location, _extra_files=extra_files
+        )
+        self.graph.eval()
+
+        metadata = json.loads(extra_files[EXPORT_METADATA_FILE])
+        self.sensor_keys: List[str] = metadata["sensor_keys"]
+        self.num_recurrent_layers: int = metadata["num_recurrent_layers"]
+        self.hidden_size: int = metadata["hidden_size"]
+
+    def _forward(
+        self,
+        observations: Dict[str, torch.Tensor],
+        rnn_hidden_states: torch.Tensor,
+        prev_actions: torch.Tensor,
+        masks: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return self.graph(
+            rnn_hidden_states,
+            prev_actions,
+            masks,
+            *(observations[k] for k in self.sensor_keys),
+        )
+
+    def act(
+        self,
+        observations,
+        rnn_hidden_states,
+        prev_actions,
+        masks,
+        deterministic=False,
+    ):
+        value, logits, rnn_hidden_states = self._forward(
+            observations, rnn_hidden_states, prev_actions, masks
+        )
+        distribution = CustomFixedCategorical(logits=logits)
+
+        if deterministic:
+            action = distribution.mode()
+        else:
+            action = distribution.sample()
+
+        action_log_probs = distribution.log_probs(action)
+
+        return value, action, action_log_probs, rnn_hidden_states
+
+    def get_value(self, observations, rnn_hidden_states, prev_actions, masks):
+        value, _, _ = self._forward(
+            observations, rnn_hidden_states, prev_actions, masks
+        )
+        return value
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Post-training int8 quantization of policies for CPU evaluation.
+
+Two modes are supported:
+
+-   ``"dynamic"``: the weights of the linear and recurrent layers are
+    quantized ahead of time and their activations on the fly. No
+    calibration is needed.
+-   ``"static"``: on top of the dynamic quantization, the convolutional
+    stacks of the visual encoders (:ref:`ResNetEncoder` and
+    :ref:`SimpleCNN`) are quantized with FX graph mode quantization. The
+    ranges of their activations are calibrated on observations saved from
+    rollouts with :ref:`save_calibration_observations`.
+
+Quantized kernels only exist on CPU.
+"""
+
+import copy
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import torch
+from torch import nn as nn
+
+from habitat_baselines.rl.ddppo.policy.resnet_policy import ResNetEncoder
+from habitat_baselines.rl.models.simple_cnn import SimpleCNN
+from habitat_baselines.rl.ppo.policy import Policy
+
+QUANTIZATION_MODES = ("dynamic", "static")
+
+
+def save_calibration_observations(
+    observations: Dict[str, torch.Tensor],
+    path: str,
+    num_leading_dims: int = 2,
+) -> None:
+    r"""Saves observations to calibrate the static quantization with.
+
+    :param observations: the observations, typically
+        ``rollouts.buffers["observations"]`` of a :ref:`RolloutStorage`.
+    :param path: where to save them.
+    :param num_leading_dims: number of leading dimensions that index samples
+        (2 for the [STEPS x ENVS] layout of the rollouts).
+    """
+    torch.save(
+        {
+            k: v.flatten(0, num_leading_dims - 1).cpu()
+            for k, v in observations.items()
+            # The features of a frozen encoder would bypass the layers that
+            # need calibrating
+            if k != "visual_features"
+        },
+        path,
+    )
+
+
+def load_calibration_batches(
+    path: str, batch_size: int = 32
+) -> List[Dict[str, torch.Tensor]]:
+    r"""Loads observations saved with :ref:`save_calibration_observations`
+    as batches of :p:`batch_size` samples.
+    """
+    observations = torch.load(path, map_location="cpu")
+    num_samples = len(next(iter(observations.values())))
+    return [
+        {k: v[start : start + batch_size] for k, v in observations.items()}
+        for start in range(0, num_samples, batch_size)
+    ]
+
+
+def quantize_dynamic(policy: Policy) -> Policy:
+    r"""Returns a copy of :p:`policy` with dynamically quantized linear and
+    recurrent layers.
+    """
+    policy = copy.deepcopy(policy).cpu().eval()
+    return _quantize_dynamic_(policy)
+
+
+def _quantize_dynamic_(policy: Policy) -> Policy:
+    return torch.quantization.quantize_dynamic(
+        policy, {nn.Linear, nn.GRU, nn.LSTM}, dtype=torch.qint8, inplace=True
+    )
+
+
+def _conv_stacks(
+    policy: Policy,
+) -> Iterator[Tuple[nn.Module, Tuple[str, ...]]]:
+    r"""Yields the visual encoders of :p:`policy` along with the names of
+    their submodules that form a sequential stack of convolutions.
+    """
+    for module in policy.modules():
+        if isinstance(module, ResNetEncoder) and not module.is_blind:
+            yield module, ("backbone", "compression")
+        elif isinstance(module, SimpleCNN) and not module.is_blind:
+            yield module, ("cnn",)
+
+
+def _calibration_act(
+    policy: Policy, observations: Dict[str, torch.Tensor]
+) -> None:
+    batch_size = len(next(iter(observations.values())))
+    policy.act(
+        observations,
+        torch.zeros(
+            batch_size,
+            policy.net.num_recurrent_layers,
+            policy.net.output_size,
+        ),
+        torch.zeros(batch_size, 1, dtype=torch.long),
+        torch.zeros(batch_size, 1, dtype=torch.bool),
+        deterministic=True,
+    )
+
+
+def quantize_static(
+    policy: Policy,
+    calibration_batches: Iterable[Dict[str, torch.Tensor]],
+) -> Policy:
+    r"""Returns a copy of :p:`policy` whose visual encoders are statically
+    quantized and whose linear and recurrent layers are dynamically
+    quantized.
+
+    :param policy: the policy to quantize, it is left untouched.
+    :param calibration_batches: batches of observations representative of
+        the evaluation data, see :ref:`load_calibration_batches`.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    calibration_batches = list(calibration_batches)
+    assert len(calibration_batches) > 0, "Need data to calibrate with"
+
+    policy = copy.deepcopy(policy).cpu().eval()
+    stacks = list(_conv_stacks(policy))
+
+    # Record an input of every stack, FX needs one to prepare it
+    example_inputs: Dict[nn.Module, torch.Tensor] = {}
+    hooks = [
+        getattr(encoder, names[0]).register_forward_pre_hook(
+            lambda _, inputs, encoder=encoder: example_inputs.setdefault(
+                encoder, inputs[0]
+            )
+        )
+        for encoder, names in stacks
+    ]
+    with torch.no_grad():
+        _calibration_act(policy, calibration_batches[0])
+    for hook in hooks:
+        hook.remove()
+
+    qconfig_mapping = get_default_qconfig_mapping(
+        torch.backends.quantized.engine
+    )
+    for encoder, names in stacks:
+        stack = nn.Sequential(*(getattr(encoder, name) for name in names))
+        setattr(
+            encoder,
+            names[0],
+            prepare_fx(stack, qconfig_mapping, (example_inputs[encoder],)),
+        )
+        for name in names[1:]:
+            setattr(encoder, name, nn.Sequential())
+
+    with torch.no_grad():
+        for observations in calibration_batches:
+            _calibration_act(policy, observations)
+
+    for encoder, names in stacks:
+        setattr(encoder, names[0], convert_fx(getattr(encoder, names[0])))
+
+    return _quantize_dynamic_(policy)
+
+
+def quantize_policy(
+    policy: Policy,
+    mode: str,
+    calibration_path: str = "",
+    calibration_batch_size: int = 32,
+) -> Policy:
+    r"""Quantizes :p:`policy` with one of :ref:`QUANTIZATION_MODES`."""
+    assert (
+        mode in QUANTIZATION_MODES
+    ), f"Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}"
+    if mode == "dynamic":
+        return quantize_dynamic(policy)
+
+    assert calibration_path, "Static quantization needs calibration data"
+    return quantize_static(
+        policy,
+        load_calibration_batches(
+            calibration_path, batch_size=calibration_batch_size
+        ),
+    )
@@ -48,6 +48,7 @@ class PointNavResNetPolicy(Policy):
         backbone: str = "resnet18",
         normalize_visual_inputs: bool = False,
         force_blind_policy: bool = False,
+        channels_last: bool = False,
         policy_config: Config = None,
         **kwargs
     ):
@@ -73,6 +74,7 @@ class PointNavResNetPolicy(Policy):
                 normalize_visual_inputs=normalize_visual_inputs,
                 force_blind_policy=force_blind_policy,
                 discrete_actions=discrete_actions,
+                channels_last=channels_last,
             ),
             dim_actions=action_space.n,  # for action distribution
             policy_config=policy_config,
@@ -91,6 +93,7 @@ class PointNavResNetPolicy(Policy):
             backbone=config.RL.DDPPO.backbone,
             normalize_visual_inputs="rgb" in observation_space.spaces,
             force_blind_policy=config.FORCE_BLIND_POLICY,
+            channels_last=config.RL.DDPPO.channels_last,
             policy_config=config.RL.POLICY,
         )
 
@@ -104,8 +107,10 @@ class ResNetEncoder(nn.Module):
         spatial_size: int = 128,
         make_backbone=None,
         normalize_visual_inputs: bool = False,
+        channels_last: bool = False,
     ):
         super().__init__()
+        self.channels_last = channels_last
 
         if "rgb" in observation_space.spaces:
             self._n_input_rgb = observation_space.spaces["rgb"].shape[2]
@@ -155,10 +160,30 @@ class ResNetEncoder(nn.Module):
                 final_spatial,
             )
 
+            if self.channels_last:
+                self.backbone = self.backbone.to(
+                    memory_format=torch.channels_last
+                )
+                self.compression = self.compression.to(
+                    memory_format=torch.channels_last
+                )
+
     @property
     def is_blind(self):
         return self._n_input_rgb + self._n_input_depth == 0
 
+    @property
+    def visual_keys(self) -> Tuple[str, ...]:
+        r"""The observations consumed by the encoder."""
+        return tuple(
+            k
+            for k, n_input in (
+                ("rgb", self._n_input_rgb),
+                ("depth", self._n_input_depth),
+            )
+            if n_input > 0
+        )
+
     def layer_init(self):
         for layer in self.modules():
             if isinstance(layer, (nn.Conv2d, nn.Linear)):
@@ -168,31 +193,55 @@ class ResNetEncoder(nn.Module):
                 if layer.bias is not None:
                     nn.init.constant_(layer.bias, val=0)
 
-    def forward(self, observations: Dict[str, torch.Tensor]) -> torch.Tensor:  # type: ignore
-        if self.is_blind:
-            return None
+    def _preprocess(
+        self, observations: Dict[str, torch.Tensor]
+    ) -> torch.Tensor:
+        r"""Stacks the visual sensors, downsamples them by 2 and scales RGB
+        to [0, 1].
+
+        The sensors are written, already converted to float, into a single
+        [BATCH x HEIGHT x WIDTH x CHANNEL] buffer. Permuting it gives a
+        [BATCH x CHANNEL x HEIGHT X WIDTH] view in channels-last memory
+        format without any copy. Average pooling and scaling commute, so RGB
+        is scaled after pooling on 4x fewer values.
+        """
+        rgb_observations = (
+            observations["rgb"] if self._n_input_rgb > 0 else None
+        )
+        depth_observations = (
+            observations["depth"] if self._n_input_depth > 0 else None
+        )
+        some_observations = (
+            rgb_observations
+            if rgb_observations is not None
+            else depth_observations
+        )
 
-        cnn_input = []
-        if self._n_input_rgb > 0:
-            rgb_observations = observations["rgb"]
-            # permute tensor to dimension [BATCH x CHANNEL x HEIGHT X WIDTH]
-            rgb_observations = rgb_observations.permute(0, 3, 1, 2)
-            rgb_observations = (
-                rgb_observations.float() / 255.0
-            )  # normalize RGB
-            cnn_input.append(rgb_observations)
+        cnn_input = torch.empty(
+            *some_observations.shape[:3],
+            self._n_input_rgb + self._n_input_depth,
+            dtype=torch.float32,
+            device=some_observations.device,
+        )
+        if rgb_observations is not None:
+            cnn_input[..., : self._n_input_rgb].copy_(rgb_observations)
+        if depth_observations is not None:
+            cnn_input[..., self._n_input_rgb :].copy_(depth_observations)
 
-        if self._n_input_depth > 0:
-            depth_observations = observations["depth"]
+        x = F.avg_pool2d(cnn_input.permute(0, 3, 1, 2), 2)
+        if self._n_input_rgb > 0:
+            x[:, : self._n_input_rgb].mul_(1.0 / 255.0)  # normalize RGB
 
-            # permute tensor to dimension [BATCH x CHANNEL x HEIGHT X WIDTH]
-            depth_observations = depth_observations.permute(0, 3, 1, 2)
+        if not self.channels_last:
+            x = x.contiguous()
 
-            cnn_input.append(depth_observations)
+        return x
 
-        x = torch.cat(cnn_input, dim=1)
-        x = F.avg_pool2d(x, 2)
+    def forward(self, observations: Dict[str, torch.Tensor]) -> torch.Tensor:  # type: ignore
+        if self.is_blind:
+            return None
 
+        x = self._preprocess(observations)
         x = self.running_mean_and_var(x)
         x = self.backbone(x)
         x = self.compression(x)
@@ -216,6 +265,7 @@ class PointNavResNetNet(Net):
         normalize_visual_inputs: bool,
         force_blind_policy: bool = False,
         discrete_actions: bool = True,
+        channels_last: bool = False,
     ):
         super().__init__()
 
@@ -303,6 +353,7 @@ class PointNavResNetNet(Net):
                 ngroups=resnet_baseplanes // 2,
                 make_backbone=getattr(resnet, backbone),
                 normalize_visual_inputs=normalize_visual_inputs,
+                channels_last=channels_last,
             )
 
             self.goal_visual_fc = nn.Sequential(
@@ -323,6 +374,7 @@ class PointNavResNetNet(Net):
             ngroups=resnet_baseplanes // 2,
             make_backbone=getattr(resnet, backbone),
             normalize_visual_inputs=normalize_visual_inputs,
+            channels_last=channels_last,
         )
 
         if not self.visual_encoder.is_blind:
@@ -75,3 +75,34 @@ class RunningMeanAndVar(nn.Module):
         # (x - self._mean) * inv_stdev but is faster since it can
         # make use of addcmul and is more numerically stable in fp16
         return torch.addcmul(-self._mean * inv_stdev, x, inv_stdev)
+
+
+class FusedRunningMeanAndVar(nn.Module):
+    r"""Inference-only version of :ref:`RunningMeanAndVar`.
+
+    The statistics are frozen and folded into a per-channel scale and shift
+    so normalizing is a single ``addcmul``.
+    """
+
+    def __init__(self, scale: Tensor, shift: Tensor) -> None:
+        super().__init__()
+        self.register_buffer("_scale", scale.clone())
+        self.register_buffer("_shift", shift.clone())
+        self._scale: torch.Tensor = self._scale
+        self._shift: torch.Tensor = self._shift
+
+    @classmethod
+    def from_running_mean_and_var(
+        cls, running_mean_and_var: RunningMeanAndVar
+    ) -> "FusedRunningMeanAndVar":
+        inv_stdev = torch.rsqrt(
+            torch.max(
+                running_mean_and_var._var,
+                torch.full_like(running_mean_and_var._var, 1e-2),
+            )
+        )
+        fused = cls(inv_stdev, -running_mean_and_var._mean * inv_stdev)
+        return fused.train(running_mean_and_var.training)
+
+    def forward(self, x: Tensor) -> Tensor:
+        return torch.addcmul(self._shift, x, self._scale)
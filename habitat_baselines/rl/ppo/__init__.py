@@ -5,6 +5,14 @@
 # LICENSE file in the root directory of this source tree.
 
 from habitat_baselines.rl.ppo.policy import Net, PointNavBaselinePolicy, Policy
+from habitat_baselines.rl.ppo.policy_server import PolicyClient, PolicyServer
 from habitat_baselines.rl.ppo.ppo import PPO
 
-__all__ = ["PPO", "Policy", "Net", "PointNavBaselinePolicy"]
+__all__ = [
+    "PPO",
+    "Policy",
+    "Net",
+    "PointNavBaselinePolicy",
+    "PolicyClient",
+    "PolicyServer",
+]
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Centralised, batched policy inference for many environment workers.
+
+Instead of every worker running its own copy of the policy (or the trainer
+stepping all environments in lock-step), workers hand their observations to a
+:ref:`PolicyServer` through a :ref:`PolicyClient`. The server gathers requests
+from whichever workers are ready, waits at most ``max_latency`` seconds for
+more of them to arrive, runs a single :ref:`Policy.act` forward pass on the
+batch and sends every worker its action back. The recurrent state and the
+previous action of every worker live on the server. If the server fails,
+every pending and later :ref:`PolicyClient.act` raises its error.
+"""
+
+import queue
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+import attr
+import numpy as np
+import torch
+from torch import multiprocessing as mp
+
+from habitat import logger
+from habitat_baselines.rl.ppo.policy import Policy
+from habitat_baselines.utils.common import ObservationBatchingCache, batch_obs
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _PolicyRequest:
+    client_id: int
+    observations: Dict[str, Any]
+    episode_start: bool
+
+
+class PolicyClient:
+    r"""Handle used by an environment worker to query a :ref:`PolicyServer`.
+
+    Clients are cheap, picklable and can be passed to worker processes as
+    part of their construction arguments.
+    """
+
+    def __init__(
+        self,
+        client_id: int,
+        request_queue: "mp.Queue",
+        response_conn: Connection,
+    ) -> None:
+        self.client_id = client_id
+        self._request_queue = request_queue
+        self._response_conn = response_conn
+
+    def act(
+        self, observations: Dict[str, Any], episode_start: bool = False
+    ) -> np.ndarray:
+        r"""Blocks until the server has computed the action for
+        :p:`observations`.
+
+        :param observations: the observations returned by the environment.
+        :param episode_start: whether :p:`observations` are the first ones of
+            a new episode. The recurrent state kept for this client on the
+            server is reset when set.
+        :return: the action for this client.
+        :raise RuntimeError: if the server failed.
+        """
+        self._request_queue.put(
+            _PolicyRequest(
+                client_id=self.client_id,
+                observations=observations,
+                episode_start=episode_start,
+            )
+        )
+        response = self._response_conn.recv()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class PolicyServer:
+    r"""Batches :ref:`Policy.act` calls coming from many :ref:`PolicyClient`.
+
+    A batch is dispatched as soon as :p:`max_batch_size` requests are pending
+    or :p:`max_latency` seconds have passed since the first pending request
+    arrived, whichever comes first. The server can either be driven manually
+    with :ref:`serve_batch` or run in a background thread of the process that
+    owns the policy with :ref:`start`.
+
+    :param actor_critic: the policy to query.
+    :param num_clients: number of clients that will be connected.
+    :param hidden_size: size of the recurrent hidden state of the policy.
+    :param device: device the policy lives on.
+    :param max_batch_size: largest batch to run through the policy, defaults
+        to :p:`num_clients`.
+    :param max_latency: longest time (in seconds) the first request of a
+        batch waits for other requests.
+    :param deterministic: whether to take the mode of the action distribution
+        instead of sampling from it.
+    :param action_shape: shape of a single action.
+    :param discrete_actions: whether actions are discrete.
+    :param multiprocessing_start_method: start method of the queues and pipes
+        handed to the clients, it must match the one of the processes the
+        clients are used in.
+    """
+
+    def __init__(
+        self,
+        actor_critic: Policy,
+        num_clients: int,
+        hidden_size: int,
+        device: torch.device,
+        max_batch_size: Optional[int] = None,
+        max_latency: float = 0.005,
+        deterministic: bool = False,
+        action_shape: Tuple[int, ...] = (1,),
+        discrete_actions: bool = True,
+        multiprocessing_start_method: str = "forkserver",
+    ) -> None:
+        assert num_clients > 0, "need at least one client"
+        self.actor_critic = actor_critic
+        self.num_clients = num_clients
+        self.device = device
+        self.max_batch_size = (
+            num_clients if max_batch_size is None else max_batch_size
+        )
+        self.max_latency = max_latency
+        self.deterministic = deterministic
+
+        mp_ctx = mp.get_context(multiprocessing_start_method)
+        self._request_queue = mp_ctx.Queue()
+        self._clients: List[PolicyClient] = []
+        self._response_conns: List[Connection] = []
+        for client_id in range(num_clients):
+            read_conn, write_conn = mp_ctx.Pipe(duplex=False)
+            self._clients.append(
+                PolicyClient(client_id, self._request_queue, read_conn)
+            )
+            self._response_conns.append(write_conn)
+
+        self._rnn_hidden_states = torch.zeros(
+            num_clients,
+            actor_critic.net.num_recurrent_layers,
+            hidden_size,
+            device=device,
+        )
+        self._prev_actions = torch.zeros(
+            num_clients,
+            *action_shape,
+            device=device,
+            dtype=torch.long if discrete_actions else torch.float,
+        )
+        self._obs_cache = ObservationBatchingCache()
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Sent to the clients instead of actions once a batch failed
+        self._error: Optional[RuntimeError] = None
+
+    @property
+    def clients(self) -> List[PolicyClient]:
+        return self._clients
+
+    def _gather_requests(
+        self, timeout: Optional[float]
+    ) -> List[_PolicyRequest]:
+        try:
+            requests = [self._request_queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_latency
+        while len(requests) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    requests.append(self._request_queue.get(timeout=remaining))
+                else:
+                    requests.append(self._request_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return requests
+
+    def serve_batch(self, timeout: Optional[float] = None) -> int:
+        r"""Waits for requests, answers one batch of them and returns its
+        size.
+
+        :param timeout: how long to wait for the first request, forever if
+            :py:`None`.
+        :return: number of requests answered, 0 if none arrived in time.
+        """
+        requests = self._gather_requests(timeout)
+        if len(requests) == 0:
+            return 0
+
+        if self._error is None:
+            try:
+                actions = self._act(requests)
+            except Exception as e:
+                self._error = RuntimeError(f"Policy server failed: {e!r}")
+                self._send_error(requests)
+                raise
+        else:
+            self._send_error(requests)
+            return len(requests)
+
+        for i, request in enumerate(requests):
+            self._response_conns[request.client_id].send(actions[i])
+
+        return len(requests)
+
+    def _send_error(self, requests: List[_PolicyRequest]) -> None:
+        for request in requests:
+            self._response_conns[request.client_id].send(self._error)
+
+    def _act(self, requests: List[_PolicyRequest]) -> np.ndarray:
+        client_ids = torch.tensor(
+            [request.client_id for request in requests],
+            device=self.device,
+            dtype=torch.long,
+        )
+        batch = batch_obs(
+            [request.observations for request in requests],
+            device=self.device,
+            cache=self._obs_cache,
+        )
+        masks = torch.tensor(
+            [[not request.episode_start] for request in requests],
+            device=self.device,
+            dtype=torch.bool,
+        )
+
+        with torch.no_grad():
+            _, actions, _, rnn_hidden_states = self.actor_critic.act(
+                batch,
+                self._rnn_hidden_states[client_ids],
+                self._prev_actions[client_ids],
+                masks,
+                deterministic=self.deterministic,
+            )
+
+        self._rnn_hidden_states[client_ids] = rnn_hidden_states
+        self._prev_actions[client_ids] = actions
+
+        return actions.cpu().numpy()
+
+    def _serve_forever(self) -> None:
+        # After a failure, the thread keeps running to answer the clients
+        # with the error instead of leaving them blocked
+        while not self._stop.is_set():
+            try:
+                self.serve_batch(timeout=0.1)
+            except Exception:
+                logger.exception("Policy server failed to serve a batch")
+
+    def start(self) -> None:
+        r"""Starts serving requests in a background thread."""
+        assert self._thread is None, "the server is already running"
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._serve_forever, name="policy-server", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        r"""Stops the background thread and releases the communication
+        channels.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+        for conn in self._response_conns:
+            conn.close()
+        self._request_queue.close()
+
+    def __enter__(self) -> "PolicyServer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -283,6 +283,8 @@ class PPOTrainer(BaseRLTrainer):
         obs_space = self.obs_space
         if self._static_encoder:
             self._encoder = self.actor_critic.net.visual_encoder
+            # The frozen encoder's output is all the policy needs from the
+            # visual sensors, so only the features are kept in the rollouts
             obs_space = spaces.Dict(
                 {
                     "visual_features": spaces.Box(
@@ -291,7 +293,11 @@ class PPOTrainer(BaseRLTrainer):
                         shape=self._encoder.output_shape,
                         dtype=np.float32,
                     ),
-                    **obs_space.spaces,
+                    **{
+                        k: v
+                        for k, v in obs_space.spaces.items()
+                        if k not in self._encoder.visual_keys
+                    },
                 }
             )
 
@@ -320,7 +326,7 @@ class PPOTrainer(BaseRLTrainer):
             with torch.no_grad():
                 batch["visual_features"] = self._encoder(batch)
 
-        self.rollouts.buffers["observations"][0] = batch
+        self.rollouts.buffers["observations"].set(0, batch, strict=False)
 
         self.current_episode_reward = torch.zeros(self.envs.num_envs, 1)
         self.running_episode_stats = dict(
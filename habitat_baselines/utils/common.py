@@ -175,14 +175,13 @@ class ObservationBatchingCache:
         cache = torch.empty(
             num_obs, *sensor.size(), dtype=sensor.dtype, device=sensor.device
         )
-        if (
-            device is not None
-            and device.type == "cuda"
-            and cache.device.type == "cpu"
-        ):
+        if cache.device.type == "cpu":
+            if device is not None and device.type == "cuda":
+                cache = cache.pin_memory()
+
             # Pytorch indexing is slow,
             # so convert to numpy
-            cache = cache.pin_memory().numpy()
+            cache = cache.numpy()
 
         self._pool[key] = cache
         return cache
@@ -245,7 +244,13 @@ def batch_obs(
                 if isinstance(sensor, np.ndarray):
                     batch_t[sensor_name][i] = sensor
                 elif torch.is_tensor(sensor):
-                    batch_t[sensor_name][i].copy_(sensor, non_blocking=True)
+                    # CPU-side caches are numpy arrays
+                    if isinstance(batch_t[sensor_name], np.ndarray):
+                        batch_t[sensor_name][i] = sensor.numpy()
+                    else:
+                        batch_t[sensor_name][i].copy_(
+                            sensor, non_blocking=True
+                        )
                 # If the sensor wasn't a tensor, then it's some CPU side data
                 # so use a numpy array
                 else:
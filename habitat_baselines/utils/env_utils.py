@@ -9,6 +9,8 @@ from typing import List, Type, Union
 
 import habitat
 from habitat import Config, Env, RLEnv, VectorEnv, make_dataset
+from habitat.datasets.columnar import share_columnar_dataset
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 
 
 def make_env_fn(
@@ -54,6 +56,24 @@ def construct_envs(
     configs = []
     env_classes = [env_class for _ in range(num_environments)]
     dataset = make_dataset(config.TASK_CONFIG.DATASET.TYPE)
+    if (
+        config.SHARED_DATASET_DIR
+        and not config.TASK_CONFIG.DATASET.COLUMNAR_PATH
+        and isinstance(dataset, PointNavDatasetV1)
+    ):
+        # The environments memory map the same episodes, each only reads the
+        # rows of its scenes
+        dataset_config = config.TASK_CONFIG.DATASET
+        columnar_path = share_columnar_dataset(
+            dataset_config.DATA_PATH.format(split=dataset_config.SPLIT),
+            config.SHARED_DATASET_DIR,
+            dataset.content_scenes_path,
+        )
+        config = config.clone()
+        config.defrost()
+        config.TASK_CONFIG.DATASET.COLUMNAR_PATH = columnar_path
+        config.freeze()
+
     scenes = config.TASK_CONFIG.DATASET.CONTENT_SCENES
     if "*" in config.TASK_CONFIG.DATASET.CONTENT_SCENES:
         scenes = dataset.get_scenes_to_load(config.TASK_CONFIG.DATASET)
@@ -103,5 +123,6 @@ def construct_envs(
         make_env_fn=make_env_fn,
         env_fn_args=tuple(zip(configs, env_classes)),
         workers_ignore_signals=workers_ignore_signals,
+        max_concurrent_scene_switches=config.TASK_CONFIG.ENVIRONMENT.MAX_CONCURRENT_SCENE_SWITCHES,
     )
     return envs
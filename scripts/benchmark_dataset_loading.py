@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Times the loading of a PointNav dataset with a file per scene, with the
+scene files read one after the other or by a pool of workers, and with the
+``json`` module or ``orjson``.
+
+A synthetic dataset is written to a temporary directory, or pass
+``--data-path`` to time an existing one:
+
+.. code:: sh
+
+    python scripts/benchmark_dataset_loading.py --num-scenes 100 \
+        --num-episodes 200000 --num-workers 8
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Any
+
+from benchmark_dataset_memory import write_synthetic_dataset
+
+from habitat.config.default import get_config
+from habitat.datasets import json_loading
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
+
+
+def _time_loading(config, num_workers: int, pool: str, orjson: Any):
+    config.defrost()
+    config.NUM_LOADER_WORKERS = num_workers
+    config.LOADER_POOL = pool
+    config.freeze()
+
+    # Every variant starts with the files in the page cache
+    PointNavDatasetV1(config)
+
+    json_loading.orjson = orjson
+    t_start = time.perf_counter()
+    dataset = PointNavDatasetV1(config)
+    return len(dataset.episodes), time.perf_counter() - t_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", type=str, default=None)
+    parser.add_argument("--split", type=str, default="train")
+    parser.add_argument("--num-scenes", type=int, default=50)
+    parser.add_argument("--num-episodes", type=int, default=100000)
+    parser.add_argument("--num-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    orjson = json_loading.orjson
+    backends = [("json", None)]
+    if orjson is not None:
+        backends.append(("orjson", orjson))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = args.data_path
+        if data_path is None:
+            data_path = write_synthetic_dataset(
+                tmp_dir, args.num_scenes, args.num_episodes
+            )
+
+        config = get_config().DATASET
+        config.defrost()
+        config.DATA_PATH = data_path
+        config.SPLIT = args.split
+        config.SCENES_DIR = tmp_dir
+        config.freeze()
+
+        baseline = None
+        for backend, module in backends:
+            for num_workers, pool in [
+                (0, "thread"),
+                (args.num_workers, "thread"),
+                (args.num_workers, "process"),
+            ]:
+                num_episodes, load_time = _time_loading(
+                    config, num_workers, pool, module
+                )
+                if baseline is None:
+                    baseline = load_time
+                print(
+                    "{:>6} {:>2} workers {:>7}: {} episodes in {:.2f}s "
+                    "({:.2f}x)".format(
+                        backend,
+                        num_workers,
+                        pool if num_workers > 0 else "",
+                        num_episodes,
+                        load_time,
+                        baseline / load_time,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
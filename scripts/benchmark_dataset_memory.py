@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Measures the private memory of a PointNav dataset once loaded, for
+the JSON and columnar formats, with eager and lazy episodes.
+
+A synthetic dataset is written to a temporary directory, or pass
+``--data-path`` to measure an existing one. Every variant is loaded in a
+fresh process:
+
+.. code:: sh
+
+    python scripts/benchmark_dataset_memory.py --num-episodes 1000000
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from habitat.config.default import get_config
+from habitat.datasets.columnar import (
+    columnar_dataset_path,
+    convert_dataset_to_columnar,
+)
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
+
+
+def write_synthetic_dataset(
+    data_dir: str,
+    num_scenes: int,
+    num_episodes: int,
+    shortest_path_length: int = 0,
+    per_scene_files: bool = True,
+    seed: int = 0,
+) -> str:
+    r"""Writes a PointNav dataset with random episodes and returns its
+    ``DATA_PATH``.
+    """
+    rng = np.random.RandomState(seed)
+    datasetfile_path = os.path.join(data_dir, "{split}", "{split}.json.gz")
+    split_dir = os.path.dirname(datasetfile_path.format(split="train"))
+    os.makedirs(os.path.join(split_dir, "content"), exist_ok=True)
+
+    all_episodes = []
+    for scene_index in range(num_scenes):
+        scene = f"scene{scene_index:04d}"
+        episodes = []
+        for episode_index in range(num_episodes // num_scenes):
+            episodes.append(
+                {
+                    "episode_id": str(episode_index),
+                    "scene_id": f"synthetic/{scene}.glb",
+                    "start_position": rng.uniform(-10, 10, 3).tolist(),
+                    "start_rotation": [0.0, rng.uniform(-1, 1), 0.0, 1.0],
+                    "info": {"geodesic_distance": rng.uniform(1, 20)},
+                    "goals": [
+                        {
+                            "position": rng.uniform(-10, 10, 3).tolist(),
+                            "radius": None,
+                        }
+                    ],
+                    "shortest_paths": [
+                        [
+                            {
+                                "position": rng.uniform(-10, 10, 3).tolist(),
+                                "rotation": [0.0, 0.0, 0.0, 1.0],
+                                "action": 1,
+                            }
+                            for _ in range(shortest_path_length)
+                        ]
+                    ]
+                    if shortest_path_length > 0
+                    else None,
+                    "start_room": None,
+                }
+            )
+        if per_scene_files:
+            with gzip.open(
+                os.path.join(split_dir, "content", scene + ".json.gz"), "wt"
+            ) as f:
+                json.dump({"episodes": episodes}, f)
+        else:
+            all_episodes.extend(episodes)
+
+    if not per_scene_files:
+        os.rmdir(os.path.join(split_dir, "content"))
+    with gzip.open(datasetfile_path.format(split="train"), "wt") as f:
+        json.dump({"episodes": all_episodes}, f)
+
+    return datasetfile_path
+
+
+def _private_memory_mb() -> float:
+    r"""Resident memory that is private to the process. Pages of memory
+    mapped files are in the page cache, shared by all the processes that map
+    them, and are not counted.
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("RssAnon is missing from /proc/self/status")
+
+
+def _measure(config, lazy, iterate, queue) -> None:
+    config.defrost()
+    config.LAZY_EPISODES = lazy
+    config.freeze()
+
+    baseline = _private_memory_mb()
+    t_start = time.perf_counter()
+    dataset = PointNavDatasetV1(config)
+    load_time = time.perf_counter() - t_start
+    if iterate:
+        for _ in dataset.get_episode_iterator(cycle=False):
+            pass
+    queue.put(
+        dict(
+            num_episodes=len(dataset.episodes),
+            load_time=load_time,
+            private_mb=_private_memory_mb() - baseline,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", type=str, default=None)
+    parser.add_argument("--split", type=str, default="train")
+    parser.add_argument("--num-scenes", type=int, default=50)
+    parser.add_argument("--num-episodes", type=int, default=100000)
+    parser.add_argument("--shortest-path-length", type=int, default=0)
+    parser.add_argument(
+        "--iterate",
+        action="store_true",
+        help="Also go through all the episodes once after loading",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = args.data_path
+        if data_path is None:
+            data_path = write_synthetic_dataset(
+                tmp_dir,
+                args.num_scenes,
+                args.num_episodes,
+                args.shortest_path_length,
+            )
+
+        config = get_config().DATASET
+        config.defrost()
+        config.DATA_PATH = data_path
+        config.SPLIT = args.split
+        config.SCENES_DIR = tmp_dir
+        config.freeze()
+
+        datasetfile_path = data_path.format(split=args.split)
+        columnar_path = columnar_dataset_path(datasetfile_path)
+        columnar_exists = os.path.isdir(columnar_path)
+        if not columnar_exists:
+            convert_dataset_to_columnar(datasetfile_path, columnar_path)
+
+        mp_ctx = multiprocessing.get_context("spawn")
+        for fmt in ["json", "columnar"]:
+            if fmt == "json":
+                os.rename(columnar_path, columnar_path + ".hidden")
+            for lazy in [False, True]:
+                queue = mp_ctx.Queue()
+                process = mp_ctx.Process(
+                    target=_measure, args=(config, lazy, args.iterate, queue)
+                )
+                process.start()
+                result = queue.get()
+                process.join()
+                print(
+                    "{:>8} {:>5}: {} episodes, loaded in {:.2f}s, "
+                    "private memory {:.1f}MB".format(
+                        fmt,
+                        "lazy" if lazy else "eager",
+                        result["num_episodes"],
+                        result["load_time"],
+                        result["private_mb"],
+                    )
+                )
+            if fmt == "json":
+                os.rename(columnar_path + ".hidden", columnar_path)
+
+        if not columnar_exists:
+            # Leave a user provided dataset as it was
+            shutil.rmtree(columnar_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Measures the memory taken by the episodes and goals of a synthetic
+ObjectNav dataset, with the slotted classes of habitat and with equivalent
+classes that keep their attributes in a ``__dict__``:
+
+.. code:: sh
+
+    python scripts/benchmark_episode_memory.py --num-view-points 2000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Any, Dict, List
+
+import attr
+import numpy as np
+
+from habitat.core.simulator import AgentState
+from habitat.tasks.nav.object_nav_task import (
+    ObjectGoal,
+    ObjectGoalNavEpisode,
+    ObjectViewLocation,
+)
+
+
+def _dict_class(cls: type) -> type:
+    r"""Returns a copy of the attrs class :p:`cls` without slots."""
+    return attr.make_class(
+        cls.__name__,
+        {
+            field.name: attr.ib(default=field.default, init=field.init)
+            for field in attr.fields(cls)
+        },
+        slots=False,
+    )
+
+
+def synthetic_objectnav_dataset(
+    num_scenes: int,
+    num_categories: int,
+    num_goals: int,
+    num_view_points: int,
+    num_episodes: int,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    r"""Returns the deserialized JSON of an ObjectNav dataset with random
+    goals and episodes. :p:`num_goals` objects per category and scene each
+    have :p:`num_view_points` view points.
+    """
+    rng = np.random.RandomState(seed)
+    goals_by_category = {}
+    for scene_index in range(num_scenes):
+        for category_index in range(num_categories):
+            goals_by_category[
+                f"scene{scene_index}.glb_category{category_index}"
+            ] = [
+                {
+                    "object_id": str(goal_index),
+                    "object_category": f"category{category_index}",
+                    "position": rng.uniform(-10, 10, 3).tolist(),
+                    "view_points": [
+                        {
+                            "agent_state": {
+                                "position": rng.uniform(-10, 10, 3).tolist(),
+                                "rotation": rng.uniform(-1, 1, 4).tolist(),
+                            },
+                            "iou": rng.uniform(),
+                        }
+                        for _ in range(num_view_points)
+                    ],
+                }
+                for goal_index in range(num_goals)
+            ]
+
+    episodes = [
+        {
+            "episode_id": str(episode_index),
+            "scene_id": f"scene{rng.randint(num_scenes)}.glb",
+            "object_category": f"category{rng.randint(num_categories)}",
+            "start_position": rng.uniform(-10, 10, 3).tolist(),
+            "start_rotation": rng.uniform(-1, 1, 4).tolist(),
+            "info": {"geodesic_distance": rng.uniform(1, 20)},
+            "goals": [],
+        }
+        for episode_index in range(num_episodes)
+    ]
+
+    return {
+        "goals_by_category": goals_by_category,
+        "episodes": episodes,
+        "category_to_task_category_id": {
+            f"category{i}": i for i in range(num_categories)
+        },
+        "category_to_scene_annotation_category_id": {
+            f"category{i}": i for i in range(num_categories)
+        },
+    }
+
+
+def _build(
+    deserialized: Dict[str, Any],
+    episode_cls: type,
+    goal_cls: type,
+    view_cls: type,
+    agent_state_cls: type,
+) -> List[Any]:
+    goals_by_category = {
+        k: [
+            goal_cls(
+                **{
+                    **goal,
+                    "view_points": [
+                        view_cls(
+                            agent_state=agent_state_cls(**view["agent_state"]),
+                            iou=view["iou"],
+                        )
+                        for view in goal["view_points"]
+                    ],
+                }
+            )
+            for goal in goals
+        ]
+        for k, goals in deserialized["goals_by_category"].items()
+    }
+    episodes = []
+    for episode in deserialized["episodes"]:
+        episode = episode_cls(**episode)
+        episode.goals = goals_by_category[
+            f"{episode.scene_id}_{episode.object_category}"
+        ]
+        episodes.append(episode)
+    return episodes
+
+
+def _measure(deserialized: Dict[str, Any], *classes: type) -> float:
+    gc.collect()
+    tracemalloc.start()
+    episodes = _build(deserialized, *classes)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del episodes
+    return size / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-scenes", type=int, default=10)
+    parser.add_argument("--num-categories", type=int, default=6)
+    parser.add_argument("--num-goals", type=int, default=5)
+    parser.add_argument("--num-view-points", type=int, default=1000)
+    parser.add_argument("--num-episodes", type=int, default=50000)
+    args = parser.parse_args()
+
+    deserialized = synthetic_objectnav_dataset(
+        args.num_scenes,
+        args.num_categories,
+        args.num_goals,
+        args.num_view_points,
+        args.num_episodes,
+    )
+    slotted_classes = (
+        ObjectGoalNavEpisode,
+        ObjectGoal,
+        ObjectViewLocation,
+        AgentState,
+    )
+    dict_mb = _measure(
+        deserialized, *(_dict_class(cls) for cls in slotted_classes)
+    )
+    slotted_mb = _measure(deserialized, *slotted_classes)
+    print(
+        "{} episodes, {} view points: __dict__ {:.1f}MB, "
+        "__slots__ {:.1f}MB ({:.0%} less)".format(
+            len(deserialized["episodes"]),
+            args.num_scenes
+            * args.num_categories
+            * args.num_goals
+            * args.num_view_points,
+            dict_mb,
+            slotted_mb,
+            1 - slotted_mb / dict_mb,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -105,6 +105,39 @@ def test_trainers(test_cfg_path, mode, gpu2gpu, observation_transforms):
         torch.distributed.destroy_process_group()
 
 
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_static_encoder_rollouts():
+    # For testing with world_size=1, -1 works as port in PyTorch
+    os.environ["MASTER_PORT"] = str(-1)
+
+    config = get_config(
+        "habitat_baselines/config/test/ddppo_pointnav_test.yaml",
+        ["RL.DDPPO.train_encoder", "False"],
+    )
+    trainer = baseline_registry.get_trainer(config.TRAINER_NAME)(config)
+    trainer._init_train()
+
+    # Only the features of the frozen encoder are stored
+    observations = trainer.rollouts.buffers["observations"]
+    assert "visual_features" in observations
+    assert len(trainer._encoder.visual_keys) > 0
+    for k in trainer._encoder.visual_keys:
+        assert k not in observations
+
+    trainer._compute_actions_and_step_envs()
+    trainer._collect_environment_result()
+    trainer.envs.close()
+
+    # Needed to destroy the trainer
+    gc.collect()
+
+    # Deinit processes group
+    if torch.distributed.is_initialized():
+        torch.distributed.destroy_process_group()
+
+
 @pytest.mark.skipif(
     not baseline_installed, reason="baseline sub-module not installed"
 )
@@ -4,11 +4,15 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import copy
+import multiprocessing
+import random
 from itertools import groupby, islice
 
+import numpy as np
 import pytest
 
-from habitat.core.dataset import Dataset, Episode
+from habitat.core.dataset import Dataset, Episode, LazyEpisodeStore
 
 
 def _construct_dataset(num_episodes, num_groups=10):
@@ -26,6 +30,89 @@ def _construct_dataset(num_episodes, num_groups=10):
     return dataset
 
 
+def _construct_lazy_dataset(num_episodes, num_groups=10):
+    episodes = _construct_dataset(num_episodes, num_groups).episodes
+    scene_ids = sorted({ep.scene_id for ep in episodes})
+    dataset = Dataset()
+    dataset.episodes = LazyEpisodeStore(
+        lambda row: copy.copy(episodes[row]),
+        scene_ids,
+        np.array([scene_ids.index(ep.scene_id) for ep in episodes]),
+    )
+    return dataset
+
+
+def _episode_ids(episodes):
+    return [ep.episode_id for ep in episodes]
+
+
+def test_lazy_episode_store():
+    dataset = _construct_dataset(100)
+    lazy_dataset = _construct_lazy_dataset(100)
+    store = lazy_dataset.episodes
+
+    assert len(store) == 100
+    assert _episode_ids(store) == _episode_ids(dataset.episodes)
+    assert store[3].episode_id == "3"
+    # Episodes are built on every access
+    assert store[3] is not store[3]
+    assert _episode_ids(store[10:20:2]) == ["10", "12", "14", "16", "18"]
+    assert store.take([5, 1]).scene_id_of(1) == "scene_id_1"
+
+    assert lazy_dataset.scene_ids == dataset.scene_ids
+    assert _episode_ids(
+        lazy_dataset.get_scene_episodes("scene_id_4")
+    ) == _episode_ids(dataset.get_scene_episodes("scene_id_4"))
+    assert _episode_ids(lazy_dataset.get_episodes([7, 2, 99])) == _episode_ids(
+        dataset.get_episodes([7, 2, 99])
+    )
+
+    filtered = lazy_dataset.filter_episodes(
+        lambda ep: int(ep.episode_id) % 3 == 0
+    )
+    assert isinstance(filtered.episodes, LazyEpisodeStore)
+    assert _episode_ids(filtered.episodes) == [
+        str(i) for i in range(0, 100, 3)
+    ]
+
+    for kwargs in [{}, dict(sort_by_episode_id=True, collate_scene_ids=False)]:
+        np.random.seed(0)
+        splits = dataset.get_splits(3, **kwargs)
+        np.random.seed(0)
+        lazy_splits = lazy_dataset.get_splits(3, **kwargs)
+        for split, lazy_split in zip(splits, lazy_splits):
+            assert isinstance(lazy_split.episodes, LazyEpisodeStore)
+            assert _episode_ids(lazy_split.episodes) == _episode_ids(
+                split.episodes
+            )
+
+
+@pytest.mark.parametrize(
+    "iterator_kwargs",
+    [
+        dict(cycle=False, group_by_scene=False),
+        dict(shuffle=True),
+        dict(shuffle=True, num_episode_sample=30),
+        dict(shuffle=True, max_scene_repeat_episodes=3),
+        dict(shuffle=False, max_scene_repeat_steps=10),
+    ],
+)
+def test_lazy_episode_iterator(iterator_kwargs):
+    sequences = []
+    for dataset in [_construct_dataset(100), _construct_lazy_dataset(100)]:
+        random.seed(0)
+        np.random.seed(0)
+        episode_iter = dataset.get_episode_iterator(**iterator_kwargs)
+        sequence = []
+        for episode in islice(episode_iter, 250):
+            sequence.append(episode.episode_id)
+            for _ in range(int(episode.episode_id) % 4):
+                episode_iter.step_taken()
+        sequences.append(sequence)
+
+    assert sequences[0] == sequences[1]
+
+
 def test_scene_ids():
     dataset = _construct_dataset(100)
     assert dataset.scene_ids == ["scene_id_" + str(ii) for ii in range(10)]
@@ -151,6 +238,30 @@ def test_get_splits_collate_scenes():
         assert found_not_collated
 
 
+def test_get_splits_collate_order():
+    dataset = _construct_dataset(500, num_groups=13)
+    random.Random(0).shuffle(dataset.episodes)
+    scene_ids, codes = dataset._scene_codes()
+    assert scene_ids == dataset.scene_ids
+    assert [scene_ids[code] for code in codes] == [
+        ep.scene_id for ep in dataset.episodes
+    ]
+
+    # Scenes come in the order they are first drawn, and the episodes of a
+    # scene in the order they are drawn
+    np.random.seed(0)
+    draws = np.random.choice(500, 4 * 100, replace=False)
+    by_scene = {}
+    for i in draws:
+        by_scene.setdefault(dataset.episodes[i].scene_id, []).append(i)
+    expected = [dataset.episodes[i] for ids in by_scene.values() for i in ids]
+
+    np.random.seed(0)
+    splits = dataset.get_splits(4, 100, remove_unused_episodes=True)
+    assert [ep for split in splits for ep in split.episodes] == expected
+    assert dataset.episodes == expected
+
+
 def test_get_splits_sort_by_episode_id():
     dataset = _construct_dataset(10000)
     splits = dataset.get_splits(10, 23, sort_by_episode_id=True)
@@ -352,6 +463,39 @@ def test_iterator_scene_switching_steps():
     )
 
 
+def test_iterator_coordinated_scene_switching():
+    semaphore = multiprocessing.BoundedSemaphore(1)
+    episode_iters = [
+        _construct_dataset(100).get_episode_iterator(
+            max_scene_repeat_episodes=2,
+            shuffle=False,
+            scene_switch_semaphore=semaphore,
+        )
+        for _ in range(2)
+    ]
+
+    for _ in range(2):
+        scene_ids = [next(it).scene_id for it in episode_iters]
+        assert scene_ids == ["scene_id_0", "scene_id_0"]
+
+    # Only one of the iterators may switch until it releases the switch
+    scene_ids = [next(it).scene_id for it in episode_iters]
+    assert scene_ids == ["scene_id_1", "scene_id_0"]
+    scene_ids = [next(it).scene_id for it in episode_iters]
+    assert scene_ids == ["scene_id_1", "scene_id_0"]
+
+    episode_iters[0].release_scene_switch()
+    assert next(episode_iters[1]).scene_id == "scene_id_1"
+    assert next(episode_iters[0]).scene_id == "scene_id_1"
+
+    episode_iters[1].release_scene_switch()
+    episode_iters[1].release_scene_switch()
+    assert next(episode_iters[0]).scene_id == "scene_id_2"
+    episode_iters[0].release_scene_switch()
+    assert semaphore.acquire(False)
+    assert not semaphore.acquire(False)
+
+
 def test_preserve_order():
     dataset = _construct_dataset(100)
     episodes = sorted(dataset.episodes, reverse=True, key=lambda x: x.scene_id)
@@ -10,7 +10,13 @@ import numpy as np
 import pytest
 
 import habitat
-from habitat.utils.test_utils import sample_non_stop_action
+from habitat.core.embodied_task import Measure, Measurements
+from habitat.tasks.nav.nav import (
+    NavigationEpisode,
+    NavigationGoal,
+    NavigationTask,
+)
+from habitat.utils.test_utils import StubSimulator, sample_non_stop_action
 
 CFG_TEST = "configs/test/habitat_all_sensors_test.yaml"
 TELEPORT_POSITION = np.array([-3.2890449, 0.15067159, 11.124366])
@@ -97,3 +103,140 @@ def test_task_actions_sampling(config_file):
             env.step(action)
             agent_state = env.sim.get_agent_state()
             habitat.logger.info(agent_state)
+
+
+class _CountingMeasure(Measure):
+    def __init__(self, uuid, dependencies=(), is_lazy=False):
+        self._uuid = uuid
+        self.dependencies = dependencies
+        self.is_lazy = is_lazy
+        self.updates = []
+        super().__init__()
+
+    def _get_uuid(self, *args, **kwargs):
+        return self._uuid
+
+    def reset_metric(self, *args, step, task, **kwargs):
+        task.measurements.check_measure_dependencies(
+            self.uuid, list(self.dependencies)
+        )
+        self.update_metric(step=step, task=task)
+
+    def update_metric(self, *args, step, task, **kwargs):
+        self.updates.append(step)
+        self._metric = step + sum(
+            task.measurements.measures[uuid].get_metric()
+            for uuid in self.dependencies
+        )
+
+
+def test_measurements_dependency_graph():
+    class Task:
+        pass
+
+    task = Task()
+    # Listed before the measures they depend on
+    spl = _CountingMeasure("spl", ("success",))
+    success = _CountingMeasure("success", ("distance",), is_lazy=True)
+    distance = _CountingMeasure("distance", is_lazy=True)
+    expensive = _CountingMeasure("expensive", is_lazy=True)
+    task.measurements = Measurements([spl, success, distance, expensive])
+
+    task.measurements.reset_measures(step=0, task=task)
+    for step in range(1, 4):
+        task.measurements.update_measures(step=step, task=task)
+    # Lazy measures are only updated when read, once per step
+    assert spl.updates == [0, 1, 2, 3]
+    assert success.updates == distance.updates == [0, 1, 2, 3]
+    assert expensive.updates == [0]
+    assert task.measurements.get_metrics() == {
+        "spl": 9,
+        "success": 6,
+        "distance": 3,
+        "expensive": 3,
+    }
+    task.measurements.get_metrics()
+    assert expensive.updates == [0, 3]
+
+    cyclic = _CountingMeasure("cyclic", ("spl",))
+    spl.dependencies = ("success", "cyclic")
+    with pytest.raises(AssertionError):
+        Measurements([spl, success, distance, cyclic])
+
+
+def test_rearrange_pick_measures_dependencies():
+    from habitat.tasks.rearrange.rearrange_sensors import (
+        EndEffectorToObjectDistance,
+        EndEffectorToRestDistance,
+        RearrangePickReward,
+        RearrangePickSuccess,
+        RobotForce,
+    )
+
+    reward = RearrangePickReward(sim=None, config=None, task=None)
+    success = RearrangePickSuccess(sim=None, config=None)
+    # Listed after the measures that read them
+    measurements = Measurements(
+        [
+            reward,
+            success,
+            _CountingMeasure(RobotForce.cls_uuid),
+            _CountingMeasure(EndEffectorToObjectDistance.cls_uuid),
+            _CountingMeasure(EndEffectorToRestDistance.cls_uuid),
+        ]
+    )
+    ee_distances = [
+        EndEffectorToObjectDistance.cls_uuid,
+        EndEffectorToRestDistance.cls_uuid,
+    ]
+    measurements.check_measure_dependencies(success.uuid, ee_distances)
+    measurements.check_measure_dependencies(
+        reward.uuid,
+        ee_distances + [RearrangePickSuccess.cls_uuid, RobotForce.cls_uuid],
+    )
+
+
+def test_task_action_dispatch():
+    config = habitat.get_config().TASK.clone()
+    config.defrost()
+    config.POSSIBLE_ACTIONS = config.POSSIBLE_ACTIONS + ["TELEPORT"]
+    config.freeze()
+    sim = StubSimulator()
+    task = NavigationTask(config=config, sim=sim)
+    episode = NavigationEpisode(
+        episode_id="0",
+        scene_id="scene.glb",
+        start_position=[0.0, 0.0, 0.0],
+        start_rotation=[0, 0, 0, 1],
+        goals=[NavigationGoal(position=[0.0, 0.0, -5.0])],
+    )
+    task.reset(episode)
+
+    # Names and indices, also numpy and negative ones, dispatch the same way
+    for action_name in ["MOVE_FORWARD", 1, np.int64(1)]:
+        action = {"action": action_name}
+        task.step(action, episode)
+        assert action["action_args"] == {}
+    assert np.allclose(sim.get_agent_state().position, [0, 0, -0.75])
+
+    task.step({"action": -2, "action_args": None}, episode)
+    task.step(
+        {
+            "action": "TELEPORT",
+            "action_args": {
+                "position": [1.0, 0.0, 2.0],
+                "rotation": [0, 0, 0, 1],
+            },
+        },
+        episode,
+    )
+    assert np.allclose(sim.get_agent_state().position, [1.0, 0.0, 2.0])
+
+    with pytest.raises(ValueError):
+        task.step({"action": 5}, episode)
+    with pytest.raises(AssertionError):
+        task.step({"action": "JUMP"}, episode)
+
+    assert task.is_episode_active
+    task.step({"action": 0}, episode)
+    assert not task.is_episode_active
@@ -5,6 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 import json
+import pickle
 import time
 
 import pytest
@@ -61,6 +62,71 @@ def test_mp3d_object_nav_dataset():
     check_json_serializaiton(dataset)
 
 
+def test_slotted_episodes():
+    view_point = {
+        "agent_state": {
+            "position": [1.0, 0.0, 2.0],
+            "rotation": [0.0, 0.0, 0.0, 1.0],
+        },
+        "iou": 0.5,
+    }
+    dataset = ObjectNavDatasetV1()
+    dataset.from_json(
+        json.dumps(
+            {
+                "episodes": [
+                    {
+                        "episode_id": str(i),
+                        "scene_id": "scene.glb",
+                        "start_position": [0.0, 0.0, float(i)],
+                        "start_rotation": [0.0, 0.0, 0.0, 1.0],
+                        "info": {"geodesic_distance": 1.0},
+                        "goals": [
+                            {
+                                "object_id": "0",
+                                "object_category": "chair",
+                                "position": [1.0, 0.0, 1.0],
+                                "view_points": [view_point] * 3,
+                            }
+                        ],
+                        "shortest_paths": [
+                            [
+                                {
+                                    "position": [0.0, 0.0, 0.0],
+                                    "rotation": [0.0, 0.0, 0.0, 1.0],
+                                    "action": 1,
+                                }
+                            ]
+                        ],
+                    }
+                    for i in range(2)
+                ],
+                "category_to_task_category_id": {"chair": 0},
+                "category_to_scene_annotation_category_id": {"chair": 3},
+            }
+        )
+    )
+    episode = dataset.episodes[0]
+    goal = episode.goals[0]
+    for obj in [
+        episode,
+        goal,
+        goal.view_points[0],
+        goal.view_points[0].agent_state,
+        episode.shortest_paths[0][0],
+    ]:
+        assert not hasattr(obj, "__dict__"), type(obj)
+
+    # The shortest path cache isn't pickled
+    episode._shortest_path_cache = object()
+    unpickled = pickle.loads(pickle.dumps(episode))
+    assert unpickled._shortest_path_cache is None
+    episode._shortest_path_cache = None
+    assert unpickled == episode
+
+    check_json_serializaiton(dataset)
+
+
 @pytest.mark.parametrize("split", ["train", "val"])
 def test_dataset_splitting(split):
     dataset_config = get_config(CFG_TEST).DATASET
@@ -4,23 +4,49 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import gzip
+import json
 import os
+import pickle
 import random
 import time
 
+import attr
 import numpy as np
 import pytest
 
 import habitat
 from habitat.config.default import get_config
+from habitat.core.dataset import LazyEpisodeStore
 from habitat.core.embodied_task import Episode
 from habitat.core.logging import logger
+from habitat.core.simulator import ShortestPathPoint
 from habitat.datasets import make_dataset
+from habitat.datasets.columnar import (
+    ColumnarEpisodes,
+    columnar_dataset_path,
+    convert_dataset_to_columnar,
+    share_columnar_dataset,
+)
+from habitat.datasets.dataset_cache import (
+    _dataset_files,
+    load_dataset,
+    save_dataset,
+)
+from habitat.datasets.json_loading import json_loads, read_json_files
 from habitat.datasets.pointnav import pointnav_generator as pointnav_generator
 from habitat.datasets.pointnav.pointnav_dataset import (
     DEFAULT_SCENE_PATH_PREFIX,
     PointNavDatasetV1,
 )
+from habitat.datasets.pointnav.sharded_generation import (
+    generate_pointnav_dataset,
+)
+from habitat.datasets.shortest_paths import (
+    CompactShortestPath,
+    compact_dataset,
+)
+from habitat.tasks.nav.nav import NavigationEpisode
 from habitat.utils.geometry_utils import (
     angle_between_quaternions,
     quaternion_from_coeff,
@@ -160,6 +186,488 @@ def test_dataset_splitting(split):
     ), "Intersection of split datasets is not the empty set"
 
 
+def _write_synthetic_dataset(
+    data_dir, num_scenes, episodes_per_scene, per_scene_files, seed=0
+):
+    r"""Writes a PointNav dataset with random episodes to
+    :p:`data_dir`/``{split}/{split}.json.gz``, with the episodes either in
+    the split file or in per-scene content files.
+    """
+    rng = np.random.RandomState(seed)
+    scene_episodes = {}
+    for scene_index in range(num_scenes):
+        scene = f"scene{scene_index:03d}"
+        scene_episodes[scene] = [
+            {
+                "episode_id": str(episode_index),
+                "scene_id": f"data/scene_datasets/synthetic/{scene}.glb",
+                "start_position": rng.uniform(-10, 10, 3).tolist(),
+                "start_rotation": rng.uniform(-1, 1, 4).tolist(),
+                "info": {"geodesic_distance": rng.uniform(1, 20)},
+                "goals": [
+                    {"position": rng.uniform(-10, 10, 3).tolist(), "radius": r}
+                    for r in [None, 0.2][: 1 + episode_index % 2]
+                ],
+                "shortest_paths": None,
+                "start_room": None,
+            }
+            for episode_index in range(episodes_per_scene)
+        ]
+
+    datasetfile_path = os.path.join(data_dir, "{split}", "{split}.json.gz")
+    split_path = datasetfile_path.format(split="train")
+    os.makedirs(os.path.dirname(split_path))
+    if per_scene_files:
+        os.makedirs(os.path.join(os.path.dirname(split_path), "content"))
+        for scene, episodes in scene_episodes.items():
+            with gzip.open(
+                os.path.join(
+                    os.path.dirname(split_path), "content", scene + ".json.gz"
+                ),
+                "wt",
+            ) as f:
+                json.dump({"episodes": episodes}, f)
+        split_episodes = []
+    else:
+        split_episodes = [
+            ep for episodes in scene_episodes.values() for ep in episodes
+        ]
+        rng.shuffle(split_episodes)
+    with gzip.open(split_path, "wt") as f:
+        json.dump({"episodes": split_episodes}, f)
+
+    return datasetfile_path
+
+
+def _synthetic_dataset_config(
+    datasetfile_path, content_scenes, lazy_episodes=False
+):
+    dataset_config = get_config().DATASET
+    dataset_config.defrost()
+    dataset_config.LAZY_EPISODES = lazy_episodes
+    dataset_config.DATA_PATH = datasetfile_path
+    dataset_config.SPLIT = "train"
+    dataset_config.SCENES_DIR = os.path.dirname(
+        os.path.dirname(datasetfile_path)
+    )
+    dataset_config.CONTENT_SCENES = content_scenes
+    dataset_config.freeze()
+    return dataset_config
+
+
+def _episode_key(episode):
+    return (episode.scene_id, episode.episode_id)
+
+
+@pytest.mark.parametrize("per_scene_files", [False, True])
+def test_columnar_dataset(tmp_path, per_scene_files):
+    datasetfile_path = _write_synthetic_dataset(
+        str(tmp_path),
+        num_scenes=5,
+        episodes_per_scene=7,
+        per_scene_files=per_scene_files,
+    )
+    content_scenes = ["scene003", "scene001"]
+    json_config = _synthetic_dataset_config(datasetfile_path, content_scenes)
+    json_dataset = PointNavDatasetV1(json_config)
+    json_scenes = PointNavDatasetV1.get_scenes_to_load(json_config)
+
+    columnar_path = convert_dataset_to_columnar(
+        datasetfile_path.format(split="train")
+    )
+    assert len(ColumnarEpisodes.load(columnar_path)) == 5 * 7
+    columnar_config = _synthetic_dataset_config(
+        str(tmp_path / "missing" / "{split}.json.gz"), content_scenes
+    )
+    # The JSON files are no longer needed
+    os.remove(datasetfile_path.format(split="train"))
+    assert PointNavDatasetV1.check_config_paths_exist(json_config)
+    assert PointNavDatasetV1.get_scenes_to_load(json_config) == json_scenes
+    assert not PointNavDatasetV1.check_config_paths_exist(columnar_config)
+
+    columnar_dataset = PointNavDatasetV1(json_config)
+    assert len(columnar_dataset.episodes) == 2 * 7
+    assert sorted(map(_episode_key, columnar_dataset.episodes)) == sorted(
+        map(_episode_key, json_dataset.episodes)
+    )
+    assert {
+        PointNavDatasetV1.scene_from_scene_path(scene_id)
+        for scene_id in columnar_dataset.scene_ids
+    } == set(content_scenes)
+
+    json_episodes = {_episode_key(ep): ep for ep in json_dataset.episodes}
+    for episode in columnar_dataset.episodes:
+        json_episode = json_episodes[_episode_key(episode)]
+        assert type(episode) == type(json_episode)
+        assert episode.info == json_episode.info
+        assert episode.shortest_paths is None
+        assert np.allclose(episode.start_position, json_episode.start_position)
+        assert np.allclose(episode.start_rotation, json_episode.start_rotation)
+        assert len(episode.goals) == len(json_episode.goals)
+        for goal, json_goal in zip(episode.goals, json_episode.goals):
+            assert type(goal) == type(json_goal)
+            assert np.allclose(goal.position, json_goal.position)
+            if json_goal.radius is None:
+                assert goal.radius is None
+            else:
+                assert goal.radius == pytest.approx(json_goal.radius)
+
+    all_scenes_dataset = PointNavDatasetV1(
+        _synthetic_dataset_config(datasetfile_path, ["*"])
+    )
+    assert len(all_scenes_dataset.episodes) == 5 * 7
+
+
+def test_columnar_scene_rows(tmp_path):
+    episodes = [
+        {
+            "episode_id": str(i),
+            "scene_id": f"data/scene_datasets/scene{scene}.glb",
+            "start_position": [0.0, 0.0, 0.0],
+            "start_rotation": [0.0, 0.0, 0.0, 1.0],
+        }
+        for i, scene in enumerate([1, 0, 1, 2, 0])
+    ]
+    # Scenes with non-contiguous rows are found by a scan
+    unsorted = ColumnarEpisodes.from_episodes(episodes)
+    assert unsorted.scene_rows("scene1").tolist() == [0, 2]
+    assert unsorted.scene_rows("scene0").tolist() == [1, 4]
+
+    # Otherwise by their row ranges
+    sorted_episodes = ColumnarEpisodes.from_episodes(
+        episodes, sort_by_scene=True
+    )
+    sorted_episodes.save(str(tmp_path / "train.columnar"))
+    for columnar in [
+        sorted_episodes,
+        ColumnarEpisodes.load(str(tmp_path / "train.columnar")),
+    ]:
+        assert columnar._scene_ranges is not None
+        assert columnar.scene_rows("scene0").tolist() == [0, 1]
+        assert columnar.scene_rows("scene1").tolist() == [2, 3]
+        assert columnar.scene_rows("scene2").tolist() == [4]
+        assert columnar.scene_rows("scene3").tolist() == []
+        assert [
+            episode["episode_id"]
+            for episode in columnar.scene_episodes("scene1")
+        ] == ["0", "2"]
+
+
+def _renumbered_dataset_episode(dataset_type, scene_index, episode_index):
+    episode = {
+        "episode_id": "unused",
+        "start_position": [float(episode_index), 0.0, float(scene_index)],
+        "start_rotation": [0.0, 0.0, 0.0, 1.0],
+        "info": {"index": episode_index},
+    }
+    if dataset_type == "ObjectNav-v1":
+        return {
+            **episode,
+            "scene_id": f"synthetic/scene{scene_index:03d}.glb",
+            "object_category": "chair",
+            "goals": [],
+        }
+    return {
+        **episode,
+        "scene_id": f"data/replica_cad/stages/scene{scene_index:03d}.glb",
+        "art_objs": [],
+        "static_objs": [],
+        "targets": [],
+        "fixed_base": True,
+        "art_states": [],
+        "nav_mesh_path": "",
+        "scene_config_path": "",
+    }
+
+
+@pytest.mark.parametrize(
+    "dataset_type", ["ObjectNav-v1", "RearrangeDataset-v0"]
+)
+def test_columnar_dataset_episode_ids(tmp_path, monkeypatch, dataset_type):
+    # Both datasets number their episodes by their position in the file
+    from habitat.datasets.rearrange import rearrange_dataset
+
+    monkeypatch.setattr(
+        rearrange_dataset, "check_and_gen_physics_config", lambda: None
+    )
+    episodes = [
+        _renumbered_dataset_episode(dataset_type, i % 3, i // 3)
+        for i in range(12)
+    ]
+    random.Random(0).shuffle(episodes)
+    datasetfile_path = str(tmp_path / "{split}" / "{split}.json.gz")
+    os.makedirs(str(tmp_path / "train"))
+    with gzip.open(datasetfile_path.format(split="train"), "wt") as f:
+        json.dump(
+            {
+                "episodes": episodes,
+                "category_to_task_category_id": {"chair": 0},
+                "category_to_mp3d_category_id": {"chair": 3},
+                "goals_by_category": {
+                    f"scene{i:03d}.glb_chair": [] for i in range(3)
+                },
+            },
+            f,
+        )
+
+    def load(content_scenes):
+        config = _synthetic_dataset_config(datasetfile_path, content_scenes)
+        config.defrost()
+        config.TYPE = dataset_type
+        config.SCENES_DIR = str(tmp_path)
+        config.freeze()
+        return {
+            (
+                PointNavDatasetV1.scene_from_scene_path(episode.scene_id),
+                episode.episode_id,
+                episode.info["index"],
+            )
+            for episode in make_dataset(dataset_type, config=config).episodes
+        }
+
+    content_scenes = [["*"], ["scene002", "scene000"]]
+    json_ids = [load(scenes) for scenes in content_scenes]
+    assert len({episode_id for _, episode_id, _ in json_ids[0]}) == 12
+
+    convert_dataset_to_columnar(datasetfile_path.format(split="train"))
+    os.remove(datasetfile_path.format(split="train"))
+    assert [load(scenes) for scenes in content_scenes] == json_ids
+
+
+@pytest.mark.parametrize("per_scene_files", [False, True])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_lazy_episodes(tmp_path, per_scene_files, columnar):
+    datasetfile_path = _write_synthetic_dataset(
+        str(tmp_path),
+        num_scenes=4,
+        episodes_per_scene=6,
+        per_scene_files=per_scene_files,
+    )
+    if columnar:
+        convert_dataset_to_columnar(datasetfile_path.format(split="train"))
+
+    for content_scenes in [["*"], ["scene002", "scene000"]]:
+        dataset = PointNavDatasetV1(
+            _synthetic_dataset_config(datasetfile_path, content_scenes)
+        )
+        lazy_dataset = PointNavDatasetV1(
+            _synthetic_dataset_config(
+                datasetfile_path, content_scenes, lazy_episodes=True
+            )
+        )
+        assert isinstance(lazy_dataset.episodes, LazyEpisodeStore)
+        assert lazy_dataset.scene_ids == dataset.scene_ids
+
+        # Episodes are kept in the same order
+        assert len(lazy_dataset.episodes) == len(dataset.episodes)
+        for episode, lazy_episode in zip(
+            dataset.episodes, pickle.loads(pickle.dumps(lazy_dataset)).episodes
+        ):
+            assert isinstance(lazy_episode, NavigationEpisode)
+            assert _episode_key(lazy_episode) == _episode_key(episode)
+            assert lazy_episode.info == episode.info
+            assert np.allclose(
+                lazy_episode.start_position, episode.start_position
+            )
+            assert np.allclose(
+                lazy_episode.goals[-1].position, episode.goals[-1].position
+            )
+
+
+def test_shared_columnar_dataset(tmp_path):
+    datasetfile_path = _write_synthetic_dataset(
+        str(tmp_path / "data"),
+        num_scenes=4,
+        episodes_per_scene=5,
+        per_scene_files=True,
+    )
+    shared_dir = str(tmp_path / "shm")
+    shared_path = share_columnar_dataset(
+        datasetfile_path.format(split="train"), shared_dir
+    )
+    assert os.path.dirname(shared_path) == shared_dir
+    index_mtime = os.path.getmtime(os.path.join(shared_path, "index.json"))
+    # The conversion is reused
+    assert (
+        share_columnar_dataset(
+            datasetfile_path.format(split="train"), shared_dir
+        )
+        == shared_path
+    )
+    assert index_mtime == os.path.getmtime(
+        os.path.join(shared_path, "index.json")
+    )
+
+    # Every environment reads the episodes of its own scenes
+    for content_scenes in [["scene000", "scene002"], ["scene003"]]:
+        dataset = PointNavDatasetV1(
+            _synthetic_dataset_config(datasetfile_path, content_scenes)
+        )
+        config = _synthetic_dataset_config(
+            datasetfile_path, content_scenes, lazy_episodes=True
+        )
+        config.defrost()
+        config.COLUMNAR_PATH = shared_path
+        config.freeze()
+        shared_dataset = PointNavDatasetV1(config)
+        assert isinstance(shared_dataset.episodes, LazyEpisodeStore)
+        assert list(map(_episode_key, shared_dataset.episodes)) == list(
+            map(_episode_key, dataset.episodes)
+        )
+        assert (
+            PointNavDatasetV1.get_scenes_to_load(config)
+            == ColumnarEpisodes.load(shared_path).scenes
+        )
+
+    # The dataset is converted again when its content files change, the
+    # content directory is given by the content_scenes_path of the dataset
+    content_dir = os.path.join(
+        os.path.dirname(datasetfile_path.format(split="train")), "content"
+    )
+    other_content_scenes_path = "{data_path}/other/{scene}.json.gz"
+    other_path = share_columnar_dataset(
+        datasetfile_path.format(split="train"),
+        shared_dir,
+        other_content_scenes_path,
+    )
+    content_mtime = os.path.getmtime(content_dir) + 10
+    os.utime(content_dir, (content_mtime, content_mtime))
+    assert (
+        share_columnar_dataset(
+            datasetfile_path.format(split="train"), shared_dir
+        )
+        != shared_path
+    )
+    assert (
+        share_columnar_dataset(
+            datasetfile_path.format(split="train"),
+            shared_dir,
+            other_content_scenes_path,
+        )
+        == other_path
+    )
+
+    # A columnar dataset next to the JSON one needs no copy
+    columnar_path = convert_dataset_to_columnar(
+        datasetfile_path.format(split="train")
+    )
+    assert columnar_path == columnar_dataset_path(
+        datasetfile_path.format(split="train")
+    )
+    assert (
+        share_columnar_dataset(
+            datasetfile_path.format(split="train"), shared_dir
+        )
+        == columnar_path
+    )
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_parallel_loading(tmp_path, pool):
+    datasetfile_path = _write_synthetic_dataset(
+        str(tmp_path),
+        num_scenes=6,
+        episodes_per_scene=4,
+        per_scene_files=True,
+    )
+    content_dir = os.path.join(str(tmp_path), "train", "content")
+    scenes = [f"scene{i:03d}" for i in [4, 0, 5, 2, 1, 3]]
+    # The files come back in order
+    assert [
+        PointNavDatasetV1.scene_from_scene_path(
+            content["episodes"][0]["scene_id"]
+        )
+        for content in read_json_files(
+            [os.path.join(content_dir, f"{s}.json.gz") for s in scenes],
+            num_workers=2,
+            pool=pool,
+        )
+    ] == scenes
+
+    for content_scenes in [["*"], ["scene004", "scene001"]]:
+        dataset = PointNavDatasetV1(
+            _synthetic_dataset_config(datasetfile_path, content_scenes)
+        )
+        config = _synthetic_dataset_config(datasetfile_path, content_scenes)
+        config.defrost()
+        config.NUM_LOADER_WORKERS = 2
+        config.LOADER_POOL = pool
+        config.freeze()
+        parallel_dataset = PointNavDatasetV1(config)
+        assert list(map(_episode_key, parallel_dataset.episodes)) == list(
+            map(_episode_key, dataset.episodes)
+        )
+
+    # Documents that orjson rejects are parsed with json
+    assert np.isnan(json_loads('{"x": NaN}')["x"])
+
+
+def test_dataset_cache(tmp_path, monkeypatch):
+    datasetfile_path = _write_synthetic_dataset(
+        str(tmp_path / "data"),
+        num_scenes=3,
+        episodes_per_scene=4,
+        per_scene_files=True,
+    )
+    cache_dir = tmp_path / "cache"
+
+    def cached_config(content_scenes, lazy_episodes=False):
+        config = _synthetic_dataset_config(
+            datasetfile_path, content_scenes, lazy_episodes
+        )
+        config.defrost()
+        config.CACHE_DIR = str(cache_dir)
+        config.freeze()
+        return config
+
+    dataset = make_dataset("PointNav-v1", config=cached_config(["*"]))
+    assert len(os.listdir(cache_dir)) == 1
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("The dataset should come from the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(PointNavDatasetV1, "_load_deserialized", no_parsing)
+        cached_dataset = make_dataset(
+            "PointNav-v1", config=cached_config(["*"])
+        )
+    assert isinstance(cached_dataset, PointNavDatasetV1)
+    assert list(map(_episode_key, cached_dataset.episodes)) == list(
+        map(_episode_key, dataset.episodes)
+    )
+    assert cached_dataset.episodes[0].goals[0].position == (
+        dataset.episodes[0].goals[0].position
+    )
+
+    # Other scenes or updated files are new entries
+    make_dataset("PointNav-v1", config=cached_config(["scene001"]))
+    assert len(os.listdir(cache_dir)) == 2
+    scene_file = os.path.join(
+        str(tmp_path / "data"), "train", "content", "scene002.json.gz"
+    )
+    os.utime(scene_file, (0, os.path.getmtime(scene_file) + 10))
+    make_dataset("PointNav-v1", config=cached_config(["*"]))
+    assert len(os.listdir(cache_dir)) == 3
+    # Lazy episodes aren't cached
+    make_dataset("PointNav-v1", config=cached_config(["*"], True))
+    assert len(os.listdir(cache_dir)) == 3
+
+    # A split file in the working directory is the only file of its entry
+    monkeypatch.chdir(os.path.dirname(datasetfile_path.format(split="train")))
+    config = cached_config(["*"])
+    config.defrost()
+    config.DATA_PATH = os.path.basename(datasetfile_path)
+    config.freeze()
+    assert _dataset_files(config) == [config.DATA_PATH.format(split="train")]
+
+    # Arrays are stored out-of-band and stay writable
+    path = str(tmp_path / "arrays.pkl")
+    save_dataset({"array": np.arange(6.0).reshape(2, 3)}, path)
+    array = load_dataset(path)["array"]
+    assert np.array_equal(array, np.arange(6.0).reshape(2, 3))
+    array[0, 0] = 1.0
+
+
 def check_shortest_path(env, episode):
     def check_state(agent_state, position, rotation):
         assert (
@@ -230,3 +738,227 @@ def test_pointnav_episode_generator():
         assert (
             dataset.to_json()
         ), "Generated episodes aren't json serializable."
+
+
+class _FakePathfinderSim:
+    r"""Stands in for a simulator in an empty scene without obstacles."""
+
+    def __init__(self, scene_path):
+        self.habitat_config = habitat.Config({"SCENE": scene_path})
+
+    def seed(self, seed):
+        pass
+
+    def sample_navigable_point(self):
+        return [np.random.uniform(-5, 5), 0.0, np.random.uniform(-5, 5)]
+
+    def island_radius(self, position):
+        return 2.0
+
+    def geodesic_distance(self, position_a, position_b):
+        return 1.2 * float(
+            np.linalg.norm(np.array(position_a) - np.array(position_b[0]))
+        )
+
+    def close(self):
+        pass
+
+
+def _generate_sharded_dataset(data_dir, num_workers=1):
+    scenes_dir = os.path.join(data_dir, "scene_datasets")
+    datasetfile_path = os.path.join(data_dir, "train", "train.json.gz")
+    generate_pointnav_dataset(
+        [os.path.join(scenes_dir, f"scene{i}.glb") for i in range(3)],
+        datasetfile_path,
+        25,
+        num_workers=num_workers,
+        chunk_size=10,
+        scenes_dir=scenes_dir,
+        make_sim_fn=_FakePathfinderSim,
+        is_gen_shortest_path=False,
+    )
+    return datasetfile_path
+
+
+def _read_scene_episodes(datasetfile_path, scene):
+    content_dir = os.path.join(os.path.dirname(datasetfile_path), "content")
+    with gzip.open(os.path.join(content_dir, f"{scene}.json.gz"), "rt") as f:
+        return json.load(f)["episodes"]
+
+
+def test_sharded_pointnav_generation(tmp_path):
+    datasetfile_path = _generate_sharded_dataset(
+        str(tmp_path / "parallel"), num_workers=2
+    )
+    content_dir = os.path.join(os.path.dirname(datasetfile_path), "content")
+    assert sorted(os.listdir(content_dir)) == [
+        f"scene{i}.json.gz" for i in range(3)
+    ]
+    episodes = _read_scene_episodes(datasetfile_path, "scene1")
+    assert [ep["episode_id"] for ep in episodes] == [str(i) for i in range(25)]
+    assert {ep["scene_id"] for ep in episodes} == {"scene1.glb"}
+    # Scenes don't share their random streams
+    assert episodes != _read_scene_episodes(datasetfile_path, "scene0")
+
+    # The dataset doesn't depend on the number of workers
+    serial_path = _generate_sharded_dataset(str(tmp_path / "serial"))
+    for i in range(3):
+        assert _read_scene_episodes(
+            serial_path, f"scene{i}"
+        ) == _read_scene_episodes(datasetfile_path, f"scene{i}")
+
+    # Interrupted after the first chunk of scene1
+    parts_dir = os.path.join(content_dir, "scene1.parts")
+    os.makedirs(parts_dir)
+    first_chunk = {"episodes": episodes[:10]}
+    with gzip.open(os.path.join(parts_dir, "000000.json.gz"), "wt") as f:
+        json.dump(first_chunk, f)
+    os.remove(os.path.join(content_dir, "scene1.json.gz"))
+    _generate_sharded_dataset(str(tmp_path / "parallel"))
+    assert not os.path.exists(parts_dir)
+    assert _read_scene_episodes(datasetfile_path, "scene1") == episodes
+
+    dataset = PointNavDatasetV1(
+        _synthetic_dataset_config(datasetfile_path, ["*"])
+    )
+    assert len(dataset.episodes) == 3 * 25
+    assert [
+        PointNavDatasetV1.scene_from_scene_path(scene_id)
+        for scene_id in dataset.scene_ids
+    ] == [f"scene{i}" for i in range(3)]
+
+
+def test_is_compatible_episode_skips_far_pairs():
+    sim = _FakePathfinderSim("scene.glb")
+    geodesic_queries = []
+
+    def geodesic_distance(position_a, position_b):
+        geodesic_queries.append(position_a)
+        return _FakePathfinderSim.geodesic_distance(
+            sim, position_a, position_b
+        )
+
+    sim.geodesic_distance = geodesic_distance
+    kwargs = dict(near_dist=1, far_dist=6, geodesic_to_euclid_ratio=1.1)
+    # Further apart than far_dist, the geodesic distance isn't queried
+    assert pointnav_generator.is_compatible_episode(
+        [0.0, 0.0, 0.0], [10.0, 0.0, 0.0], sim, **kwargs
+    ) == (False, 0)
+    assert geodesic_queries == []
+    pointnav_generator.is_compatible_episode(
+        [0.0, 0.0, 0.0], [3.0, 0.0, 0.0], sim, **kwargs
+    )
+    assert len(geodesic_queries) == 1
+
+
+def test_generate_pointnav_episode_samples_lazily():
+    sim = _FakePathfinderSim("scene.glb")
+    num_samples = 0
+
+    def sample_navigable_point():
+        nonlocal num_samples
+        num_samples += 1
+        return _FakePathfinderSim.sample_navigable_point(sim)
+
+    sim.sample_navigable_point = sample_navigable_point
+    np.random.seed(0)
+    episodes = list(
+        pointnav_generator.generate_pointnav_episode(
+            sim,
+            num_episodes=5,
+            is_gen_shortest_path=False,
+            closest_dist_limit=0,
+        )
+    )
+    # Every source is compatible, so one is sampled per target
+    assert len(episodes) == 5
+    assert num_samples == 2 * len(episodes)
+
+
+def _random_walk(num_steps, seed=0):
+    rng = np.random.RandomState(seed)
+    position = rng.uniform(-50, 50, 3)
+    points = []
+    for _ in range(num_steps):
+        angle = rng.uniform(0, 2 * np.pi)
+        points.append(
+            ShortestPathPoint(
+                position.tolist(),
+                [0.0, np.sin(angle / 2), 0.0, np.cos(angle / 2)],
+                int(rng.randint(1, 4)),
+            )
+        )
+        position = position + [0.25 * np.cos(angle), 0, 0.25 * np.sin(angle)]
+    return points
+
+
+def test_compact_shortest_path():
+    points = _random_walk(500)
+    path = CompactShortestPath.from_points(points)
+    assert len(path) == len(points)
+    assert path.actions.tolist() == [p.action for p in points]
+    # The rounding errors don't add up along the path
+    for decoded, point in zip(path, points):
+        assert decoded.action == point.action
+        assert np.allclose(decoded.position, point.position, atol=2e-3)
+        assert np.allclose(decoded.rotation, point.rotation, atol=1e-3)
+    assert path[-2:] == list(path)[-2:]
+
+    serialized = json.dumps(path.to_json())
+    assert len(serialized) < len(json.dumps([attr.asdict(p) for p in points]))
+    for other in [
+        CompactShortestPath.from_json(json.loads(serialized)),
+        pickle.loads(pickle.dumps(path)),
+    ]:
+        assert list(other) == list(path)
+
+    actions_only = CompactShortestPath.from_points(
+        [ShortestPathPoint(None, None, None), ShortestPathPoint(None, None, 2)]
+    )
+    assert actions_only.to_json().keys() == {"actions"}
+    assert [p.action for p in actions_only] == [None, 2]
+
+
+def test_compact_dataset(tmp_path):
+    datasetfile_path = _write_synthetic_dataset(
+        str(tmp_path), 3, 4, per_scene_files=True
+    )
+    content_dir = os.path.join(
+        os.path.dirname(datasetfile_path.format(split="train")), "content"
+    )
+    paths = {}
+    for scene_file in os.listdir(content_dir):
+        scene_file = os.path.join(content_dir, scene_file)
+        with gzip.open(scene_file, "rt") as f:
+            deserialized = json.load(f)
+        for i, episode in enumerate(deserialized["episodes"]):
+            points = _random_walk(20 + i, seed=i)
+            episode["shortest_paths"] = [[attr.asdict(p) for p in points]]
+            scene = PointNavDatasetV1.scene_from_scene_path(
+                episode["scene_id"]
+            )
+            paths[(scene, episode["episode_id"])] = points
+        with gzip.open(scene_file, "wt") as f:
+            json.dump(deserialized, f)
+
+    assert compact_dataset(datasetfile_path.format(split="train")) == 12
+    dataset = PointNavDatasetV1(
+        _synthetic_dataset_config(datasetfile_path, ["*"])
+    )
+    assert len(dataset.episodes) == 12
+    for episode in dataset.episodes:
+        (path,) = episode.shortest_paths
+        assert isinstance(path, CompactShortestPath)
+        points = paths[
+            (
+                PointNavDatasetV1.scene_from_scene_path(episode.scene_id),
+                episode.episode_id,
+            )
+        ]
+        assert [p.action for p in path] == [p.action for p in points]
+        assert np.allclose(
+            [p.position for p in path], [p.position for p in points], atol=2e-3
+        )
+
+    # Compacting again leaves the dataset as it is
+    assert compact_dataset(datasetfile_path.format(split="train")) == 12
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+from gym import spaces
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from habitat_baselines.agents import ppo_agents
+    from habitat_baselines.rl.ddppo.policy import PointNavResNetPolicy
+    from habitat_baselines.rl.ddppo.policy.export import (
+        ExportedPolicy,
+        export_policy,
+        fuse_conv_bn,
+    )
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+GOAL_SENSOR_UUID = "pointgoal_with_gps_compass"
+RESOLUTION = 64
+
+
+def _make_policy(observation_space):
+    torch.manual_seed(0)
+    policy = PointNavResNetPolicy(
+        observation_space=observation_space,
+        action_space=spaces.Discrete(4),
+        hidden_size=64,
+        normalize_visual_inputs=True,
+    )
+    # Non-trivial normalization statistics
+    rmv = policy.net.visual_encoder.running_mean_and_var
+    rmv._mean.uniform_(0.0, 1.0)
+    rmv._var.uniform_(0.5, 2.0)
+    rmv._count.fill_(10)
+    return policy.eval()
+
+
+def _random_batch(observation_space, batch_size, rng):
+    batch = {}
+    for name, space in observation_space.spaces.items():
+        if space.dtype == np.uint8:
+            value = rng.randint(0, 256, size=(batch_size, *space.shape))
+        else:
+            value = rng.uniform(0.0, 1.0, size=(batch_size, *space.shape))
+        batch[name] = torch.from_numpy(value.astype(space.dtype))
+    return batch
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("input_type", ["blind", "depth", "rgbd"])
+def test_exported_policy_matches_eager(input_type, tmp_path):
+    agent_config = ppo_agents.get_default_config()
+    agent_config.INPUT_TYPE = input_type
+    agent_config.RESOLUTION = RESOLUTION
+    agent_config.MODEL_PATH = ""
+    agent_config.PTH_GPU_ID = 0
+    agent = ppo_agents.PPOAgent(agent_config)
+
+    observation_space = agent.observation_space
+    policy = _make_policy(observation_space)
+    export_path = str(tmp_path / "policy.pt")
+    export_policy(policy, observation_space, export_path)
+    exported = ExportedPolicy(export_path)
+
+    rng = np.random.RandomState(0)
+    for batch_size in [1, 3]:
+        batch = _random_batch(observation_space, batch_size, rng)
+        rnn_hidden_states = torch.randn(
+            batch_size, policy.net.num_recurrent_layers, 64
+        )
+        prev_actions = torch.randint(0, 4, (batch_size, 1))
+        masks = torch.tensor([[True], [False], [True]][:batch_size])
+
+        with torch.no_grad():
+            value, action, _, hidden = policy.act(
+                batch,
+                rnn_hidden_states,
+                prev_actions,
+                masks,
+                deterministic=True,
+            )
+            (
+                exported_value,
+                exported_action,
+                _,
+                exported_hidden,
+            ) = exported.act(
+                batch,
+                rnn_hidden_states,
+                prev_actions,
+                masks,
+                deterministic=True,
+            )
+
+        assert torch.allclose(value, exported_value, atol=1e-4)
+        assert torch.equal(action, exported_action)
+        assert torch.allclose(hidden, exported_hidden, atol=1e-4)
+
+    # The artifact can be used for evaluation by the PPOAgent
+    agent_config.MODEL_PATH = export_path
+    agent_config.MODEL_FORMAT = "torchscript"
+    agent = ppo_agents.PPOAgent(agent_config)
+    agent.reset()
+    observations = {
+        k: v[0].numpy()
+        for k, v in _random_batch(observation_space, 1, rng).items()
+    }
+    assert 0 <= agent.act(observations)["action"] < 4
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_fuse_conv_bn():
+    torch.manual_seed(0)
+    module = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, 3, padding=1),
+        torch.nn.BatchNorm2d(8),
+        torch.nn.ReLU(),
+        torch.nn.Sequential(
+            torch.nn.Conv2d(8, 8, 3, bias=False), torch.nn.BatchNorm2d(8)
+        ),
+        torch.nn.GroupNorm(2, 8),
+    )
+    for bn in [module[1], module[3][1]]:
+        bn.running_mean.uniform_(-1.0, 1.0)
+        bn.running_var.uniform_(0.5, 2.0)
+    module.eval()
+
+    x = torch.randn(2, 3, 16, 16)
+    with torch.no_grad():
+        expected = module(x)
+        assert fuse_conv_bn(module) == 2
+        assert torch.allclose(module(x), expected, atol=1e-5)
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("input_type", ["rgb", "depth", "rgbd"])
+def test_channels_last_encoder(input_type):
+    from torch.nn import functional as F
+
+    from habitat_baselines.rl.ddppo.policy import resnet
+    from habitat_baselines.rl.ddppo.policy.resnet_policy import ResNetEncoder
+
+    agent_config = ppo_agents.get_default_config()
+    agent_config.INPUT_TYPE = input_type
+    agent_config.RESOLUTION = RESOLUTION
+    agent_config.MODEL_PATH = ""
+    observation_space = ppo_agents.PPOAgent(agent_config).observation_space
+    visual_space = spaces.Dict(
+        {
+            k: v
+            for k, v in observation_space.spaces.items()
+            if k in ("rgb", "depth")
+        }
+    )
+
+    encoders = []
+    for channels_last in [False, True]:
+        torch.manual_seed(0)
+        encoders.append(
+            ResNetEncoder(
+                visual_space,
+                baseplanes=16,
+                ngroups=8,
+                make_backbone=resnet.resnet18,
+                normalize_visual_inputs=True,
+                channels_last=channels_last,
+            ).eval()
+        )
+    encoder, channels_last_encoder = encoders
+
+    batch = _random_batch(observation_space, 2, np.random.RandomState(0))
+
+    # Reference preprocessing: permute every sensor, normalize, then pool
+    cnn_input = []
+    if "rgb" in batch:
+        cnn_input.append(batch["rgb"].permute(0, 3, 1, 2).float() / 255.0)
+    if "depth" in batch:
+        cnn_input.append(batch["depth"].permute(0, 3, 1, 2))
+    expected_input = F.avg_pool2d(torch.cat(cnn_input, dim=1), 2)
+
+    with torch.no_grad():
+        assert torch.allclose(
+            encoder._preprocess(batch), expected_input, atol=1e-6
+        )
+        channels_last_input = channels_last_encoder._preprocess(batch)
+        assert channels_last_input.is_contiguous(
+            memory_format=torch.channels_last
+        )
+        assert torch.allclose(channels_last_input, expected_input, atol=1e-6)
+
+        assert torch.allclose(
+            encoder(batch), channels_last_encoder(batch), atol=1e-4
+        )
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+from gym import spaces
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from habitat_baselines.agents import ppo_agents
+    from habitat_baselines.rl.ddppo.policy import PointNavResNetPolicy
+    from habitat_baselines.rl.ddppo.policy.export import (
+        ExportedPolicy,
+        export_policy,
+    )
+    from habitat_baselines.rl.ddppo.policy.quantization import (
+        load_calibration_batches,
+        quantize_policy,
+        save_calibration_observations,
+    )
+    from habitat_baselines.rl.ppo import PointNavBaselinePolicy
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+RESOLUTION = 64
+
+
+def _observation_space(input_type):
+    agent_config = ppo_agents.get_default_config()
+    agent_config.INPUT_TYPE = input_type
+    agent_config.RESOLUTION = RESOLUTION
+    agent_config.MODEL_PATH = ""
+    agent_config.PTH_GPU_ID = -1
+    return ppo_agents.PPOAgent(agent_config).observation_space
+
+
+def _random_batch(observation_space, batch_size, rng):
+    batch = {}
+    for name, space in observation_space.spaces.items():
+        if space.dtype == np.uint8:
+            value = rng.randint(0, 256, size=(batch_size, *space.shape))
+        else:
+            value = rng.uniform(0.0, 1.0, size=(batch_size, *space.shape))
+        batch[name] = torch.from_numpy(value.astype(space.dtype))
+    return batch
+
+
+def _act(policy, batch, num_recurrent_layers=1, hidden_size=64):
+    batch_size = len(next(iter(batch.values())))
+    with torch.no_grad():
+        value, action, _, hidden = policy.act(
+            batch,
+            torch.zeros(batch_size, num_recurrent_layers, hidden_size),
+            torch.zeros(batch_size, 1, dtype=torch.long),
+            torch.ones(batch_size, 1, dtype=torch.bool),
+            deterministic=True,
+        )
+    return value, action, hidden
+
+
+def _value_and_logits(policy, batch, num_recurrent_layers=1, hidden_size=64):
+    batch_size = len(next(iter(batch.values())))
+    with torch.no_grad():
+        features, _ = policy.net(
+            batch,
+            torch.zeros(batch_size, num_recurrent_layers, hidden_size),
+            torch.zeros(batch_size, 1, dtype=torch.long),
+            torch.ones(batch_size, 1, dtype=torch.bool),
+        )
+        return (
+            policy.critic(features),
+            policy.action_distribution(features).logits,
+        )
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("mode", ["dynamic", "static"])
+@pytest.mark.parametrize(
+    "policy_type,input_type",
+    [
+        ("resnet", "blind"),
+        ("resnet", "rgbd"),
+        ("baseline", "depth"),
+        ("baseline", "rgb"),
+    ],
+)
+def test_quantized_policy(mode, policy_type, input_type, tmp_path):
+    observation_space = _observation_space(input_type)
+    torch.manual_seed(0)
+    if policy_type == "resnet":
+        policy = PointNavResNetPolicy(
+            observation_space=observation_space,
+            action_space=spaces.Discrete(4),
+            hidden_size=64,
+            normalize_visual_inputs="rgb" in observation_space.spaces,
+        )
+    else:
+        policy = PointNavBaselinePolicy(
+            observation_space, spaces.Discrete(4), hidden_size=64
+        )
+    policy.eval()
+
+    rng = np.random.RandomState(0)
+    calibration_path = str(tmp_path / "calibration.pth")
+    # Observations in the [STEPS x ENVS] layout of the rollouts
+    save_calibration_observations(
+        {
+            k: v.view(4, 3, *v.shape[1:])
+            for k, v in _random_batch(observation_space, 12, rng).items()
+        },
+        calibration_path,
+    )
+    assert [
+        len(batch["pointgoal_with_gps_compass"])
+        for batch in load_calibration_batches(calibration_path, batch_size=5)
+    ] == [5, 5, 2]
+
+    quantized = quantize_policy(policy, mode, calibration_path)
+    assert quantized is not policy
+    assert not any(
+        isinstance(m, torch.nn.Linear) for m in quantized.modules()
+    ), "All the linear layers should be quantized"
+    if mode == "static" and input_type != "blind":
+        assert any(
+            isinstance(m, torch.nn.quantized.Conv2d)
+            for m in quantized.modules()
+        )
+    # The original policy is left untouched
+    assert any(isinstance(m, torch.nn.Linear) for m in policy.modules())
+
+    # The quantized policy stays close to the fp32 one on the calibration
+    # observations
+    num_recurrent_layers = policy.net.num_recurrent_layers
+    (calibration_batch,) = load_calibration_batches(
+        calibration_path, batch_size=12
+    )
+    value, logits = _value_and_logits(
+        policy, calibration_batch, num_recurrent_layers
+    )
+    quantized_value, quantized_logits = _value_and_logits(
+        quantized, calibration_batch, num_recurrent_layers
+    )
+    assert (quantized_value - value).abs().max() < 0.05
+    assert (quantized_logits - logits).abs().max() < 5e-3
+
+    batch = _random_batch(observation_space, 3, rng)
+    value, action, hidden = _act(policy, batch, num_recurrent_layers)
+    quantized_value, quantized_action, quantized_hidden = _act(
+        quantized, batch, num_recurrent_layers
+    )
+    assert quantized_value.shape == value.shape
+    assert quantized_hidden.shape == hidden.shape
+    assert ((0 <= quantized_action) & (quantized_action < 4)).all()
+
+    if policy_type == "resnet":
+        # Quantized policies can be exported too
+        export_path = str(tmp_path / "policy.pt")
+        export_policy(quantized, observation_space, export_path)
+        exported_value, exported_action, _ = _act(
+            ExportedPolicy(export_path), batch, num_recurrent_layers
+        )
+        assert torch.allclose(quantized_value, exported_value, atol=1e-4)
+        assert torch.equal(quantized_action, exported_action)
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_quantized_ppo_agent():
+    agent_config = ppo_agents.get_default_config()
+    agent_config.INPUT_TYPE = "rgbd"
+    agent_config.RESOLUTION = RESOLUTION
+    agent_config.MODEL_PATH = ""
+    agent_config.QUANTIZATION = "dynamic"
+    agent = ppo_agents.PPOAgent(agent_config)
+    assert agent.device == torch.device("cpu")
+
+    agent.reset()
+    rng = np.random.RandomState(0)
+    for _ in range(3):
+        observations = {
+            k: v[0].numpy()
+            for k, v in _random_batch(agent.observation_space, 1, rng).items()
+        }
+        assert 0 <= agent.act(observations)["action"] < 4
+
+    # TorchScript artifacts are already traced, only checkpoints can be
+    # quantized
+    agent_config.MODEL_FORMAT = "torchscript"
+    with pytest.raises(AssertionError):
+        ppo_agents.PPOAgent(agent_config)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import threading
+
+import numpy as np
+import pytest
+from gym import spaces
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from habitat_baselines.rl.ppo import PointNavBaselinePolicy, PolicyServer
+    from habitat_baselines.utils.common import (
+        ObservationBatchingCache,
+        batch_obs,
+    )
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+GOAL_SENSOR_UUID = "pointgoal_with_gps_compass"
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("max_batch_size", [1, 2, None])
+def test_policy_server_matches_direct_act(max_batch_size):
+    num_clients, num_steps, hidden_size = 4, 6, 32
+    observation_space = spaces.Dict(
+        {
+            GOAL_SENSOR_UUID: spaces.Box(
+                low=-100.0, high=100.0, shape=(2,), dtype=np.float32
+            )
+        }
+    )
+    torch.manual_seed(0)
+    policy = PointNavBaselinePolicy(
+        observation_space, spaces.Discrete(4), hidden_size=hidden_size
+    )
+    policy.eval()
+
+    rng = np.random.RandomState(0)
+    observations = rng.uniform(
+        -5.0, 5.0, size=(num_clients, num_steps, 2)
+    ).astype(np.float32)
+
+    # Reference: every client runs the policy on its own
+    expected_actions = np.zeros((num_clients, num_steps), dtype=np.int64)
+    for client_id in range(num_clients):
+        rnn_hidden_states = torch.zeros(
+            1, policy.net.num_recurrent_layers, hidden_size
+        )
+        prev_actions = torch.zeros(1, 1, dtype=torch.long)
+        for step in range(num_steps):
+            with torch.no_grad():
+                _, actions, _, rnn_hidden_states = policy.act(
+                    {
+                        GOAL_SENSOR_UUID: torch.from_numpy(
+                            observations[client_id, step][None]
+                        )
+                    },
+                    rnn_hidden_states,
+                    prev_actions,
+                    torch.tensor([[step > 0]], dtype=torch.bool),
+                    deterministic=True,
+                )
+            prev_actions = actions
+            expected_actions[client_id, step] = actions.item()
+
+    served_actions = np.zeros_like(expected_actions)
+    with PolicyServer(
+        policy,
+        num_clients=num_clients,
+        hidden_size=hidden_size,
+        device=torch.device("cpu"),
+        max_batch_size=max_batch_size,
+        max_latency=0.01,
+        deterministic=True,
+        multiprocessing_start_method="fork",
+    ) as server:
+        server.start()
+
+        def _run_client(client):
+            for step in range(num_steps):
+                action = client.act(
+                    {GOAL_SENSOR_UUID: observations[client.client_id, step]},
+                    episode_start=step == 0,
+                )
+                served_actions[client.client_id, step] = action.item()
+
+        threads = [
+            threading.Thread(target=_run_client, args=(client,))
+            for client in server.clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert np.array_equal(served_actions, expected_actions)
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_policy_server_failure():
+    class FailingPolicy(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.net = torch.nn.Module()
+            self.net.num_recurrent_layers = 1
+
+        def act(self, *args, **kwargs):
+            raise ValueError("broken policy")
+
+    with PolicyServer(
+        FailingPolicy(),
+        num_clients=2,
+        hidden_size=4,
+        device=torch.device("cpu"),
+        multiprocessing_start_method="fork",
+    ) as server:
+        server.start()
+        # Clients raise the error of the server instead of blocking
+        for client in server.clients:
+            with pytest.raises(RuntimeError, match="broken policy"):
+                client.act({GOAL_SENSOR_UUID: np.zeros(2, np.float32)})
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_batch_obs_cache():
+    observations = [
+        {
+            "tensor": torch.full((3,), float(i)),
+            "array": np.full((2, 2), i, dtype=np.uint8),
+            "number": i,
+        }
+        for i in range(2)
+    ]
+    cache = ObservationBatchingCache()
+    for _ in range(2):
+        batch = batch_obs(
+            observations, device=torch.device("cpu"), cache=cache
+        )
+        expected = batch_obs(observations, device=torch.device("cpu"))
+        for sensor_name, value in expected.items():
+            assert torch.equal(batch[sensor_name], value)
@@ -6,6 +6,7 @@
 
 import os
 import random
+import shutil
 
 import numpy as np
 import pytest
@@ -13,16 +14,39 @@ import quaternion
 
 import habitat
 from habitat.config.default import get_config
+from habitat.core.simulator import Simulator
+from habitat.datasets.object_nav.precompute_distance_fields import (
+    precompute_distance_fields,
+)
+from habitat.datasets.pointnav.precompute_image_goals import (
+    precompute_image_goals,
+)
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.tasks.nav.geodesic_distance_field import (
+    GeodesicDistanceField,
+    GeodesicDistanceFieldCache,
+)
+from habitat.tasks.nav.image_goal_cache import (
+    ImageGoalCache,
+    image_goal_sensors_key,
+)
 from habitat.tasks.nav.nav import (
+    DistanceToGoal,
     MoveForwardAction,
     NavigationEpisode,
     NavigationGoal,
+    PointGoalSensor,
+)
+from habitat.tasks.nav.object_nav_task import (
+    ObjectGoal,
+    ObjectGoalNavEpisode,
+    ObjectViewLocation,
 )
 from habitat.utils.geometry_utils import (
     angle_between_quaternions,
     quaternion_rotate_vector,
 )
-from habitat.utils.test_utils import sample_non_stop_action
+from habitat.utils.test_utils import StubSimulator, sample_non_stop_action
 from habitat.utils.visualizations.utils import (
     images_to_video,
     observations_to_image,
@@ -199,6 +223,7 @@ def test_pointgoal_with_gps_compass_sensor():
     config.defrost()
     config.TASK.SENSORS = [
         "POINTGOAL_WITH_GPS_COMPASS_SENSOR",
+        "HEADING_SENSOR",
         "COMPASS_SENSOR",
         "GPS_SENSOR",
         "POINTGOAL_SENSOR",
@@ -575,3 +600,562 @@ def test_noise_models_rgbd():
         assert (
             np.mean(pos_diffs) > 0.025
         ), "No forward action actuation noise detected."
+
+
+class _CountingSim:
+    r"""Moves the agent forward in an empty scene and counts the reads of
+    its state.
+    """
+
+    def __init__(self):
+        self.position = np.array([1.0, 0.0, 2.0], dtype=np.float32)
+        self.rotation = quaternion.from_rotation_vector([0, 0.3, 0])
+        self.num_state_reads = 0
+
+    def reset(self):
+        return {}
+
+    def step(self, action):
+        self.position = self.position + quaternion_rotate_vector(
+            self.rotation, np.array([0, 0, -0.25])
+        ).astype(np.float32)
+        return {}
+
+    def get_agent_state(self, agent_id=0):
+        self.num_state_reads += 1
+        return habitat.core.simulator.AgentState(
+            self.position.copy(), self.rotation
+        )
+
+    def geodesic_distance(self, position_a, position_b, episode=None):
+        return float(np.linalg.norm(np.array(position_b[0]) - position_a))
+
+
+def test_agent_state_snapshot():
+    config = get_config().TASK
+    config.defrost()
+    config.SENSORS = [
+        "POINTGOAL_WITH_GPS_COMPASS_SENSOR",
+        "HEADING_SENSOR",
+        "COMPASS_SENSOR",
+        "GPS_SENSOR",
+    ]
+    config.MEASUREMENTS = ["DISTANCE_TO_GOAL", "SUCCESS", "SPL", "SOFT_SPL"]
+    config.POSSIBLE_ACTIONS = ["MOVE_FORWARD"]
+    config.freeze()
+    sim = _CountingSim()
+    task = habitat.registry.get_task("Nav-v0")(config=config, sim=sim)
+    episode = NavigationEpisode(
+        episode_id="0",
+        scene_id="scene.glb",
+        start_position=[1.0, 0.0, 2.0],
+        start_rotation=[0, 0, 0, 1],
+        goals=[NavigationGoal(position=[1.0, 0.0, -3.0])],
+    )
+
+    observations = task.reset(episode)
+    task.measurements.reset_measures(episode=episode, task=task)
+    assert sim.num_state_reads == 1
+    for _ in range(5):
+        observations = task.step({"action": "MOVE_FORWARD"}, episode)
+        task.measurements.update_measures(
+            episode=episode, action=None, task=task
+        )
+    assert sim.num_state_reads == 6
+
+    # Without the task, sensors read the state from the simulator
+    for uuid, sensor in task.sensor_suite.sensors.items():
+        assert np.allclose(
+            sensor.get_observation(observations=None, episode=episode),
+            observations[uuid],
+        )
+    assert sim.num_state_reads == 6 + len(task.sensor_suite.sensors)
+
+    snapshot = task.get_agent_state_snapshot()
+    assert np.allclose(snapshot.position, sim.position)
+    assert np.isclose(snapshot.heading, 0.3)
+    assert np.allclose(
+        snapshot.rotation_matrix, quaternion.as_rotation_matrix(sim.rotation)
+    )
+    with pytest.raises(ValueError):
+        snapshot.position[0] = 0.0
+
+
+def test_static_sensor_observations():
+    config = get_config().TASK
+    config.defrost()
+    config.SENSORS = ["POINTGOAL_SENSOR", "POINTGOAL_WITH_GPS_COMPASS_SENSOR"]
+    config.MEASUREMENTS = []
+    config.POSSIBLE_ACTIONS = ["MOVE_FORWARD"]
+    config.freeze()
+    sim = _CountingSim()
+    task = habitat.registry.get_task("Nav-v0")(config=config, sim=sim)
+    pointgoal_sensor = task.sensor_suite.get("pointgoal")
+    assert pointgoal_sensor.is_static_per_episode
+    assert not task.sensor_suite.get(
+        "pointgoal_with_gps_compass"
+    ).is_static_per_episode
+
+    num_computations = 0
+    get_observation = pointgoal_sensor.get_observation
+
+    def counting_get_observation(*args, **kwargs):
+        nonlocal num_computations
+        num_computations += 1
+        return get_observation(*args, **kwargs)
+
+    pointgoal_sensor.get_observation = counting_get_observation
+
+    for i, goal_position in enumerate([[1.0, 0.0, -3.0], [4.0, 0.0, 2.0]]):
+        episode = NavigationEpisode(
+            episode_id=str(i),
+            scene_id="scene.glb",
+            start_position=[1.0, 0.0, 2.0],
+            start_rotation=[0, 0, 0, 1],
+            goals=[NavigationGoal(position=goal_position)],
+        )
+        observations = task.reset(episode)
+        for _ in range(3):
+            assert np.allclose(
+                observations["pointgoal"],
+                get_observation(observations=None, episode=episode),
+            )
+            observations = task.step({"action": "MOVE_FORWARD"}, episode)
+        assert num_computations == i + 1
+
+
+def test_static_sensor_flag_is_not_inherited():
+    class AgentToGoalSensor(PointGoalSensor):
+        def get_observation(self, observations, episode, *args, **kwargs):
+            agent_state = self._sim.get_agent_state()
+            return self._compute_pointgoal(
+                agent_state.position,
+                agent_state.rotation,
+                np.array(episode.goals[0].position, dtype=np.float32),
+            )
+
+    sim = StubSimulator()
+    sensor = AgentToGoalSensor(
+        sim=sim, config=get_config().TASK.POINTGOAL_SENSOR
+    )
+    assert not sensor.is_static_per_episode
+    episode = NavigationEpisode(
+        episode_id="0",
+        scene_id="scene.glb",
+        start_position=[0.0, 0.0, 0.0],
+        start_rotation=[0, 0, 0, 1],
+        goals=[NavigationGoal(position=[0.0, 0.0, -5.0])],
+    )
+    sensor.reset_episode_observation()
+    assert np.allclose(
+        sensor.get_episode_observation(observations=None, episode=episode),
+        [5, 0],
+    )
+    for _ in range(16):
+        sim.step(HabitatSimActions.MOVE_FORWARD)
+    assert np.allclose(
+        sensor.get_episode_observation(observations=None, episode=episode),
+        [1, 0],
+    )
+
+
+class _WallPathfinder:
+    r"""Navmesh stand-in of a 10m x 10m room split by a wall at x = 0 with
+    a gap for z > 2.
+    """
+
+    def get_bounds(self):
+        return np.array([-5.0, 0.0, -5.0]), np.array([5.0, 1.0, 5.0])
+
+    @staticmethod
+    def is_navigable(x, z):
+        return (np.abs(x) > 0.1) | (z > 2.0)
+
+    def get_topdown_view(self, meters_per_pixel, height):
+        coords = np.linspace(-5.0, 5.0, int(round(10 / meters_per_pixel)) + 1)
+        z, x = np.meshgrid(coords, coords, indexing="ij")
+        return self.is_navigable(x, z)
+
+    @staticmethod
+    def geodesic_distance(position_a, position_b):
+        a = np.array(position_a)[[0, 2]]
+        b = np.array(position_b)[[0, 2]]
+        if np.sign(a[0]) != np.sign(b[0]):
+            # z of the segment at both sides of the wall
+            crossing_z = [
+                a[1] + (b[1] - a[1]) * (x - a[0]) / (b[0] - a[0])
+                for x in [-0.1, 0.1]
+            ]
+            if min(crossing_z) <= 2.0:
+                corner_a = np.array([np.sign(a[0]) * 0.1, 2.0])
+                corner_b = np.array([np.sign(b[0]) * 0.1, 2.0])
+                return (
+                    np.linalg.norm(a - corner_a)
+                    + 0.2
+                    + np.linalg.norm(corner_b - b)
+                )
+        return np.linalg.norm(a - b)
+
+
+class _WallSim(_CountingSim):
+    def __init__(self):
+        super().__init__()
+        self.pathfinder = _WallPathfinder()
+        self.num_distance_queries = 0
+
+    def geodesic_distance(self, position_a, position_b, episode=None):
+        self.num_distance_queries += 1
+        return min(
+            self.pathfinder.geodesic_distance(position_a, goal)
+            for goal in position_b
+        )
+
+
+def _sample_wall_room_positions(rng, num_positions):
+    positions = rng.uniform(-4.9, 4.9, (num_positions, 3))
+    positions[:, 1] = 0.0
+    return positions[np.abs(positions[:, 0]) > 0.3]
+
+
+def test_geodesic_distance_field():
+    rng = np.random.RandomState(0)
+    pathfinder = _WallPathfinder()
+    goal_positions = _sample_wall_room_positions(rng, 6)
+    field = GeodesicDistanceField.from_pathfinder(
+        pathfinder, goal_positions, height=0.0, meters_per_pixel=0.05
+    )
+    for position in _sample_wall_room_positions(rng, 200):
+        expected = min(
+            pathfinder.geodesic_distance(position, goal)
+            for goal in goal_positions
+        )
+        distance = field.distance(position)
+        assert abs(distance - expected) <= 0.03 * expected + 0.15, (
+            position,
+            distance,
+            expected,
+        )
+
+    # Positions on another floor or out of the floor aren't in the field
+    assert field.distance([0.0, 1.5, 0.0]) is None
+    assert field.distance([8.0, 0.0, 0.0]) is None
+    assert (
+        GeodesicDistanceField.from_pathfinder(
+            pathfinder, [[1.0, 3.0, 1.0]], height=0.0
+        )
+        is None
+    )
+
+    # Only distances shorter than the straight line to the goals on other
+    # floors are given
+    field = GeodesicDistanceField.from_pathfinder(
+        pathfinder, [[-4.0, 0.0, 0.0], [4.0, 3.0, 0.0]], height=0.0
+    )
+    assert np.isclose(field.distance([-3.0, 0.0, 0.0]), 1.0, atol=0.05)
+    assert field.distance([3.0, 0.0, 0.0]) is None
+
+
+def test_distance_to_goal_distance_field():
+    config = get_config().TASK
+    config.defrost()
+    config.SENSORS = []
+    config.MEASUREMENTS = ["DISTANCE_TO_GOAL"]
+    config.DISTANCE_TO_GOAL.DISTANCE_FIELD.ENABLED = True
+    config.POSSIBLE_ACTIONS = ["MOVE_FORWARD"]
+    config.freeze()
+    sim = _WallSim()
+    sim.position = np.array([-3.0, 0.0, 4.0], dtype=np.float32)
+    sim.rotation = quaternion.from_rotation_vector([0, -np.pi / 2, 0])
+    task = habitat.registry.get_task("Nav-v0")(config=config, sim=sim)
+    episode = NavigationEpisode(
+        episode_id="0",
+        scene_id="scene.glb",
+        start_position=sim.position.tolist(),
+        start_rotation=[0, 0, 0, 1],
+        goals=[NavigationGoal(position=[1.0, 0.0, 4.0])],
+    )
+
+    task.reset(episode)
+    task.measurements.reset_measures(episode=episode, task=task)
+    distances = [task.measurements.get_metrics()["distance_to_goal"]]
+    for _ in range(15):
+        task.step({"action": "MOVE_FORWARD"}, episode)
+        task.measurements.update_measures(
+            episode=episode, action=None, task=task
+        )
+        distances.append(task.measurements.get_metrics()["distance_to_goal"])
+
+    # Straight towards the goal, which is only queried within a meter of it
+    expected = np.abs(4.0 - 0.25 * np.arange(16))
+    assert np.allclose(distances, expected, atol=0.05)
+    assert sim.num_distance_queries == np.sum(expected < 1.0)
+
+
+def test_precompute_distance_fields(tmp_path):
+    config = get_config()
+    sims = []
+
+    def make_sim(sim_config, scene_id):
+        sims.append(_WallSim())
+        sims[-1].close = lambda: None
+        return sims[-1]
+
+    rng = np.random.RandomState(0)
+    category_view_points = {}
+    episodes = []
+    for i, (scene_id, category, height) in enumerate(
+        [
+            ("scenes/a.glb", "chair", 0.0),
+            ("scenes/a.glb", "chair", 0.1),
+            ("scenes/a.glb", "chair", 3.0),
+            ("scenes/a.glb", "bed", 0.0),
+            ("scenes/b.glb", "chair", 0.0),
+        ]
+    ):
+        # Episodes of a category of a scene share their goals
+        if (scene_id, category) not in category_view_points:
+            view_points = _sample_wall_room_positions(rng, 4)
+            view_points[::2, 1] = 3.0
+            category_view_points[(scene_id, category)] = view_points
+        view_points = category_view_points[(scene_id, category)]
+        episodes.append(
+            ObjectGoalNavEpisode(
+                episode_id=str(i),
+                scene_id=scene_id,
+                start_position=[0.0, height, 0.0],
+                start_rotation=[0, 0, 0, 1],
+                object_category=category,
+                goals=[
+                    ObjectGoal(
+                        position=view_point.tolist(),
+                        object_id=str(j),
+                        object_category=category,
+                        view_points=[
+                            ObjectViewLocation(
+                                agent_state=habitat.core.simulator.AgentState(
+                                    view_point.tolist()
+                                ),
+                                iou=1.0,
+                            )
+                        ],
+                    )
+                    for j, view_point in enumerate(view_points)
+                ],
+            )
+        )
+
+    scene_files = precompute_distance_fields(
+        config, str(tmp_path), make_sim_fn=make_sim, episodes=episodes
+    )
+    assert len(scene_files) == len(sims) == 2
+
+    cache = GeodesicDistanceFieldCache(str(tmp_path))
+    # The first two episodes start on the same floor
+    for episode in episodes[1:]:
+        view_points = DistanceToGoal.get_view_point_positions(episode.goals)
+        expected = GeodesicDistanceField.from_pathfinder(
+            _WallPathfinder(), view_points, height=episode.start_position[1]
+        )
+        field = cache.get(
+            episode.scene_id, episode.goals_key, episode.start_position[1]
+        )
+        assert np.allclose(
+            field.distances, expected.distances, atol=0.01, equal_nan=True
+        )
+        assert np.allclose(field.other_floor_goals, expected.other_floor_goals)
+    assert cache.get("scenes/a.glb", "a.glb_table", 0.0) is None
+    assert cache.get("scenes/c.glb", "c.glb_chair", 0.0) is None
+
+    # Fields computed at runtime are kept for the scene
+    cache.add("scenes/a.glb", "a.glb_table", expected)
+    assert cache.get("scenes/a.glb", "a.glb_table", 0.2) is expected
+    assert cache.get("scenes/b.glb", "a.glb_table", 0.2) is None
+
+
+def test_get_observations_at_poses():
+    config = get_config()
+    if not os.path.exists(config.SIMULATOR.SCENE):
+        pytest.skip("Please download Habitat test data to data folder.")
+    config.defrost()
+    config.TASK.SENSORS = []
+    config.SIMULATOR.AGENT_0.SENSORS = ["RGB_SENSOR", "DEPTH_SENSOR"]
+    config.freeze()
+    with habitat.Env(config=config, dataset=None) as env:
+        env.reset()
+        start_state = env.sim.get_agent_state()
+        positions = [env.sim.sample_navigable_point() for _ in range(8)]
+        angles = np.random.uniform(-np.pi, np.pi, 8)
+        rotations = [[0, np.sin(a / 2), 0, np.cos(a / 2)] for a in angles]
+
+        batch = env.sim.get_observations_at_poses(positions, rotations)
+        for i, (position, rotation) in enumerate(zip(positions, rotations)):
+            observations = env.sim.get_observations_at(position, rotation)
+            for uuid, observation in observations.items():
+                assert np.allclose(batch[uuid][i], observation)
+
+        agent_state = env.sim.get_agent_state()
+        assert np.allclose(agent_state.position, start_state.position)
+        assert np.allclose(agent_state.rotation, start_state.rotation)
+
+
+def test_stub_simulator_observations_at_poses():
+    sim = StubSimulator()
+    sim.set_agent_state([1.0, 0.0, 2.0], [0, 0, 0, 1])
+    rng = np.random.RandomState(0)
+    positions = rng.uniform(-5, 5, (16, 3)).tolist()
+    angles = rng.uniform(-np.pi, np.pi, 16)
+    rotations = [[0, np.sin(a / 2), 0, np.cos(a / 2)] for a in angles]
+
+    sim.num_state_sets = 0
+    batch = sim.get_observations_at_poses(positions, rotations)
+    assert batch["rgb"].shape == (16, 8, 8, 3)
+    # The state is set once per pose and put back once
+    assert sim.num_state_sets == 17
+    for i, (position, rotation) in enumerate(zip(positions, rotations)):
+        assert np.array_equal(
+            batch["rgb"][i], sim.get_observations_at(position, rotation)["rgb"]
+        )
+    assert np.allclose(sim.get_agent_state().position, [1.0, 0.0, 2.0])
+
+    # So does the generic implementation, with a render per pose
+    generic_batch = Simulator.get_observations_at_poses(
+        sim, positions, rotations
+    )
+    assert np.array_equal(generic_batch["rgb"], batch["rgb"])
+
+    image_goal_sensor = habitat.registry.get_sensor("ImageGoalSensor")(
+        sim=sim, config=get_config().TASK.IMAGEGOAL_SENSOR
+    )
+    episodes = [
+        NavigationEpisode(
+            episode_id=str(i),
+            scene_id="scene.glb",
+            start_position=[0.0, 0.0, 0.0],
+            start_rotation=[0, 0, 0, 1],
+            goals=[NavigationGoal(position=position)],
+        )
+        for i, position in enumerate(positions)
+    ]
+    image_goals = image_goal_sensor.get_image_goals(episodes)
+    for episode, image_goal in zip(episodes, image_goals):
+        assert np.array_equal(
+            image_goal,
+            image_goal_sensor.get_observation(
+                observations=None, episode=episode
+            ),
+        )
+
+
+def _image_goal_sensor(sim, cache_size=0, cache_dir=""):
+    config = get_config().TASK.IMAGEGOAL_SENSOR.clone()
+    config.defrost()
+    config.CACHE_SIZE = cache_size
+    config.CACHE_DIR = cache_dir
+    config.freeze()
+    return habitat.registry.get_sensor("ImageGoalSensor")(
+        sim=sim, config=config
+    )
+
+
+def test_image_goal_cache(tmpdir):
+    rng = np.random.RandomState(0)
+    episodes = [
+        NavigationEpisode(
+            episode_id=str(i),
+            scene_id=f"data/scene_datasets/scene{i % 2}.glb",
+            start_position=[0.0, 0.0, 0.0],
+            start_rotation=[0, 0, 0, 1],
+            goals=[NavigationGoal(position=rng.uniform(-5, 5, 3).tolist())],
+        )
+        for i in range(6)
+    ]
+
+    # Revisited episodes are rendered once, the 2 last ones are kept
+    sim = StubSimulator()
+    sensor = _image_goal_sensor(sim, cache_size=2)
+    expected = {
+        episode.episode_id: sensor._get_pointnav_episode_image_goal(episode)
+        for episode in episodes
+    }
+    sim.num_renders = 0
+    for episode in episodes[:2] + episodes[:2]:
+        image_goal = sensor.get_observation(observations=None, episode=episode)
+        assert np.array_equal(image_goal, expected[episode.episode_id])
+    assert sim.num_renders == 2
+    for episode in episodes[2:] + episodes[:1]:
+        sensor.get_observation(observations=None, episode=episode)
+    assert sim.num_renders == 7
+
+    # Images written offline are loaded instead of rendered
+    config = get_config("configs/tasks/imagenav.yaml")
+    num_images = precompute_image_goals(
+        config,
+        str(tmpdir),
+        batch_size=4,
+        make_sim_fn=lambda sim_config, scene_id: StubSimulator(sim_config),
+        episodes=episodes,
+    )
+    assert num_images == 6
+    (sensors_dir,) = os.listdir(str(tmpdir))
+    assert sensors_dir == image_goal_sensors_key(config.SIMULATOR)
+    assert sorted(os.listdir(os.path.join(str(tmpdir), sensors_dir))) == [
+        "scene0",
+        "scene1",
+    ]
+    assert (
+        precompute_image_goals(
+            config, str(tmpdir), make_sim_fn=None, episodes=episodes
+        )
+        == 0
+    )
+
+    sim = StubSimulator(config.SIMULATOR)
+    sensor = _image_goal_sensor(sim, cache_dir=str(tmpdir))
+    for episode in episodes:
+        image_goal = sensor.get_observation(observations=None, episode=episode)
+        assert np.array_equal(image_goal, expected[episode.episode_id])
+    assert sim.num_renders == 0
+
+    # The same episode id with another goal, as in another split, is
+    # rendered again
+    other_episode = NavigationEpisode(
+        episode_id=episodes[0].episode_id,
+        scene_id=episodes[0].scene_id,
+        start_position=[0.0, 0.0, 0.0],
+        start_rotation=[0, 0, 0, 1],
+        goals=[NavigationGoal(position=episodes[1].goals[0].position)],
+    )
+    sensor.get_observation(observations=None, episode=other_episode)
+    assert sim.num_renders == 1
+
+    # Images of other sensors are rendered again
+    sim_config = config.SIMULATOR.clone()
+    sim_config.defrost()
+    sim_config.RGB_SENSOR.HFOV = 60
+    sim_config.freeze()
+    sim = StubSimulator(sim_config)
+    sensor = _image_goal_sensor(sim, cache_dir=str(tmpdir))
+    sensor.get_observation(observations=None, episode=episodes[0])
+    assert sim.num_renders == 1
+    # Even if their files are moved to the directory of these sensors
+    goal_args = (
+        episodes[1].scene_id,
+        episodes[1].episode_id,
+        episodes[1].goals[0].position,
+    )
+    moved_path = sensor._image_goal_cache.image_path(*goal_args)
+    os.makedirs(os.path.dirname(moved_path))
+    shutil.copy(
+        ImageGoalCache(
+            cache_dir=str(tmpdir),
+            sensors_key=image_goal_sensors_key(config.SIMULATOR),
+        ).image_path(*goal_args),
+        moved_path,
+    )
+    assert sensor._image_goal_cache.get(*goal_args) is None
+
+    sim = StubSimulator(config.SIMULATOR, resolution=4)
+    sensor = _image_goal_sensor(sim, cache_dir=str(tmpdir))
+    image_goal = sensor.get_observation(observations=None, episode=episodes[0])
+    assert image_goal.shape == (4, 4, 3)
+    assert sim.num_renders == 1